@@ -0,0 +1,79 @@
+"""Query latency of the NumPy analytics engine against the SQL backend.
+
+It runs every read query of app_logic on each subject of the database.
+
+Usage:
+    DB_NAME=... DB_USER=... DB_PASS=... DB_HOST=... DB_PORT=... \
+        python -m benchmarks.bench_analytics_engine --rounds 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from src.analytics_engine import SchoolAnalytics
+from src.database_manager import SchoolDB
+
+QUERIES = [
+    "get_subject_summary",
+    "get_number_students_by_subject_and_year",
+    "get_list_students_by_subject_and_year",
+    "get_list_passed_by_subject_and_year",
+    "get_list_failed_by_subject_and_year",
+]
+
+
+def _time_backend(backend, subjects, rounds):
+    """Get the latency in milliseconds of each query on every subject."""
+    latencies = {query: [] for query in QUERIES + ["get_summaries_by_year"]}
+    years = sorted({year for _, year in subjects})
+    for _ in range(rounds):
+        for query in QUERIES:
+            for subject, year in subjects:
+                start = time.perf_counter()
+                getattr(backend, query)(subject=subject, year=year)
+                latencies[query].append((time.perf_counter() - start) * 1000)
+        for year in years:
+            start = time.perf_counter()
+            backend.get_summaries_by_year(year=year)
+            latencies["get_summaries_by_year"].append(
+                (time.perf_counter() - start) * 1000
+            )
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    school_data_manager = SchoolDB(
+        db_name=os.getenv("DB_NAME"),
+        db_user=os.getenv("DB_USER"),
+        db_pass=os.getenv("DB_PASS"),
+        db_host=os.getenv("DB_HOST"),
+        db_port=os.getenv("DB_PORT"),
+    )
+    subjects = school_data_manager.get_subjects()
+
+    start = time.perf_counter()
+    analytics = SchoolAnalytics(school_data_manager=school_data_manager)
+    load_time = (time.perf_counter() - start) * 1000
+    sys.stdout.write(
+        f"loaded {len(analytics._marks)} enrolments in {load_time:.1f} ms\n"
+    )
+
+    sql = _time_backend(school_data_manager, subjects, args.rounds)
+    numpy = _time_backend(analytics, subjects, args.rounds)
+    sys.stdout.write(f"{'query':<40} {'sql p50':>10} {'numpy p50':>10}\n")
+    for query in sql:
+        sys.stdout.write(
+            f"{query:<40} {statistics.median(sql[query]):8.3f}ms "
+            f"{statistics.median(numpy[query]):8.3f}ms\n"
+        )
+    school_data_manager.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Rows per second of the Excel and the CSV/TSV ingest paths.
+
+The same synthetic data is written as .xlsx, .csv and .tsv. Each file is
+parsed without storing it and then ingested into the database through
+extract_data_from_file. Each format uses its own year so the runs do not
+update each other's enrolments.
+
+Usage:
+    DB_NAME=... DB_USER=... DB_PASS=... DB_HOST=... DB_PORT=... \
+        python -m benchmarks.bench_file_formats --subjects 20 --students 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from benchmarks.synthetic_data import write_delimited_file, write_workbook
+from src import app_logic, excel_file_processing
+
+FORMATS = {
+    ".xlsx": ("2091-2092", write_workbook),
+    ".csv": ("2093-2094", write_delimited_file),
+    ".tsv": ("2095-2096", write_delimited_file),
+}
+
+
+def _consume(sheets, **kwargs):
+    """Read every row of the sheets without storing them."""
+    for sheet in sheets:
+        for _ in sheet.student_data:
+            pass
+
+
+def _rows_per_second(rows, function):
+    """Run function and get the number of rows it processed per second."""
+    start = time.perf_counter()
+    function()
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subjects", type=int, default=20)
+    parser.add_argument("--students", type=int, default=2000)
+    args = parser.parse_args()
+
+    app_logic.init_database()
+    sys.stdout.write(
+        f"{'format':<8} {'parse rows/s':>14} {'ingest rows/s':>14}\n"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for extension, (year, write) in FORMATS.items():
+            path = os.path.join(directory, "marks" + extension)
+            rows = write(path, args.subjects, args.students, [year])
+
+            with patch.object(
+                excel_file_processing, "store_sheets_data", _consume
+            ):
+                parse = _rows_per_second(
+                    rows,
+                    lambda: excel_file_processing.extract_data_from_file(
+                        file=path
+                    ),
+                )
+            ingest = _rows_per_second(
+                rows,
+                lambda: excel_file_processing.extract_data_from_file(
+                    file=path
+                ),
+            )
+            sys.stdout.write(f"{extension:<8} {parse:14.0f} {ingest:14.0f}\n")
+    app_logic.school_data_manager.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Per-query latency of a new engine per call against the pooled engine.
+
+Usage:
+    DB_NAME=... DB_USER=... DB_PASS=... DB_HOST=... DB_PORT=... \
+        python -m benchmarks.bench_session_scope --queries 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database_manager import (
+    Base,
+    SchoolDB,
+    Student,
+    StudentSubject,
+    Subject,
+)
+
+
+def _count_students_with_new_engine(
+    connection_url: str, subject: str, year: str
+) -> int:
+    """Reproduce the old session_scope: engine, sessionmaker and
+    create_all on every call."""
+    engine = create_engine(connection_url)
+    session = sessionmaker(engine)()
+    Base.metadata.create_all(engine)
+    try:
+        return (
+            session.query(Student)
+            .join(StudentSubject, Student.id == StudentSubject.student_id)
+            .join(Subject, StudentSubject.subject_id == Subject.id)
+            .filter(Subject.name == subject, Subject.natural_year == year)
+            .count()
+        )
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _time_calls(function: Callable, queries: int) -> List[float]:
+    """Call function the given number of times and return the latency of
+    each call in milliseconds."""
+    latencies = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _write_latencies(label: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    sys.stdout.write(
+        f"{label:<16} mean {statistics.mean(ordered):8.3f} ms  "
+        f"p50 {statistics.median(ordered):8.3f} ms  p95 {p95:8.3f} ms\n"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--subject", type=str, default="Lit 3")
+    parser.add_argument("--year", type=str, default="2019-2020")
+    args = parser.parse_args()
+
+    db_name = os.getenv("DB_NAME")
+    db_user = os.getenv("DB_USER")
+    db_pass = os.getenv("DB_PASS")
+    db_host = os.getenv("DB_HOST")
+    db_port = os.getenv("DB_PORT")
+    connection_url = (
+        f"postgresql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
+    )
+
+    school_data_manager = SchoolDB(
+        db_name=db_name,
+        db_user=db_user,
+        db_pass=db_pass,
+        db_host=db_host,
+        db_port=db_port,
+    )
+    school_data_manager.create_tables()
+
+    before = _time_calls(
+        lambda: _count_students_with_new_engine(
+            connection_url=connection_url, subject=args.subject, year=args.year
+        ),
+        queries=args.queries,
+    )
+    after = _time_calls(
+        lambda: school_data_manager.get_number_students_by_subject_and_year(
+            subject=args.subject, year=args.year
+        ),
+        queries=args.queries,
+    )
+
+    _write_latencies("engine per call", before)
+    _write_latencies("pooled engine", after)
+    school_data_manager.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""Reproducible benchmark of ingest throughput and query latency.
+
+A synthetic workbook of students x subjects x years is ingested through
+extract_data_from_file, and then every query of app_logic is run: the
+operations of batch mode on each subject and year of the workbook, and the
+subject trends, student pages and streams, and transcripts, which are only
+available through app_logic. The results are written as JSON so that runs
+of different versions can be compared with --baseline. The startup of
+main.py in each mode is measured with python -X importtime.
+
+The tables of the database are only dropped before ingesting with
+--drop-tables, so use it only on a database used for benchmarking; without
+it the suite refuses to run against a database that already has tables.
+With --embedded a temporary Postgres is started with pgserver instead (pip
+install pgserver; it can not be run as root) and its tables are dropped.
+
+Usage:
+    DB_NAME=... DB_USER=... DB_PASS=... DB_HOST=... DB_PORT=... \
+        python -m benchmarks.suite --students 500 --subjects 10 --years 3 \
+        --drop-tables --output results.json
+    python -m benchmarks.suite --embedded --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic_data import (
+    synthetic_students,
+    synthetic_years,
+    write_workbook,
+)
+from src.metrics import percentiles
+
+
+@contextmanager
+def _embedded_postgres() -> Iterator[None]:
+    """Start a temporary Postgres and point the DB_* variables to it.
+
+    It has to be entered before importing app_logic, which connects using
+    those variables when it is imported.
+    """
+    import pgserver
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = pgserver.get_server(directory, cleanup_mode="delete")
+        uri = urlparse(server.get_uri())
+        os.environ["PGHOST"] = parse_qs(uri.query)["host"][0]
+        os.environ["DB_USER"] = uri.username
+        os.environ["DB_PASS"] = uri.password or ""
+        os.environ["DB_NAME"] = uri.path.lstrip("/")
+        os.environ["DB_HOST"] = os.environ["DB_PORT"] = ""
+        try:
+            yield
+        finally:
+            server.cleanup()
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    """Get the number of calls and the p50, p95 and p99 of latencies in
+    milliseconds."""
+    result = {"calls": len(latencies)}
+    for name, value in percentiles(latencies).items():
+        result[f"{name}_ms"] = round(value, 4)
+    return result
+
+
+def _import_microseconds(importtime: str) -> int:
+    """Get the total import time of the output of python -X importtime."""
+    total = 0
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total
+
+
+def _measure_startup(workbook: str, rounds: int) -> Dict[str, dict]:
+    """Run main.py in each mode with -X importtime and get the median import
+    time and wall time, and whether it loaded xlrd or inquirer.
+
+    The interactive mode can not run unattended, so only the import of its
+    module is measured.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    main = os.path.join(root, "main.py")
+    empty_batch = os.path.join(os.path.dirname(workbook), "empty.jsonl")
+    open(empty_batch, "w").close()
+    modes = {
+        "ingest": [
+            main,
+            "--input-file",
+            workbook,
+            "--ingest-only",
+            "--incremental",
+        ],
+        "batch": [main, "--batch", empty_batch],
+        "interactive": ["-c", "import src.user_interaction"],
+    }
+    startup = {}
+    for mode, arguments in modes.items():
+        imports, walls = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            process = subprocess.run(
+                [sys.executable, "-X", "importtime"] + arguments,
+                capture_output=True,
+                check=True,
+                cwd=root,
+                text=True,
+            )
+            walls.append((time.perf_counter() - start) * 1000)
+            imports.append(_import_microseconds(process.stderr) / 1000)
+        startup[mode] = {
+            "import_ms": round(statistics.median(imports), 2),
+            "wall_ms": round(statistics.median(walls), 2),
+            "imports_xlrd": " xlrd\n" in process.stderr,
+            "imports_inquirer": " inquirer\n" in process.stderr,
+        }
+    return startup
+
+
+def _git_commit() -> str:
+    """Get the commit of the working tree, None outside a git repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _timed_queries(
+    subjects: List[Tuple[str, str]],
+    years: List[str],
+    students: List[Tuple[str, str]],
+) -> Dict[str, Tuple[Callable, List[dict]]]:
+    """Get the app_logic function of every query and the arguments of each
+    of its calls: the operations of batch mode and the queries that are
+    only available through app_logic.
+
+    Iterators are consumed whole, so their time covers every row.
+
+    Args:
+        subjects (List[Tuple[str, str]]): Name and year of each subject.
+        years (List[str]): Years of the workbook.
+        students (List[Tuple[str, str]]): Name and last name of each student.
+
+    Returns:
+        Dict[str, Tuple[Callable, List[dict]]]: Function and calls of each
+            query.
+    """
+    from src import app_logic
+    from src.batch_queries import OPERATIONS
+
+    by_subject = [
+        {"subject": subject, "year": year} for subject, year in subjects
+    ]
+    by_year = [{"year": year} for year in years]
+    queries = {
+        operation: (
+            getattr(app_logic, function_name),
+            by_subject if needs_subject else by_year,
+        )
+        for operation, (function_name, needs_subject) in OPERATIONS.items()
+    }
+    queries.update(
+        {
+            "subject_trend": (
+                app_logic.get_subject_trend,
+                [
+                    {"subject": subject}
+                    for subject in dict.fromkeys(name for name, _ in subjects)
+                ],
+            ),
+            "students_page": (
+                app_logic.get_students_page_in_subject,
+                by_subject,
+            ),
+            "iter_students": (
+                lambda **arguments: list(
+                    app_logic.iter_students_in_subject(**arguments)
+                ),
+                by_subject,
+            ),
+            "student_transcript": (
+                app_logic.get_student_transcript,
+                [
+                    {"name": name, "last_name": last_name}
+                    for name, last_name in students
+                ],
+            ),
+            "student_transcripts": (
+                app_logic.get_student_transcripts,
+                [
+                    {"students": students[start : start + 100]}
+                    for start in range(0, len(students), 100)
+                ],
+            ),
+        }
+    )
+    return queries
+
+
+def _run(args: argparse.Namespace) -> dict:
+    """Ingest the synthetic workbook and time the queries.
+
+    Returns:
+        dict: Parameters and results of the run.
+    """
+    from sqlalchemy import inspect
+
+    from src import app_logic
+    from src.database_manager import Base
+    from src.excel_file_processing import extract_data_from_file
+    from src.query_cache import QueryCache
+
+    engine = app_logic.school_data_manager._engine
+    if args.embedded or args.drop_tables:
+        Base.metadata.drop_all(engine)
+    elif inspect(engine).get_table_names():
+        sys.exit(
+            "The database already has tables: use a database only for "
+            "benchmarking with --drop-tables, or --embedded."
+        )
+    app_logic.init_database()
+    years = synthetic_years(args.years)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.xlsx")
+        rows = write_workbook(
+            path, args.subjects, args.students, years, args.seed
+        )
+        start = time.perf_counter()
+        extract_data_from_file(file=path, workers=args.workers)
+        ingest_seconds = time.perf_counter() - start
+        # The workbook is already stored, so the ingest run only checks its
+        # hash and mostly measures the startup.
+        startup = _measure_startup(workbook=path, rounds=args.rounds)
+
+    app_logic.set_query_backend(backend=args.backend)
+    if not args.cache:
+        app_logic.query_cache = QueryCache(maxsize=0)
+    subjects = app_logic.school_data_manager.get_subjects()
+
+    queries = {}
+    for operation, (function, calls) in _timed_queries(
+        subjects=subjects,
+        years=years,
+        students=synthetic_students(args.students),
+    ).items():
+        latencies = []
+        for _ in range(args.rounds):
+            for arguments in calls:
+                start = time.perf_counter()
+                function(**arguments)
+                latencies.append((time.perf_counter() - start) * 1000)
+        queries[operation] = _percentiles(latencies)
+    app_logic.school_data_manager.dispose()
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "parameters": {
+            "students": args.students,
+            "subjects": args.subjects,
+            "years": args.years,
+            "seed": args.seed,
+            "rounds": args.rounds,
+            "workers": args.workers,
+            "backend": args.backend,
+            "cache": args.cache,
+            "embedded": args.embedded,
+        },
+        "ingest": {
+            "rows": rows,
+            "seconds": round(ingest_seconds, 4),
+            "rows_per_second": round(rows / ingest_seconds, 1),
+        },
+        "queries": queries,
+        "startup": startup,
+    }
+
+
+def _compare(results: dict, baseline: dict) -> None:
+    """Write the relative change of each metric against a previous run."""
+    changes = [
+        (
+            "ingest rows/s",
+            baseline["ingest"]["rows_per_second"],
+            results["ingest"]["rows_per_second"],
+        )
+    ]
+    for operation, latencies in results["queries"].items():
+        if operation in baseline["queries"]:
+            changes.append(
+                (
+                    f"{operation} p95 ms",
+                    baseline["queries"][operation]["p95_ms"],
+                    latencies["p95_ms"],
+                )
+            )
+    for mode, startup in results["startup"].items():
+        if mode in baseline.get("startup", {}):
+            changes.append(
+                (
+                    f"{mode} startup import ms",
+                    baseline["startup"][mode]["import_ms"],
+                    startup["import_ms"],
+                )
+            )
+    for metric, before, after in changes:
+        change = (after - before) / before * 100 if before else 0.0
+        sys.stderr.write(
+            f"{metric:<32} {before:>12} -> {after:>12} ({change:+.1f}%)\n"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--subjects", type=int, default=10)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--backend", choices=["sql", "numpy"], default="sql")
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="keep the query cache enabled while timing the queries",
+    )
+    parser.add_argument(
+        "--embedded",
+        action="store_true",
+        help="run against a temporary Postgres started with pgserver",
+    )
+    parser.add_argument(
+        "--drop-tables",
+        action="store_true",
+        help="drop the tables of the database before ingesting",
+    )
+    parser.add_argument("--output", type=str, help="JSON file for the results")
+    parser.add_argument(
+        "--baseline", type=str, help="JSON results of a previous run"
+    )
+    args = parser.parse_args()
+
+    if args.embedded:
+        with _embedded_postgres():
+            results = _run(args)
+    else:
+        results = _run(args)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            _compare(results, json.load(baseline))
+
+
+if __name__ == "__main__":
+    main()
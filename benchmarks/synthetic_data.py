@@ -0,0 +1,144 @@
+"""Synthetic input files with the layout expected by extract_data_from_file.
+
+Excel workbooks are written with openpyxl, the same version pinned in
+requirements.txt that reads .xlsx sheets in parallel.
+"""
+import csv
+import random
+from typing import Iterator, List, Sequence, Tuple
+
+NAMES = ["Isa", "Ana", "Luis", "Marta", "Pablo", "Lucia", "Hugo", "Sara"]
+LAST_NAMES = ["Garvi", "Lopez", "Perez", "Ruiz", "Gomez", "Diaz", "Moreno"]
+
+
+def synthetic_years(count: int, first: int = 2019) -> List[str]:
+    """Get count consecutive years with the "2019-2020" format.
+
+    Args:
+        count (int): number of years.
+        first (int): year in which the first one starts.
+
+    Returns:
+        List[str]: Years in order.
+    """
+    return [f"{start}-{start + 1}" for start in range(first, first + count)]
+
+
+def synthetic_students(count: int) -> List[Tuple[str, str]]:
+    """Get the name and last name of the students of generate_sheets.
+
+    Args:
+        count (int): number of students.
+
+    Returns:
+        List[Tuple[str, str]]: Name and last name of each student.
+    """
+    return [
+        (
+            NAMES[index % len(NAMES)],
+            f"{LAST_NAMES[index % len(LAST_NAMES)]} {index}",
+        )
+        for index in range(count)
+    ]
+
+
+def generate_sheets(
+    subjects: int,
+    students: int,
+    years: Sequence[str] = ("2019-2020",),
+    seed: int = 0,
+) -> Iterator[Tuple[str, List[list]]]:
+    """Generate the sheet name and rows of each subject on each year.
+
+    Every subject has the same students, named "<name> <last name> <number>"
+    so that they are unique, with a random mark between 0 and 10. The same
+    arguments always generate the same data.
+
+    Args:
+        subjects (int): number of subjects per year.
+        students (int): number of students of each subject.
+        years (Sequence[str]): years in which the subjects were taught.
+        seed (int): seed of the random marks.
+
+    Yields:
+        Tuple[str, List[list]]: Sheet name and name, last name and mark of each student.
+    """
+    generator = random.Random(seed)
+    people = synthetic_students(students)
+    for year in years:
+        for subject in range(subjects):
+            rows = [
+                [name, last_name, round(generator.uniform(0, 10), 1)]
+                for name, last_name in people
+            ]
+            yield f"Subject{subject} {subject % 4 + 1} {year}", rows
+
+
+def write_workbook(
+    path: str,
+    subjects: int,
+    students: int,
+    years: Sequence[str] = ("2019-2020",),
+    seed: int = 0,
+) -> int:
+    """Write an Excel workbook with one sheet per subject.
+
+    Args:
+        path (str): path of the .xlsx file.
+        subjects (int): number of sheets per year.
+        students (int): number of students of each sheet.
+        years (Sequence[str]): years in which the subjects were taught.
+        seed (int): seed of the random marks.
+
+    Returns:
+        int: Number of student rows written.
+    """
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    total = 0
+    for sheet_name, rows in generate_sheets(subjects, students, years, seed):
+        sheet = workbook.create_sheet(title=sheet_name)
+        sheet.append(["Name", "Last name", "Mark"])
+        for row in rows:
+            sheet.append(row)
+        total += len(rows)
+    workbook.save(path)
+    return total
+
+
+def write_delimited_file(
+    path: str,
+    subjects: int,
+    students: int,
+    years: Sequence[str] = ("2019-2020",),
+    seed: int = 0,
+) -> int:
+    """Write a CSV or TSV file, depending on the extension of path, with the
+    same data that write_workbook writes.
+
+    Args:
+        path (str): path of the .csv or .tsv file.
+        subjects (int): number of subjects per year.
+        students (int): number of students of each subject.
+        years (Sequence[str]): years in which the subjects were taught.
+        seed (int): seed of the random marks.
+
+    Returns:
+        int: Number of student rows written.
+    """
+    delimiter = "\t" if path.endswith(".tsv") else ","
+    total = 0
+    with open(path, "w", newline="") as output:
+        writer = csv.writer(output, delimiter=delimiter)
+        writer.writerow(
+            ["Subject", "Course", "Year", "Name", "Last name", "Mark"]
+        )
+        for sheet_name, rows in generate_sheets(
+            subjects, students, years, seed
+        ):
+            subject_columns = sheet_name.split()
+            for row in rows:
+                writer.writerow(subject_columns + row)
+            total += len(rows)
+    return total
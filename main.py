@@ -1,13 +1,172 @@
 import argparse
-from src import user_interaction
-from src.excel_file_processing import extract_data_from_file
+import os
+import sys
+from src import app_logic
+
+# The modules of each mode are imported only when it runs, so that storing a
+# file does not load inquirer and answering queries does not load xlrd.
 
 
 parser = argparse.ArgumentParser()
-parser.add_argument("--input-file", type=str, required=True)
+parser.add_argument(
+    "--input-file",
+    type=str,
+    nargs="+",
+    help="file to store; with several files, globs or directories each file "
+    "is stored in its own transaction and a summary is printed",
+)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=1,
+    help="processes parsing the sheets of a single file",
+)
+parser.add_argument(
+    "--readers",
+    type=int,
+    default=min(4, os.cpu_count() or 1),
+    help="processes parsing files when storing several",
+)
+parser.add_argument(
+    "--writers",
+    type=int,
+    default=2,
+    help="connections storing files when storing several",
+)
+parser.add_argument(
+    "--incremental",
+    action="store_true",
+    help="skip the files and sheets that did not change since the last run",
+)
+parser.add_argument(
+    "--changed-marks",
+    choices=["keep", "update"],
+    default=None,
+    help="keep or update the stored marks that changed (default: update "
+    "with --incremental, keep otherwise)",
+)
+parser.add_argument(
+    "--ingest-only",
+    action="store_true",
+    help="store --input-file and exit without answering queries",
+)
+parser.add_argument(
+    "--backend", choices=["sql", "numpy"], default=app_logic.query_backend_name
+)
+parser.add_argument(
+    "--batch",
+    type=str,
+    nargs="?",
+    const="-",
+    default=None,
+    help="answer the JSON Lines queries of a file (or stdin) instead of asking",
+)
+parser.add_argument(
+    "--serve",
+    action="store_true",
+    help="answer the queries of batch mode over HTTP (POST /query, GET /stats)",
+)
+parser.add_argument(
+    "--check-stats",
+    action="store_true",
+    help="rebuild the subject/year statistics from the enrolments, print "
+    "where they differed and exit (status 1 if any did)",
+)
+parser.add_argument("--host", type=str, default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8000)
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="print the time, SQL statements and rows of each database operation",
+)
+parser.add_argument(
+    "--profile-output",
+    type=str,
+    help="write the metrics of --profile as JSON to this file",
+)
 
 args = parser.parse_args()
 
-extract_data_from_file(file=args.input_file)
+if (
+    args.input_file is None
+    and args.batch is None
+    and not args.serve
+    and not args.check_stats
+):
+    parser.error(
+        "--input-file is required unless --batch, --serve or --check-stats "
+        "is used"
+    )
+if args.ingest_only and args.input_file is None:
+    parser.error("--ingest-only requires --input-file")
+
+if args.profile or args.profile_output:
+    metrics = app_logic.enable_metrics()
+
+app_logic.init_database()
+
+exit_status = 0
+try:
+    if args.input_file is not None:
+        from src.ingest_pipeline import expand_input_paths
+
+        files = expand_input_paths(paths=args.input_file)
+        if files == args.input_file and len(files) == 1:
+            from src.excel_file_processing import extract_data_from_file
+
+            extract_data_from_file(
+                file=files[0],
+                workers=args.workers,
+                incremental=args.incremental,
+                changed_marks=args.changed_marks,
+            )
+        else:
+            from src.ingest_pipeline import extract_data_from_files
+
+            summary = extract_data_from_files(
+                files=files,
+                readers=args.readers,
+                writers=args.writers,
+                incremental=args.incremental,
+                changed_marks=args.changed_marks,
+            )
+            sys.stderr.write(summary.format())
+            if summary.failures:
+                exit_status = 1
+
+    if not (args.ingest_only or args.check_stats):
+        app_logic.set_query_backend(backend=args.backend)
+
+    if args.ingest_only:
+        pass
+    elif args.check_stats:
+        differences = app_logic.check_subject_stats()
+        for stored, rebuilt in differences:
+            print(f"stored:  {stored}\nrebuilt: {rebuilt}")
+        print(f"{len(differences)} subject/year statistics differed.")
+        if differences:
+            exit_status = 1
+    elif args.serve:
+        from src.query_server import serve
+
+        serve(host=args.host, port=args.port)
+    elif args.batch is not None:
+        from src.batch_queries import run_batch
+
+        if args.batch == "-":
+            run_batch(queries=sys.stdin, output=sys.stdout)
+        else:
+            with open(args.batch) as queries:
+                run_batch(queries=queries, output=sys.stdout)
+    else:
+        from src import user_interaction
+
+        user = user_interaction.user_interaction()
+finally:
+    if args.profile:
+        sys.stderr.write(metrics.format())
+    if args.profile_output:
+        with open(args.profile_output, "w") as output:
+            metrics.dump(output=output)
 
-user = user_interaction.user_interaction()
+sys.exit(exit_status)
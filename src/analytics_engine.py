@@ -0,0 +1,389 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from src.database_manager import (
+    HISTOGRAM_BINS,
+    PASS_MARK,
+    SchoolDB,
+    SubjectStats,
+    SubjectSummary,
+    SubjectYearTrend,
+)
+from src.mark_distribution import MarkDistribution, compute_distribution
+
+
+class SchoolAnalytics:
+    """In-memory columnar copy of the enrolments that answers the same read
+    queries as SchoolDB with vectorized operations.
+
+    Enrolments are kept sorted by subject, so the rows of a subject-year are
+    a contiguous slice of each column.
+
+    Attributes:
+        school_data_manager (SchoolDB): database the data is loaded from.
+    """
+
+    def __init__(self, school_data_manager: SchoolDB):
+        self._school_data_manager = school_data_manager
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Load the subjects and enrolments of the database again."""
+        self._load(
+            subjects=self._school_data_manager.get_subjects(),
+            enrolments=self._school_data_manager.get_enrolments(),
+        )
+
+    def _load(
+        self,
+        subjects: List[Tuple[str, str]],
+        enrolments: List[Tuple[str, str, int, str, str, float]],
+    ) -> None:
+        """Build the columns from the rows obtained from the database.
+
+        Args:
+            subjects (List[Tuple[str, str]]): Name and year of each subject.
+            enrolments (List[Tuple[str, str, int, str, str, float]]): Subject
+                name, year, student id, name, last name and mark of each
+                enrolment.
+        """
+        self._subject_codes = {}
+        self._subject_names = []
+        self._year_codes = {}
+        for name, year in subjects:
+            self._subject_codes[(name, year)] = len(self._subject_names)
+            self._subject_names.append(name)
+            self._year_codes.setdefault(year, []).append(
+                self._subject_codes[(name, year)]
+            )
+
+        student_codes = {}
+        student_names = []
+        subject_code = np.empty(len(enrolments), dtype=np.int32)
+        student_code = np.empty(len(enrolments), dtype=np.int32)
+        marks = np.empty(len(enrolments), dtype=np.float64)
+        for (
+            index,
+            (subject, year, student_id, name, last_name, mark),
+        ) in enumerate(enrolments):
+            if student_id not in student_codes:
+                student_codes[student_id] = len(student_names)
+                student_names.append(" ".join((name, last_name)))
+            subject_code[index] = self._subject_codes[(subject, year)]
+            student_code[index] = student_codes[student_id]
+            marks[index] = np.nan if mark is None else mark
+
+        order = np.argsort(subject_code, kind="stable")
+        self._subject_code = subject_code[order]
+        self._student_code = student_code[order]
+        self._marks = marks[order]
+        self._student_names = np.array(student_names, dtype=object)
+        self._offsets = np.searchsorted(
+            self._subject_code, np.arange(len(self._subject_names) + 1)
+        )
+
+    def _slice(self, subject: str, year: str) -> slice:
+        """Get the rows of the columns that belong to a subject-year.
+
+        Args:
+            subject (str): Name of the subject.
+            year (str): Year the subject was taught.
+
+        Returns:
+            slice: Rows of the enrolments of the subject, empty if the
+                subject does not exist.
+        """
+        code = self._subject_codes.get((subject, year))
+        if code is None:
+            return slice(0, 0)
+        return slice(self._offsets[code], self._offsets[code + 1])
+
+    def _summary(self, subject: str, year: str, rows: slice) -> SubjectSummary:
+        """Compute the statistics of the marks in rows.
+
+        Args:
+            subject (str): Name of the subject.
+            year (str): Year the subject was taught.
+            rows (slice): Rows of the enrolments of the subject.
+
+        Returns:
+            SubjectSummary: Statistics of the subject in the given year.
+        """
+        marks = self._marks[rows]
+        graded = marks[~np.isnan(marks)]
+        if len(graded) == 0:
+            mean_mark = min_mark = max_mark = None
+        else:
+            mean_mark = float(graded.mean())
+            min_mark = float(graded.min())
+            max_mark = float(graded.max())
+
+        return SubjectSummary(
+            subject=subject,
+            year=year,
+            total=len(marks),
+            passed=int(np.count_nonzero(graded >= PASS_MARK)),
+            failed=int(np.count_nonzero(graded < PASS_MARK)),
+            mean_mark=mean_mark,
+            min_mark=min_mark,
+            max_mark=max_mark,
+        )
+
+    def get_subject_summary(self, subject: str, year: str) -> SubjectSummary:
+        """Get the statistics of a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            SubjectSummary: Statistics of the subject in the given year.
+        """
+        return self._summary(
+            subject=subject, year=year, rows=self._slice(subject, year)
+        )
+
+    def get_subject_stats(self, subject: str, year: str) -> SubjectStats:
+        """Get the number of students enrolled, passed and failed and the sum
+        of the marks and of their squares of a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            SubjectStats: Stats of the subject, all zero if it does not exist.
+        """
+        marks = self._marks[self._slice(subject=subject, year=year)]
+        graded = marks[~np.isnan(marks)]
+        return SubjectStats(
+            subject=subject,
+            year=year,
+            enrolled=len(marks),
+            passed=int(np.count_nonzero(graded >= PASS_MARK)),
+            failed=int(np.count_nonzero(graded < PASS_MARK)),
+            mark_sum=float(graded.sum()),
+            mark_sum_squares=float(np.dot(graded, graded)),
+        )
+
+    def get_subject_trend(self, subject: str) -> List[SubjectYearTrend]:
+        """Get the figures of a subject on every year it was taught.
+
+        Args:
+            subject (str): Name of the subject to consult.
+
+        Returns:
+            List[SubjectYearTrend]: Figures of each year, in chronological
+                order.
+        """
+        summaries = [
+            self._summary(
+                subject=subject,
+                year=year,
+                rows=self._slice(subject=subject, year=year),
+            )
+            for year in sorted(self._year_codes)
+            if (subject, year) in self._subject_codes
+        ]
+        return [
+            SubjectYearTrend(
+                year=summary.year,
+                enrolled=summary.total,
+                passed=summary.passed,
+                failed=summary.failed,
+                mean_mark=summary.mean_mark,
+            )
+            for summary in summaries
+        ]
+
+    def get_summaries_by_year(self, year: str) -> List[SubjectSummary]:
+        """Get the statistics of every subject taught in a given year.
+
+        Args:
+            year (str): Year to obtain the data from.
+
+        Returns:
+            List[SubjectSummary]: Statistics of each subject taught in the
+                given year, ordered by subject name.
+        """
+        summaries = [
+            self._summary(
+                subject=self._subject_names[code],
+                year=year,
+                rows=slice(self._offsets[code], self._offsets[code + 1]),
+            )
+            for code in self._year_codes.get(year, [])
+        ]
+        return sorted(summaries, key=lambda summary: summary.subject)
+
+    def get_mark_distribution(
+        self,
+        subject: str,
+        year: str,
+        pass_mark: float = PASS_MARK,
+        bins: int = HISTOGRAM_BINS,
+    ) -> MarkDistribution:
+        """Get the mean, standard deviation, percentiles and histogram of the
+        marks of a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+            pass_mark (float): Lowest mark that passes.
+            bins (int): Number of bins of the histogram over MARK_RANGE.
+
+        Returns:
+            MarkDistribution: Distribution of the marks, without students if
+                the subject does not exist.
+        """
+        return compute_distribution(
+            subject=subject,
+            year=year,
+            marks=self._marks[self._slice(subject=subject, year=year)],
+            pass_mark=pass_mark,
+            bins=bins,
+        )
+
+    def get_mark_distributions_by_year(
+        self,
+        year: str,
+        pass_mark: float = PASS_MARK,
+        bins: int = HISTOGRAM_BINS,
+    ) -> List[MarkDistribution]:
+        """Get the distribution of the marks of every subject taught in a
+        given year.
+
+        Args:
+            year (str): Year to obtain the data from.
+            pass_mark (float): Lowest mark that passes.
+            bins (int): Number of bins of the histograms over MARK_RANGE.
+
+        Returns:
+            List[MarkDistribution]: Distribution of each subject taught in
+                the given year, ordered by subject name.
+        """
+        distributions = [
+            compute_distribution(
+                subject=self._subject_names[code],
+                year=year,
+                marks=self._marks[
+                    self._offsets[code] : self._offsets[code + 1]
+                ],
+                pass_mark=pass_mark,
+                bins=bins,
+            )
+            for code in self._year_codes.get(year, [])
+        ]
+        return sorted(
+            distributions, key=lambda distribution: distribution.subject
+        )
+
+    def get_number_passed_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> int:
+        """Get number of students that passed a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            int: Number of students that passed the subject in the given year.
+        """
+        marks = self._marks[self._slice(subject, year)]
+        return int(np.count_nonzero(marks >= PASS_MARK))
+
+    def get_number_failed_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> int:
+        """Get number of students that failed a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            int: Number of students that failed the subject in the given year.
+        """
+        marks = self._marks[self._slice(subject, year)]
+        return int(np.count_nonzero(marks < PASS_MARK))
+
+    def get_number_students_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> int:
+        """Get the number of students that were enrolled on a subject in a
+        given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            int: number of students enrolled on the subject in the given year.
+        """
+        rows = self._slice(subject, year)
+        return int(rows.stop - rows.start)
+
+    def get_list_passed_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> List[str]:
+        """Get list of students that passed a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            List[str]: Names and last names of the students that passed.
+        """
+        rows = self._slice(subject, year)
+        students = self._student_code[rows][self._marks[rows] >= PASS_MARK]
+        return self._student_names[students].tolist()
+
+    def get_list_failed_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> List[str]:
+        """Get list of students that failed a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            List[str]: Names and last names of the students that failed.
+        """
+        rows = self._slice(subject, year)
+        students = self._student_code[rows][self._marks[rows] < PASS_MARK]
+        return self._student_names[students].tolist()
+
+    def get_list_students_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> List[str]:
+        """Get list of students that were enrolled on a subject on a given
+        year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            List[str]: Names and last names of the students enrolled.
+        """
+        students = self._student_code[self._slice(subject, year)]
+        return self._student_names[students].tolist()
+
+    def get_list_subjects_by_year(self, year: str) -> List[str]:
+        """Get the list of subjects taught in a given year.
+
+        Args:
+            year (str): Year to obtain the data from.
+
+        Returns:
+            List[str]: Subjects taught in the given year, in the order they
+                were first stored.
+        """
+        return [
+            self._subject_names[code]
+            for code in self._year_codes.get(year, [])
+        ]
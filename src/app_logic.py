@@ -1,45 +1,366 @@
+import functools
+import inspect
 import os
 import sys
-from typing import List
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Tuple,
+)
 
-from src.database_manager import SchoolDB
+from src.database_manager import (
+    HISTOGRAM_BINS,
+    PASS_MARK,
+    SchoolDB,
+    SheetData,
+    StudentPage,
+    SubjectStats,
+    SubjectSummary,
+    SubjectYearTrend,
+    TranscriptEntry,
+)
+from src.metrics import MetricsRegistry
+from src.query_cache import QueryCache
 
 db_name = os.getenv("DB_NAME")
 db_user = os.getenv("DB_USER")
 db_pass = os.getenv("DB_PASS")
 db_host = os.getenv("DB_HOST")
 db_port = os.getenv("DB_PORT")
+db_pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+db_pool_pre_ping = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+query_backend_name = os.getenv("QUERY_BACKEND", "sql")
+query_cache_size = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+query_cache_ttl = float(os.getenv("QUERY_CACHE_TTL", "300"))
+query_stream_batch_size = int(os.getenv("QUERY_STREAM_BATCH_SIZE", "1000"))
 
 
-school_data_manager = SchoolDB(
-    db_name=db_name,
-    db_user=db_user,
-    db_pass=db_pass,
-    db_host=db_host,
-    db_port=db_port,
-)
+# Database of the program, built by _get_school_data_manager the first time
+# it is needed so that importing this module does not load the driver nor
+# create the engine. It is also available as the school_data_manager
+# attribute of the module.
+_school_data_manager = None
+_school_data_manager_lock = threading.Lock()
+
+# In-memory SchoolAnalytics answering the read queries, None to query the
+# database.
+query_backend = None
+
+query_cache = QueryCache(maxsize=query_cache_size, ttl=query_cache_ttl)
+
+# Registry of the metrics of school_data_manager, None until they are enabled.
+metrics = None
+
+
+def _get_school_data_manager() -> SchoolDB:
+    """Get the database of the program, building it on the first call.
+
+    Returns:
+        SchoolDB: Database configured with the DB_* environment variables.
+    """
+    global _school_data_manager
+    if _school_data_manager is None:
+        with _school_data_manager_lock:
+            if _school_data_manager is None:
+                _school_data_manager = SchoolDB(
+                    db_name=db_name,
+                    db_user=db_user,
+                    db_pass=db_pass,
+                    db_host=db_host,
+                    db_port=db_port,
+                    pool_size=db_pool_size,
+                    max_overflow=db_max_overflow,
+                    pool_pre_ping=db_pool_pre_ping,
+                )
+    return _school_data_manager
+
+
+def __getattr__(name: str):
+    """Build school_data_manager the first time it is accessed."""
+    if name == "school_data_manager":
+        return _get_school_data_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _get_query_backend():
+    """Get what answers the read queries: query_backend or the database."""
+    if query_backend is None:
+        return _get_school_data_manager()
+    return query_backend
+
+
+def _subject_year_scopes(subject: str, year: str, **arguments) -> list:
+    """Get the cache scopes of a query about a subject on a given year."""
+    return [("subject-year", subject, year)]
+
+
+def _year_scopes(year: str, **arguments) -> list:
+    """Get the cache scopes of a query about every subject of a year."""
+    return [("year", year)]
+
+
+def _subject_scopes(subject: str, **arguments) -> list:
+    """Get the cache scopes of a query about a subject on every year."""
+    return [("subject", subject)]
+
+
+def _cached(scopes: Callable[..., list]) -> Callable:
+    """Store the results of the decorated query in query_cache.
+
+    Each call gets its own copy of the lists of the result, so callers can
+    not change the result kept in the cache.
+
+    Args:
+        scopes (Callable[..., list]): Function that receives the arguments of the query and returns the scopes its result depends on.
+
+    Returns:
+        Callable: Decorator of the query function.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            # Keyed on the names too, so that different optional arguments
+            # with the same value are different queries.
+            key = (function.__name__,) + tuple(arguments.items())
+            found, result = query_cache.get(key)
+            if found:
+                return _copy_result(result)
+            generations = query_cache.generations(scopes(**arguments))
+            result = function(*args, **kwargs)
+            query_cache.put(key, result, generations)
+            return _copy_result(result)
+
+        return wrapper
+
+    return decorator
+
+
+def _copy_result(result: Any) -> Any:
+    """Copy the lists of a query result, also those inside its lists and
+    named tuples.
+
+    Args:
+        result (Any): Result of a query.
+
+    Returns:
+        Any: Result equal to the given one that shares no list with it.
+    """
+    if isinstance(result, list):
+        return [_copy_result(item) for item in result]
+    if isinstance(result, tuple) and hasattr(result, "_fields"):
+        return type(result)(*map(_copy_result, result))
+    return result
+
+
+class SubjectReport(NamedTuple):
+    """Pass and fail figures of a subject on a given year.
+
+    Attributes:
+        subject (str): name of the subject.
+        total (int): number of students enrolled.
+        passed (int): number of students that passed.
+        failed (int): number of students that failed.
+        percentage_passed (float): ratio of students that passed, None without students.
+        percentage_failed (float): ratio of students that failed, None without students.
+    """
+
+    subject: str
+    total: int
+    passed: int
+    failed: int
+    percentage_passed: float
+    percentage_failed: float
+
+
+def init_database() -> None:
+    """Create the schema of the database if it does not exist yet."""
+    _get_school_data_manager().create_tables()
+
+
+def set_query_backend(backend: str) -> None:
+    """Select what answers the read queries.
+
+    Args:
+        backend (str): "sql" to query the database or "numpy" to load the data in memory and query it with NumPy.
+    """
+    global query_backend
+    if backend == "numpy":
+        from src.analytics_engine import SchoolAnalytics
+
+        query_backend = SchoolAnalytics(
+            school_data_manager=_get_school_data_manager()
+        )
+    elif backend == "sql":
+        query_backend = None
+    else:
+        raise ValueError(f"Unknown query backend {backend}")
+
+
+def enable_metrics() -> MetricsRegistry:
+    """Start recording the timings, SQL statements and rows of every database operation.
+
+    Returns:
+        MetricsRegistry: Registry where the metrics are recorded.
+    """
+    global metrics
+    if metrics is None:
+        metrics = MetricsRegistry()
+        _get_school_data_manager().enable_metrics(registry=metrics)
+    return metrics
+
+
+def _refresh_query_backend() -> None:
+    """Reload the in-memory query backend after storing new data."""
+    if query_backend is not None:
+        query_backend.refresh()
 
 
 def store_student_data(
     subject_name: str, year: str, student_data: List[list]
 ) -> None:
-    """Call for storing the student data into the db for each element of student_data.
+    """Call for storing the student data of a subject into the db in a single transaction.
 
     Args:
         subject_name (str): name of the subject.
         year (str): year in which the subject has been taught.
         student_data (List[list]): Data of the students of that subject on that given year.
     """
-    for student in student_data:
-        school_data_manager.store_data_in_db(
-            name=student[0],
-            last_name=student[1],
-            mark=student[2],
-            subject=subject_name,
-            year=year,
-        )
+    store_sheets_data(
+        sheets=[
+            SheetData(
+                subject=subject_name, year=year, student_data=student_data
+            )
+        ]
+    )
+
+
+def store_sheets_data(
+    sheets: Iterable[SheetData],
+    incremental: bool = False,
+    source_file: Tuple[str, str] = None,
+    changed_marks: str = None,
+) -> None:
+    """Call for storing the student data of several subjects into the db in a single transaction.
+
+    Args:
+        sheets (Iterable[SheetData]): Data of the students of each subject and year.
+        incremental (bool): Whether the sheets are the new version of data that was already stored.
+        source_file (Tuple[str, str]): Path and content hash of the file the sheets come from.
+        changed_marks (str): "keep" or "update" the stored marks that changed, by default "update" in incremental mode and "keep" otherwise.
+    """
+    stored = []
+    _get_school_data_manager().store_bulk_data_in_db(
+        sheets=_record_sheets(sheets=sheets, stored=stored),
+        batch_size=ingest_batch_size,
+        incremental=incremental,
+        source_file=source_file,
+        changed_marks=changed_marks,
+    )
+    for subject, year in stored:
+        _invalidate_cached_queries(subject=subject, year=year)
+    _refresh_query_backend()
+
+
+def get_ingested_file_hash(path: str) -> str:
+    """Get the content hash of a file the last time it was stored.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        str: Content hash of the file, None if it was never stored.
+    """
+    return _get_school_data_manager().get_ingested_file_hash(path=path)
+
+
+def get_ingested_file_hashes() -> Dict[str, str]:
+    """Get the content hash of each file the last time it was stored.
+
+    Returns:
+        Dict[str, str]: Content hash of each path.
+    """
+    return _get_school_data_manager().get_ingested_file_hashes()
+
+
+def get_ingested_sheet_hashes() -> Dict[Tuple[str, str], str]:
+    """Get the content hash of the sheet of each subject and year the last time it was stored.
+
+    Returns:
+        Dict[Tuple[str, str], str]: Content hash of each subject and year.
+    """
+    return _get_school_data_manager().get_ingested_sheet_hashes()
+
+
+def _record_sheets(
+    sheets: Iterable[SheetData], stored: List[Tuple[str, str]]
+) -> Iterator[SheetData]:
+    """Append the subject and year of each sheet to stored as it is consumed,
+    without keeping the data of the sheet.
+
+    Args:
+        sheets (Iterable[SheetData]): Sheets to be stored.
+        stored (List[Tuple[str, str]]): List where the subject and year of
+            the sheets are appended.
+
+    Yields:
+        SheetData: Next sheet.
+    """
+    for sheet in sheets:
+        stored.append((sheet.subject, sheet.year))
+        yield sheet
+
+
+def _invalidate_cached_queries(subject: str, year: str) -> None:
+    """Drop the cached results that depend on the data of a subject on a given year.
+
+    Args:
+        subject (str): Name of the subject whose data changed.
+        year (str): Year in which the subject was taught.
+    """
+    query_cache.invalidate(
+        _subject_year_scopes(subject=subject, year=year)
+        + _year_scopes(year=year)
+        + _subject_scopes(subject=subject)
+    )
 
 
+def check_subject_stats() -> List[Tuple[SubjectStats, SubjectStats]]:
+    """Rebuild the subject/year statistics table from the enrolments and get where it had drifted.
+
+    Returns:
+        List[Tuple[SubjectStats, SubjectStats]]: Stored and rebuilt statistics of each subject and year that differed.
+    """
+    differences = _get_school_data_manager().rebuild_subject_stats()
+    if differences:
+        query_cache.clear()
+        _refresh_query_backend()
+    return differences
+
+
+def get_cache_stats() -> dict:
+    """Get the counters of the query cache.
+
+    Returns:
+        dict: Number of hits, misses, evictions, invalidations and entries of the cache.
+    """
+    return query_cache.stats()
+
+
+@_cached(scopes=_subject_year_scopes)
 def get_percentage_failed(subject: str, year: str) -> float:
     """Calculate the percentage of students that failed a subject on a given year getting the data from the database.
 
@@ -50,21 +371,17 @@ def get_percentage_failed(subject: str, year: str) -> float:
     Returns:
         float: Percentage of students that failed the subject on year passed as a parameter.
     """
-    failed = school_data_manager.get_number_failed_by_subject_and_year(
-        subject=subject, year=year
-    )
-    total = school_data_manager.get_number_students_by_subject_and_year(
-        subject=subject, year=year
-    )
+    stats = _get_query_backend().get_subject_stats(subject=subject, year=year)
 
     try:
-        percentage = float(failed / total)
+        percentage = float(stats.failed / stats.enrolled)
 
         return percentage
     except ZeroDivisionError:
         sys.stderr.write(f"We do not have data for the pairing subject-year.")
 
 
+@_cached(scopes=_subject_year_scopes)
 def get_percentage_passed(subject: str, year: str) -> float:
     """Calculate the percentage of students that passed a subject on a given year getting the data from the database.
 
@@ -75,21 +392,86 @@ def get_percentage_passed(subject: str, year: str) -> float:
     Returns:
         float: Percentage of students that passed the subject on year passed as a parameter.
     """
-    passed = school_data_manager.get_number_passed_by_subject_and_year(
-        subject=subject, year=year
-    )
-    total = school_data_manager.get_number_students_by_subject_and_year(
-        subject=subject, year=year
-    )
+    stats = _get_query_backend().get_subject_stats(subject=subject, year=year)
 
     try:
-        percentage = float(passed / total)
+        percentage = float(stats.passed / stats.enrolled)
 
         return percentage
     except ZeroDivisionError:
         sys.stderr.write(f"We do not have data for the pairing subject-year.")
 
 
+@_cached(scopes=_subject_year_scopes)
+def get_subject_summary(subject: str, year: str) -> SubjectSummary:
+    """Get the number of students enrolled, passed and failed and the mean, lowest and highest mark of a subject on a given year.
+
+    Args:
+        subject (str): Name of the subject to get the information from.
+        year (str): Year in which the subject was taught.
+
+    Returns:
+        SubjectSummary: Statistics of the subject on the year passed as a parameter.
+    """
+    return _get_query_backend().get_subject_summary(subject=subject, year=year)
+
+
+@_cached(scopes=_subject_year_scopes)
+def get_mark_distribution(
+    subject: str,
+    year: str,
+    pass_mark: float = PASS_MARK,
+    bins: int = HISTOGRAM_BINS,
+):
+    """Get the mean, standard deviation, percentiles (p10, p25, median, p75, p90) and histogram of the marks of a subject on a given year.
+
+    Args:
+        subject (str): Name of the subject to get the information from.
+        year (str): Year in which the subject was taught.
+        pass_mark (float): Lowest mark that passes.
+        bins (int): Number of bins of the histogram of the marks from 0 to 10.
+
+    Returns:
+        MarkDistribution: Distribution of the marks of the subject on the year passed as a parameter.
+    """
+    return _get_query_backend().get_mark_distribution(
+        subject=subject, year=year, pass_mark=pass_mark, bins=bins
+    )
+
+
+@_cached(scopes=_year_scopes)
+def get_mark_distributions_in_year(
+    year: str, pass_mark: float = PASS_MARK, bins: int = HISTOGRAM_BINS
+) -> list:
+    """Get the distribution of the marks of every subject taught in a given year.
+
+    Args:
+        year (str): Year to get the information from.
+        pass_mark (float): Lowest mark that passes.
+        bins (int): Number of bins of the histograms of the marks from 0 to 10.
+
+    Returns:
+        List[MarkDistribution]: Distribution of the marks of each subject, ordered by subject name.
+    """
+    return _get_query_backend().get_mark_distributions_by_year(
+        year=year, pass_mark=pass_mark, bins=bins
+    )
+
+
+@_cached(scopes=_subject_scopes)
+def get_subject_trend(subject: str) -> List[SubjectYearTrend]:
+    """Get the number of students enrolled, passed and failed and the mean mark of a subject on every year it was taught.
+
+    Args:
+        subject (str): Name of the subject to get the information from.
+
+    Returns:
+        List[SubjectYearTrend]: Figures of the subject on each year, in chronological order.
+    """
+    return _get_query_backend().get_subject_trend(subject=subject)
+
+
+@_cached(scopes=_subject_year_scopes)
 def get_list_students_in_subject(subject: str, year: str) -> List[str]:
     """Get a list of students that were enrolled in a subject on a given year.
 
@@ -100,11 +482,61 @@ def get_list_students_in_subject(subject: str, year: str) -> List[str]:
     Returns:
         List[str]: List of students' name and last name that were enrolled in the subject on year passed.
     """
-    return school_data_manager.get_list_students_by_subject_and_year(
+    return _get_query_backend().get_list_students_by_subject_and_year(
         subject=subject, year=year
     )
 
 
+def iter_students_in_subject(
+    subject: str, year: str, outcome: str = None
+) -> Iterator[str]:
+    """Get the students that were enrolled in a subject on a given year as they are read from the database, without loading the whole list.
+
+    Args:
+        subject (str): Name of the subject to get the information from.
+        year (str): Year in which the subject was taught.
+        outcome (str): "passed" or "failed" to get only those students, None to get all of them.
+
+    Returns:
+        Iterator[str]: Students' name and last name.
+    """
+    return _get_school_data_manager().iter_students_by_subject_and_year(
+        subject=subject,
+        year=year,
+        outcome=outcome,
+        batch_size=query_stream_batch_size,
+    )
+
+
+@_cached(scopes=_subject_year_scopes)
+def get_students_page_in_subject(
+    subject: str,
+    year: str,
+    limit: int = 100,
+    after: int = None,
+    outcome: str = None,
+) -> StudentPage:
+    """Get a page of the students that were enrolled in a subject on a given year.
+
+    Args:
+        subject (str): Name of the subject to get the information from.
+        year (str): Year in which the subject was taught.
+        limit (int): Maximum number of students of the page.
+        after (int): next_after of the previous page, None for the first one.
+        outcome (str): "passed" or "failed" to get only those students, None to get all of them.
+
+    Raises:
+        ValueError: Error raised when limit is lower than 1.
+
+    Returns:
+        StudentPage: Students' name and last name and the cursor of the next page.
+    """
+    return _get_school_data_manager().get_page_students_by_subject_and_year(
+        subject=subject, year=year, limit=limit, after=after, outcome=outcome
+    )
+
+
+@_cached(scopes=_subject_year_scopes)
 def get_total_number_students_in_subject(subject: str, year: str) -> int:
     """Get the total number of students that were enrolled in a subject on a given year.
 
@@ -115,11 +547,12 @@ def get_total_number_students_in_subject(subject: str, year: str) -> int:
     Returns:
         int: Total number of students enrolled in the subject on the year passed as a parameter.
     """
-    return school_data_manager.get_number_students_by_subject_and_year(
+    return _get_query_backend().get_number_students_by_subject_and_year(
         subject=subject, year=year
     )
 
 
+@_cached(scopes=_year_scopes)
 def get_list_subjects_in_year(year: str) -> List[str]:
     """Get the list of subject taught in a given year.
 
@@ -129,4 +562,64 @@ def get_list_subjects_in_year(year: str) -> List[str]:
     Returns:
         List[str]: Subjects that where taught in the year passed as parameter.
     """
-    return school_data_manager.get_list_subjects_by_year(year=year)
+    return _get_query_backend().get_list_subjects_by_year(year=year)
+
+
+@_cached(scopes=_year_scopes)
+def get_year_report(year: str) -> List[SubjectReport]:
+    """Get the number and percentage of students that passed and failed each subject taught in a given year.
+
+    Args:
+        year (str): Year from which we want the information.
+
+    Returns:
+        List[SubjectReport]: Figures of each subject taught in the year passed as parameter, ordered by subject name.
+    """
+    report = []
+    for summary in _get_query_backend().get_summaries_by_year(year=year):
+        if summary.total:
+            percentage_passed = float(summary.passed / summary.total)
+            percentage_failed = float(summary.failed / summary.total)
+        else:
+            percentage_passed = percentage_failed = None
+        report.append(
+            SubjectReport(
+                subject=summary.subject,
+                total=summary.total,
+                passed=summary.passed,
+                failed=summary.failed,
+                percentage_passed=percentage_passed,
+                percentage_failed=percentage_failed,
+            )
+        )
+
+    return report
+
+
+def get_student_transcript(name: str, last_name: str) -> List[TranscriptEntry]:
+    """Get the subjects a student is enrolled in, with the year and the mark, from the database.
+
+    Args:
+        name (str): Name of the student.
+        last_name (str): Last name of the student.
+
+    Returns:
+        List[TranscriptEntry]: Subject, year and mark of each enrolment, empty if the student is not in the database.
+    """
+    return _get_school_data_manager().get_transcript(
+        name=name, last_name=last_name
+    )
+
+
+def get_student_transcripts(
+    students: Iterable[Tuple[str, str]]
+) -> Dict[Tuple[str, str], List[TranscriptEntry]]:
+    """Get the subjects each of a batch of students is enrolled in with a single query to the database.
+
+    Args:
+        students (Iterable[Tuple[str, str]]): Name and last name of each student.
+
+    Returns:
+        Dict[Tuple[str, str], List[TranscriptEntry]]: Subject, year and mark of the enrolments of each student.
+    """
+    return _get_school_data_manager().get_transcripts(students=students)
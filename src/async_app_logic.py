@@ -0,0 +1,175 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+from src import app_logic
+from src.database_manager import SchoolDB, SubjectSummary
+
+# Executor running the app_logic functions, created on the first call.
+_executor = None
+
+
+async def _run_in_executor(
+    executor: ThreadPoolExecutor, function: Callable, **kwargs
+) -> Any:
+    """Run a blocking function in executor without blocking the event loop.
+
+    Args:
+        executor (ThreadPoolExecutor): Threads where the function runs.
+        function (Callable): Function to run.
+
+    Returns:
+        Any: Result of the function.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(function, **kwargs)
+    )
+
+
+class AsyncSchoolDB:
+    """Read queries of a SchoolDB that can be awaited.
+
+    SQLAlchemy 1.3 has no asyncio support, so each query runs on the pooled
+    engine of the SchoolDB in a thread of an executor with one thread per
+    connection the pool can open. Many queries can be awaited at once and
+    none of them waits for a connection while holding a thread.
+
+    Attributes:
+        school_data_manager (SchoolDB): Database to query.
+    """
+
+    def __init__(self, school_data_manager: SchoolDB):
+        self._school_data_manager = school_data_manager
+        self._executor = ThreadPoolExecutor(
+            max_workers=school_data_manager.max_connections,
+            thread_name_prefix="async-school-db",
+        )
+
+    async def _run(self, method: str, **kwargs) -> Any:
+        """Await a method of the SchoolDB run in the executor."""
+        return await _run_in_executor(
+            self._executor,
+            getattr(self._school_data_manager, method),
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        """Wait for the running queries and stop the threads."""
+        self._executor.shutdown(wait=True)
+
+    async def get_subject_summary(
+        self, subject: str, year: str
+    ) -> SubjectSummary:
+        """Await SchoolDB.get_subject_summary."""
+        return await self._run(
+            "get_subject_summary", subject=subject, year=year
+        )
+
+    async def get_summaries_by_year(self, year: str) -> List[SubjectSummary]:
+        """Await SchoolDB.get_summaries_by_year."""
+        return await self._run("get_summaries_by_year", year=year)
+
+    async def get_number_students_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> int:
+        """Await SchoolDB.get_number_students_by_subject_and_year."""
+        return await self._run(
+            "get_number_students_by_subject_and_year",
+            subject=subject,
+            year=year,
+        )
+
+    async def get_list_students_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> List[str]:
+        """Await SchoolDB.get_list_students_by_subject_and_year."""
+        return await self._run(
+            "get_list_students_by_subject_and_year", subject=subject, year=year
+        )
+
+    async def get_list_passed_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> List[str]:
+        """Await SchoolDB.get_list_passed_by_subject_and_year."""
+        return await self._run(
+            "get_list_passed_by_subject_and_year", subject=subject, year=year
+        )
+
+    async def get_list_failed_by_subject_and_year(
+        self, subject: str, year: str
+    ) -> List[str]:
+        """Await SchoolDB.get_list_failed_by_subject_and_year."""
+        return await self._run(
+            "get_list_failed_by_subject_and_year", subject=subject, year=year
+        )
+
+    async def get_list_subjects_by_year(self, year: str) -> List[str]:
+        """Await SchoolDB.get_list_subjects_by_year."""
+        return await self._run("get_list_subjects_by_year", year=year)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the executor of the app_logic functions, sized to the pool of
+    app_logic.school_data_manager."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=app_logic.school_data_manager.max_connections,
+            thread_name_prefix="async-app-logic",
+        )
+    return _executor
+
+
+async def _run_app_logic(function_name: str, **kwargs) -> Any:
+    """Await an app_logic function run in the shared executor, so that it
+    uses the query cache and the query backend like the blocking calls."""
+    return await _run_in_executor(
+        _get_executor(), getattr(app_logic, function_name), **kwargs
+    )
+
+
+async def get_percentage_failed(subject: str, year: str) -> float:
+    """Await app_logic.get_percentage_failed."""
+    return await _run_app_logic(
+        "get_percentage_failed", subject=subject, year=year
+    )
+
+
+async def get_percentage_passed(subject: str, year: str) -> float:
+    """Await app_logic.get_percentage_passed."""
+    return await _run_app_logic(
+        "get_percentage_passed", subject=subject, year=year
+    )
+
+
+async def get_subject_summary(subject: str, year: str) -> SubjectSummary:
+    """Await app_logic.get_subject_summary."""
+    return await _run_app_logic(
+        "get_subject_summary", subject=subject, year=year
+    )
+
+
+async def get_list_students_in_subject(subject: str, year: str) -> List[str]:
+    """Await app_logic.get_list_students_in_subject."""
+    return await _run_app_logic(
+        "get_list_students_in_subject", subject=subject, year=year
+    )
+
+
+async def get_total_number_students_in_subject(subject: str, year: str) -> int:
+    """Await app_logic.get_total_number_students_in_subject."""
+    return await _run_app_logic(
+        "get_total_number_students_in_subject", subject=subject, year=year
+    )
+
+
+async def get_list_subjects_in_year(year: str) -> List[str]:
+    """Await app_logic.get_list_subjects_in_year."""
+    return await _run_app_logic("get_list_subjects_in_year", year=year)
+
+
+async def get_year_report(year: str) -> List[app_logic.SubjectReport]:
+    """Await app_logic.get_year_report."""
+    return await _run_app_logic("get_year_report", year=year)
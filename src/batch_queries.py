@@ -0,0 +1,157 @@
+import json
+import math
+from typing import Any, TextIO
+
+from src import app_logic
+
+# Function of app_logic that answers each operation and whether it needs the
+# subject besides the year.
+OPERATIONS = {
+    "percentage_failed": ("get_percentage_failed", True),
+    "percentage_passed": ("get_percentage_passed", True),
+    "total_students": ("get_total_number_students_in_subject", True),
+    "list_students": ("get_list_students_in_subject", True),
+    "subject_summary": ("get_subject_summary", True),
+    "mark_distribution": ("get_mark_distribution", True),
+    "list_subjects": ("get_list_subjects_in_year", False),
+    "year_report": ("get_year_report", False),
+    "year_distribution": ("get_mark_distributions_in_year", False),
+}
+# Optional arguments that each operation passes to its function.
+OPTIONAL_ARGUMENTS = {
+    "mark_distribution": ("pass_mark", "bins"),
+    "year_distribution": ("pass_mark", "bins"),
+}
+# Largest number of bins of the histograms of a query.
+MAX_HISTOGRAM_BINS = 1000
+
+
+def run_batch(queries: TextIO, output: TextIO) -> int:
+    """Answer every query of a JSON Lines stream and write each result as a
+    JSON line as soon as it is available.
+
+    Each query is an object with the keys "operation", "year" and, for the
+    operations about a subject, "subject", and the optional arguments of its
+    operation in OPTIONAL_ARGUMENTS. Queries that can not be answered, or
+    with any other key, produce a line with an "error" key instead of
+    stopping the batch.
+
+    Args:
+        queries (TextIO): Stream with one JSON query per line.
+        output (TextIO): Stream where the results are written.
+
+    Returns:
+        int: Number of queries answered.
+    """
+    answered = 0
+    for line in queries:
+        if not line.strip():
+            continue
+        response = _answer_query(line=line)
+        output.write(json.dumps(response) + "\n")
+        output.flush()
+        answered += 1
+
+    return answered
+
+
+def _answer_query(line: str) -> dict:
+    """Parse a query and call the app_logic function of its operation.
+
+    Args:
+        line (str): JSON object with the query.
+
+    Returns:
+        dict: Query with its result, or with the error that prevented
+            answering it.
+    """
+    try:
+        query = json.loads(line)
+    except ValueError as error:
+        return {"error": f"Invalid JSON: {error}"}
+
+    return answer_query(query=query)
+
+
+def answer_query(query: Any) -> dict:
+    """Call the app_logic function of the operation of a parsed query.
+
+    Args:
+        query (Any): Parsed JSON query.
+
+    Returns:
+        dict: Query with its result, or with the error that prevented
+            answering it.
+    """
+    if not isinstance(query, dict):
+        return {"error": "The query must be a JSON object"}
+
+    operation = query.get("operation")
+    if operation not in OPERATIONS:
+        return dict(query, error=f"Unknown operation {operation}")
+    function_name, needs_subject = OPERATIONS[operation]
+    arguments = {"year": query.get("year")}
+    if needs_subject:
+        arguments["subject"] = query.get("subject")
+    if any(value is None for value in arguments.values()):
+        return dict(query, error=f"Missing {', '.join(arguments)}")
+    optional = OPTIONAL_ARGUMENTS.get(operation, ())
+    unknown = sorted(set(query) - {"operation", *arguments, *optional})
+    if unknown:
+        return dict(query, error=f"Unknown keys {', '.join(unknown)}")
+    for name in optional:
+        if name in query:
+            arguments[name] = query[name]
+    error = _validate_optional_arguments(arguments=arguments)
+    if error is not None:
+        return dict(query, error=error)
+
+    try:
+        result = getattr(app_logic, function_name)(**arguments)
+    except Exception as error:
+        return dict(query, error=str(error))
+
+    return dict(query, result=_to_json(result))
+
+
+def _validate_optional_arguments(arguments: dict) -> str:
+    """Check the optional arguments of a query.
+
+    Args:
+        arguments (dict): Arguments of the app_logic function.
+
+    Returns:
+        str: Error of the first argument that is not valid, None if all of
+            them are.
+    """
+    bins = arguments.get("bins", 1)
+    if (
+        not isinstance(bins, int)
+        or isinstance(bins, bool)
+        or not 1 <= bins <= MAX_HISTOGRAM_BINS
+    ):
+        return f"bins must be an integer from 1 to {MAX_HISTOGRAM_BINS}"
+    pass_mark = arguments.get("pass_mark", 0.0)
+    if (
+        not isinstance(pass_mark, (int, float))
+        or isinstance(pass_mark, bool)
+        or not math.isfinite(pass_mark)
+    ):
+        return "pass_mark must be a finite number"
+    return None
+
+
+def _to_json(result: Any) -> Any:
+    """Convert the named tuples of a result to dictionaries.
+
+    Args:
+        result (Any): Result of an app_logic function.
+
+    Returns:
+        Any: Result that can be serialized as JSON.
+    """
+    if hasattr(result, "_asdict"):
+        return result._asdict()
+    if isinstance(result, list):
+        return [_to_json(element) for element in result]
+    return result
@@ -5,17 +5,18 @@ class Error(Exception):
 
 
 class NotAnExcelFileError(Error):
-    """Raise when the input file is not an Excel file.
+    """Raise when the input file is not an Excel, CSV or TSV file.
 
     Attributes:
         file (str): input file that caused the error.
     """
 
     def __init__(self, file):
+        super().__init__(file)
         self._file = file
 
     def __str__(self):
-        return f"The file {self._file} is not an Excel file"
+        return f"The file {self._file} is not an Excel, CSV or TSV file"
 
 
 class WrongOrderOfColumns(Error):
@@ -26,6 +27,7 @@ class WrongOrderOfColumns(Error):
     """
 
     def __init__(self, sheet):
+        super().__init__(sheet)
         self._sheet = sheet
 
     def __str__(self):
@@ -41,8 +43,27 @@ class WrongSheetName(Error):
     """
 
     def __init__(self, sheet):
+        super().__init__(sheet)
         self._sheet = sheet
 
     def __str__(self):
         return f"Name of sheet {self._sheet} is incorrect.\n \
             The name should be 'subject course year'"
+
+
+class WrongRowData(Error):
+    """Raise when a row of the sheet does not contain valid student data.
+
+    Attributes:
+        sheet: sheet that contains the row.
+        row_index (int): index of the row in the sheet.
+    """
+
+    def __init__(self, sheet, row_index):
+        super().__init__(sheet, row_index)
+        self._sheet = sheet
+        self._row_index = row_index
+
+    def __str__(self):
+        return f"Row {self._row_index} of sheet {self._sheet} is incorrect.\n \
+            It should contain a name, a last name and a numeric mark."
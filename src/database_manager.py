@@ -1,14 +1,51 @@
+import inspect
+import math
 import sys
-from typing import List
+import time
+from itertools import islice
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Sequence,
+    Set,
+    Tuple,
+)
 import sqlalchemy
-from sqlalchemy import Column, Integer, String, ForeignKey, Float
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, tuple_
+from sqlalchemy import Index, event, func, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload, sessionmaker, relationship
 from sqlalchemy import create_engine
+from sqlalchemy.engine.url import URL
 from sqlalchemy.ext.declarative import declarative_base
 from contextlib import contextmanager
 
+from src.metrics import MetricsRegistry
+from src.student_batch import StudentBatch
+
 Base = declarative_base()
 
+# Minimum mark a student needs to pass a subject.
+PASS_MARK = 5
+# Range of the marks and default number of bins of their histograms.
+MARK_RANGE = (0.0, 10.0)
+HISTOGRAM_BINS = 10
+
+# What to do with the mark of an enrolment that is stored again with a
+# different mark: keep the stored one or overwrite it.
+KEEP_STORED_MARKS = "keep"
+UPDATE_STORED_MARKS = "update"
+
+# Outcome of the students to get from the queries of lists of students.
+PASSED = "passed"
+FAILED = "failed"
+
+# Public methods of SchoolDB that are not measured when metrics are enabled.
+_NOT_MEASURED = {"enable_metrics", "session_scope", "dispose"}
+
 
 class StudentSubject(Base):
     __tablename__ = "student_subject"
@@ -22,6 +59,10 @@ class StudentSubject(Base):
     subject = relationship(
         "Subject",  # back_populates='students', cascade='all, delete',
     )
+    __table_args__ = (
+        Index("ix_student_subject_subject_id_mark", "subject_id", "mark"),
+        Index("ix_student_subject_student_id", "student_id"),
+    )
 
 
 class Student(Base):
@@ -32,6 +73,9 @@ class Student(Base):
     subjects = relationship(
         "StudentSubject",  # back_populates='subject', cascade='all, delete',
     )
+    __table_args__ = (
+        Index("ix_student_name_last_name", "name", "last_name", unique=True),
+    )
 
 
 class Subject(Base):
@@ -41,16 +85,268 @@ class Subject(Base):
     natural_year = Column(
         String(50)
     )  # year in which the subject is taken (p.e. 2019-2020)
+    __table_args__ = (
+        Index(
+            "ix_subject_name_natural_year", "name", "natural_year", unique=True
+        ),
+    )
+
+
+class SubjectYearStats(Base):
+    """Enrolment figures of each subject and year, kept up to date in the
+    transactions that write the enrolments."""
+
+    __tablename__ = "subject_year_stats"
+    subject = Column(String(50), primary_key=True)
+    natural_year = Column(String(50), primary_key=True)
+    enrolled = Column(Integer, nullable=False, default=0)
+    passed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    mark_sum = Column(Float, nullable=False, default=0)
+    mark_sum_squares = Column(Float, nullable=False, default=0)
+
+
+class IngestedFile(Base):
+    __tablename__ = "ingested_file"
+    path = Column(String(255), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+
+
+class IngestedSheet(Base):
+    __tablename__ = "ingested_sheet"
+    subject = Column(String(50), primary_key=True)
+    natural_year = Column(String(50), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+
+
+# Statements that merge the rows of {table} that share the values of
+# {columns} into the one with the lowest id before adding the unique index.
+# Enrolments of the merged rows are moved to the row that is kept, dropping
+# the ones that would become duplicated.
+_MERGE_DUPLICATES = [
+    """CREATE TEMPORARY TABLE {table}_map ON COMMIT DROP AS
+    SELECT id, min(id) OVER (PARTITION BY {columns}) AS keep_id FROM {table}""",
+    """DELETE FROM student_subject AS enrolment USING (
+        SELECT enrolment.ctid AS row_id, row_number() OVER (
+            PARTITION BY map.keep_id, enrolment.{other_fk}
+            ORDER BY enrolment.{fk}
+        ) AS position
+        FROM student_subject AS enrolment
+        JOIN {table}_map AS map ON map.id = enrolment.{fk}
+    ) AS duplicate
+    WHERE enrolment.ctid = duplicate.row_id AND duplicate.position > 1""",
+    """UPDATE student_subject AS enrolment SET {fk} = map.keep_id
+    FROM {table}_map AS map
+    WHERE enrolment.{fk} = map.id AND map.id <> map.keep_id""",
+    """DELETE FROM {table} USING {table}_map AS map
+    WHERE {table}.id = map.id AND map.id <> map.keep_id""",
+]
+
+
+class SheetData(NamedTuple):
+    """Data of the students enrolled in a subject on a given year.
+
+    Attributes:
+        subject (str): name of the subject.
+        year (str): year in which the subject has been taught.
+        student_data (Iterable[Sequence]): name, last name and mark of each
+            student, a StudentBatch once the sheet has been parsed whole.
+        content_hash (str): hash of the content of the sheet the data comes
+            from, recorded in the ingest manifest when given.
+    """
+
+    subject: str
+    year: str
+    student_data: Iterable[Sequence]
+    content_hash: str = None
+
+
+class SubjectSummary(NamedTuple):
+    """Statistics of the marks of a subject on a given year.
+
+    Attributes:
+        subject (str): name of the subject.
+        year (str): year in which the subject has been taught.
+        total (int): number of students enrolled.
+        passed (int): number of students that passed.
+        failed (int): number of students that failed.
+        mean_mark (float): mean of the marks, None without students.
+        min_mark (float): lowest mark, None without students.
+        max_mark (float): highest mark, None without students.
+    """
+
+    subject: str
+    year: str
+    total: int
+    passed: int
+    failed: int
+    mean_mark: float
+    min_mark: float
+    max_mark: float
+
+
+class TranscriptEntry(NamedTuple):
+    """Enrolment of a student in a subject on a given year.
+
+    Attributes:
+        subject (str): name of the subject.
+        year (str): year in which the subject has been taught.
+        mark (float): mark of the student.
+    """
+
+    subject: str
+    year: str
+    mark: float
+
+
+class SubjectStats(NamedTuple):
+    """Figures of subject_year_stats for a subject on a given year.
+
+    Attributes:
+        subject (str): name of the subject.
+        year (str): year in which the subject was taught.
+        enrolled (int): number of students enrolled.
+        passed (int): number of students that passed.
+        failed (int): number of students that failed.
+        mark_sum (float): sum of the marks.
+        mark_sum_squares (float): sum of the squares of the marks.
+    """
+
+    subject: str
+    year: str
+    enrolled: int
+    passed: int
+    failed: int
+    mark_sum: float
+    mark_sum_squares: float
+
+
+# Columns of subject_year_stats that are added up.
+_STATS_COLUMNS = (
+    "enrolled",
+    "passed",
+    "failed",
+    "mark_sum",
+    "mark_sum_squares",
+)
+
+
+def _new_stats_delta() -> Dict[str, float]:
+    """Get a change of the stats of a subject that changes nothing."""
+    return dict.fromkeys(_STATS_COLUMNS, 0)
+
+
+def _add_mark_to_stats_delta(
+    delta: Dict[str, float], mark: float, sign: int
+) -> None:
+    """Add (sign 1) or remove (sign -1) an enrolment with mark to delta.
+
+    Args:
+        delta (Dict[str, float]): Change of the stats of a subject.
+        mark (float): Mark of the enrolment.
+        sign (int): 1 to add the enrolment, -1 to remove it.
+    """
+    delta["enrolled"] += sign
+    if mark is None:
+        return
+    delta["passed" if mark >= PASS_MARK else "failed"] += sign
+    delta["mark_sum"] += sign * mark
+    delta["mark_sum_squares"] += sign * mark * mark
+
+
+def _same_stats(first: SubjectStats, second: SubjectStats) -> bool:
+    """Check if two stats are equal, allowing for the rounding of the sums.
+
+    Args:
+        first (SubjectStats): Stats, or None.
+        second (SubjectStats): Stats, or None.
+
+    Returns:
+        bool: Whether they are equal.
+    """
+    if first is None or second is None:
+        return first is second
+    return first[:5] == second[:5] and all(
+        math.isclose(first_sum, second_sum, rel_tol=1e-9, abs_tol=1e-6)
+        for first_sum, second_sum in zip(first[5:], second[5:])
+    )
+
+
+class SubjectYearTrend(NamedTuple):
+    """Pass and fail figures of a subject on one of the years it was taught.
+
+    Attributes:
+        year (str): year in which the subject has been taught.
+        enrolled (int): number of students enrolled.
+        passed (int): number of students that passed.
+        failed (int): number of students that failed.
+        mean_mark (float): mean of the marks, None without marks.
+    """
+
+    year: str
+    enrolled: int
+    passed: int
+    failed: int
+    mean_mark: float
+
+
+class StudentPage(NamedTuple):
+    """Page of a list of students.
+
+    Attributes:
+        students (List[str]): name and last name of each student of the page.
+        next_after (int): cursor to pass as after to get the next page, None
+            if this is the last one.
+    """
+
+    students: List[str]
+    next_after: int
+
+
+def _batches(
+    students: Iterable[Sequence], batch_size: int
+) -> Iterator[StudentBatch]:
+    """Split the data of students in batches of at most batch_size students.
+
+    A StudentBatch is split in slices of its columns instead of being read
+    row by row.
+
+    Args:
+        students (Iterable[Sequence]): Name, last name and mark of each
+            student.
+        batch_size (int): Maximum number of students of each batch.
+
+    Yields:
+        StudentBatch: Next batch of students.
+    """
+    if isinstance(students, StudentBatch):
+        for start in range(0, len(students), batch_size):
+            yield students[start : start + batch_size]
+        return
+    iterator = iter(students)
+    batch = StudentBatch(rows=islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = StudentBatch(rows=islice(iterator, batch_size))
+
+
+def _check_changed_marks(changed_marks: str) -> None:
+    """Check that changed_marks is KEEP_STORED_MARKS or UPDATE_STORED_MARKS.
+
+    Args:
+        changed_marks (str): Policy for the marks that changed.
+
+    Raises:
+        ValueError: Error raised when the policy is not valid.
+    """
+    if changed_marks not in (KEEP_STORED_MARKS, UPDATE_STORED_MARKS):
+        raise ValueError(f"Unknown policy for changed marks {changed_marks}")
 
 
 @contextmanager
-def session_scope(user, password, host, port, db_name):
+def session_scope(session_factory: sessionmaker):
     """Provide a transactional scope around a series of operations."""
-    connection_url = f"postgresql://{user}:{password}@{host}:{port}/{db_name}"
-    engine = create_engine(connection_url)
-    Session = sessionmaker(engine)
-    session = Session()
-    Base.metadata.create_all(engine)
+    session = session_factory()
     try:
         yield session
         session.commit()
@@ -64,20 +360,181 @@ def session_scope(user, password, host, port, db_name):
 class SchoolDB:
     """Class to do all the operations on the database.
 
+    The engine (and its connection pool) is created once per instance and
+    shared by every operation, so each query only pays for checking out a
+    connection from the pool.
+
     Attributes:
         db_user (str): username of the database.
         db_pass (str): password for the database.
-        db_host (str): host to connect to the database.
-        db_port (str): port to connect to the database.
+        db_host (str): host to connect to the database, empty to use the
+            default of libpq (for example a socket directory in PGHOST).
+        db_port (str): port to connect to the database, empty for the default.
         db_name (str): name of the database to conect to.
+        pool_size (int): number of connections kept open in the pool.
+        max_overflow (int): connections allowed on top of pool_size.
+        pool_pre_ping (bool): whether to test connections on checkout.
     """
 
-    def __init__(self, db_user, db_pass, db_host, db_port, db_name):
+    def __init__(
+        self,
+        db_user,
+        db_pass,
+        db_host,
+        db_port,
+        db_name,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_pre_ping: bool = True,
+    ):
         self._user = db_user
         self._password = db_pass
         self._host = db_host
         self._port = db_port
         self._db_name = db_name
+        connection_url = URL(
+            drivername="postgresql",
+            username=db_user,
+            password=db_pass,
+            host=db_host or None,
+            port=db_port or None,
+            database=db_name,
+        )
+        self._engine = create_engine(
+            connection_url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=pool_pre_ping,
+        )
+        self._session_factory = sessionmaker(self._engine)
+        self._max_connections = pool_size + max_overflow
+        self._metrics = None
+
+    @property
+    def max_connections(self) -> int:
+        """Maximum number of connections the pool opens at the same time."""
+        return self._max_connections
+
+    def enable_metrics(self, registry: MetricsRegistry) -> None:
+        """Record in registry the wall time of each public method, the SQL
+        statements it runs and the rows they return, and the time spent
+        acquiring connections.
+
+        Nothing is measured until it is called, so the instances without
+        metrics do not pay for them.
+
+        Args:
+            registry (MetricsRegistry): Registry where the metrics are recorded.
+        """
+        if self._metrics is not None:
+            return
+        self._metrics = registry
+        for name, method in inspect.getmembers(type(self), inspect.isfunction):
+            if name.startswith("_") or name in _NOT_MEASURED:
+                continue
+            setattr(self, name, registry.wrap(name, getattr(self, name)))
+        event.listen(
+            self._engine, "after_cursor_execute", self._record_statement
+        )
+
+    def _record_statement(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        """Count a statement executed by the engine in the metrics.
+
+        The rows of the results streamed through a server-side cursor are
+        not known when it is executed and are not counted.
+        """
+        server_side = getattr(cursor, "name", None) is not None
+        self._metrics.record_statement(
+            rows=None if server_side else cursor.rowcount
+        )
+
+    def _measured_session(self) -> sqlalchemy.orm.session.Session:
+        """Create a session acquiring its connection and recording how long
+        it took in the metrics.
+
+        Returns:
+            sqlalchemy.orm.session.Session: Session with its connection.
+        """
+        session = self._session_factory()
+        start = time.perf_counter()
+        session.connection()
+        self._metrics.record_connection(seconds=time.perf_counter() - start)
+        return session
+
+    def create_tables(self) -> None:
+        """Create the tables of the schema that do not exist yet and migrate
+        the ones created by older versions.
+
+        It has to be called once before the first operation on a new
+        database.
+        """
+        stats_missing = not self._engine.has_table(
+            SubjectYearStats.__tablename__
+        )
+        Base.metadata.create_all(self._engine)
+        with self._engine.begin() as connection:
+            merged = self._add_missing_indexes(connection=connection)
+            if stats_missing or merged:
+                self._rebuild_subject_stats(connection=connection)
+
+    @staticmethod
+    def _add_missing_indexes(connection: sqlalchemy.engine.Connection) -> bool:
+        """Create the indexes of the schema missing on tables created before
+        they were defined, merging the duplicated rows of unique indexes.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Connection to the db.
+
+        Returns:
+            bool: Whether duplicated rows may have been merged.
+        """
+        merged = False
+        inspector = sqlalchemy.inspect(connection)
+        for table, fk, other_fk in (
+            (Student.__table__, "student_id", "subject_id"),
+            (Subject.__table__, "subject_id", "student_id"),
+            (StudentSubject.__table__, None, None),
+        ):
+            existing = {
+                index["name"] for index in inspector.get_indexes(table.name)
+            }
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if index.unique:
+                    merged = True
+                    for statement in _MERGE_DUPLICATES:
+                        connection.execute(
+                            text(
+                                statement.format(
+                                    table=table.name,
+                                    columns=", ".join(
+                                        column.name for column in index.columns
+                                    ),
+                                    fk=fk,
+                                    other_fk=other_fk,
+                                )
+                            )
+                        )
+                index.create(connection)
+        return merged
+
+    def session_scope(self):
+        """Provide a transactional scope using the pooled engine of the
+        instance.
+
+        Returns:
+            Context manager that yields a sqlalchemy.orm.session.Session.
+        """
+        if self._metrics is None:
+            return session_scope(session_factory=self._session_factory)
+        return session_scope(session_factory=self._measured_session)
+
+    def dispose(self) -> None:
+        """Close all the connections of the pool."""
+        self._engine.dispose()
 
     def _get_or_create_student(
         self,
@@ -96,18 +553,15 @@ class SchoolDB:
         Returns:
             Student: Student entry of the table, either the one obtained or the one created.
         """
-        if not self._student_on_db(
-            name=name, last_name=last_name, session=session
-        ):
-            new_student = Student(name=name, last_name=last_name)
-            session.add(new_student)
-        else:
-            new_student = (
-                session.query(Student)
-                .filter(Student.name == name, Student.last_name == last_name)
-                .first()
-            )
-        return new_student
+        student = (
+            session.query(Student)
+            .filter(Student.name == name, Student.last_name == last_name)
+            .one_or_none()
+        )
+        if student is None:
+            student = Student(name=name, last_name=last_name)
+            session.add(student)
+        return student
 
     @staticmethod
     def _student_on_db(
@@ -143,16 +597,13 @@ class SchoolDB:
         Returns:
             Subject: Subject entry of the table, either created or obtained.
         """
-        if not self._subject_on_db(
-            subject=subject, year=year, session=session
-        ):
+        new_subject = (
+            session.query(Subject)
+            .filter(Subject.name == subject, Subject.natural_year == year)
+            .one_or_none()
+        )
+        if new_subject is None:
             new_subject = Subject(name=subject, natural_year=year)
-        else:
-            new_subject = (
-                session.query(Subject)
-                .filter(Subject.name == subject, Subject.natural_year == year,)
-                .first()
-            )
         return new_subject
 
     @staticmethod
@@ -176,76 +627,595 @@ class SchoolDB:
             != 0
         )
 
-    @staticmethod
-    def _student_subject_on_db(
+    def store_data_in_db(
+        self,
         name: str,
         last_name: str,
         subject: str,
         year: str,
         mark: float,
-        session: sqlalchemy.orm.session.Session,
-    ) -> bool:
-        """Check if the pairing student-subject already exists in the db.
+        changed_marks: str = KEEP_STORED_MARKS,
+    ) -> None:
+        """Store the data in the db after checking that it does not already
+        exist.
+
+        The enrolment is looked up by the primary key of the student and the
+        subject, so a mark different from the stored one is either kept or
+        updated depending on changed_marks instead of failing.
 
         Args:
-            name (str): Name of the student to check.
-            last_name (str): Last name of the student to check.
-            subject (str): Name of the subject to check.
-            year (str): Year when the student took the subject, to check.
-            mark (float): Mark the student has on the subject, to check.
+            name (str): Name of the student to add to the db.db.
+            year (str): Year when the student took the subject to add to the db.
+            mark (float): Mark the student got on the subject to add to the db.
+            changed_marks (str): KEEP_STORED_MARKS or UPDATE_STORED_MARKS.
+
+        Raises:
+            ValueError: Error raised when changed_marks is not valid.
+        """
+        _check_changed_marks(changed_marks=changed_marks)
+        with self.session_scope() as session:
+            new_student = self._get_or_create_student(
+                name=name, last_name=last_name, session=session
+            )
+            new_subject = self._get_or_create_subject(
+                subject=subject, year=year, session=session
+            )
+            enrolment = None
+            if new_student.id is not None and new_subject.id is not None:
+                enrolment = session.query(StudentSubject).get(
+                    (new_subject.id, new_student.id)
+                )
+            delta = _new_stats_delta()
+            if enrolment is None:
+                student_subject = StudentSubject(mark=mark)
+                student_subject.subject = new_subject
+                new_student.subjects.append(student_subject)
+                _add_mark_to_stats_delta(delta=delta, mark=mark, sign=1)
+            elif (
+                changed_marks == UPDATE_STORED_MARKS and enrolment.mark != mark
+            ):
+                _add_mark_to_stats_delta(
+                    delta=delta, mark=enrolment.mark, sign=-1
+                )
+                _add_mark_to_stats_delta(delta=delta, mark=mark, sign=1)
+                enrolment.mark = mark
+            self._add_subject_stats(
+                subject=subject, year=year, delta=delta, session=session
+            )
+
+    def store_bulk_data_in_db(
+        self,
+        sheets: Iterable[SheetData],
+        batch_size: int = 1000,
+        incremental: bool = False,
+        source_file: Tuple[str, str] = None,
+        changed_marks: str = None,
+    ) -> None:
+        """Store the data of several sheets in a single transaction.
+
+        Students and subjects are resolved with one query per batch instead
+        of one per row, and the enrolments of each batch are inserted with a
+        single statement. The marks already stored for each subject are
+        loaded once, so rows that are already stored with the same mark, or
+        repeated in the sheet, are dropped in memory. What happens to the
+        stored enrolments whose mark changed is decided by changed_marks;
+        by default they are updated in incremental mode and kept otherwise.
+
+        The hashes of the sheets and of source_file are recorded in the
+        ingest manifest in the same transaction, except for the sheets with a
+        changed mark that was kept, and for source_file if there is any, so
+        that a later incremental run does not skip them.
+
+        Args:
+            sheets (Iterable[SheetData]): Data of each subject and year to
+                add to the db.
+            batch_size (int): Number of rows written per statement.
+            incremental (bool): Whether the sheets are the new version of
+                data that was already stored.
+            source_file (Tuple[str, str]): Path and content hash of the file
+                the sheets come from.
+            changed_marks (str): KEEP_STORED_MARKS or UPDATE_STORED_MARKS.
+
+        Raises:
+            ValueError: Error raised when changed_marks is not valid.
+        """
+        if changed_marks is None:
+            changed_marks = (
+                UPDATE_STORED_MARKS if incremental else KEEP_STORED_MARKS
+            )
+        _check_changed_marks(changed_marks=changed_marks)
+        update_marks = changed_marks == UPDATE_STORED_MARKS
+        with self.session_scope() as session:
+            # The rows shared with other transactions are written last, in a
+            # fixed order, so that they stay locked for as little as possible.
+            deltas = {}
+            rebuilt_subjects = {}
+            sheet_hashes = {}
+            # Sheets with a changed mark that was kept, whose hash must not be
+            # recorded since what is stored is not their content.
+            partially_stored = set()
+            for sheet in sheets:
+                subject_id = self._get_or_create_ids(
+                    table=Subject.__table__,
+                    columns=("name", "natural_year"),
+                    keys={(sheet.subject, sheet.year)},
+                    session=session,
+                )[(sheet.subject, sheet.year)]
+                stored_marks = self._get_stored_marks(
+                    subject_id=subject_id, session=session
+                )
+                seen = set()
+                delta = deltas.setdefault(
+                    (sheet.subject, sheet.year), _new_stats_delta()
+                )
+                for batch in _batches(sheet.student_data, batch_size):
+                    changed = StudentBatch()
+                    for name, last_name, mark in batch:
+                        key = (name, last_name)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        if key in stored_marks and (
+                            stored_marks[key] == mark or not update_marks
+                        ):
+                            if stored_marks[key] != mark:
+                                partially_stored.add(
+                                    (sheet.subject, sheet.year)
+                                )
+                            continue
+                        changed.append(
+                            name=name, last_name=last_name, mark=mark
+                        )
+                    if not changed:
+                        continue
+                    written = self._store_enrolment_batch(
+                        subject_id=subject_id,
+                        batch=changed,
+                        session=session,
+                        update_marks=update_marks,
+                    )
+                    for key, mark, inserted in written:
+                        if not inserted:
+                            if key not in stored_marks:
+                                # Inserted by another transaction after the
+                                # marks were loaded.
+                                rebuilt_subjects[
+                                    (sheet.subject, sheet.year)
+                                ] = subject_id
+                                continue
+                            _add_mark_to_stats_delta(
+                                delta=delta, mark=stored_marks[key], sign=-1
+                            )
+                        _add_mark_to_stats_delta(
+                            delta=delta, mark=mark, sign=1
+                        )
+                if sheet.content_hash is not None:
+                    sheet_hashes[
+                        (sheet.subject, sheet.year)
+                    ] = sheet.content_hash
+            for (subject, year), delta in sorted(deltas.items()):
+                if (subject, year) in rebuilt_subjects:
+                    self._rebuild_subject_stats(
+                        connection=session.connection(),
+                        subject_id=rebuilt_subjects[(subject, year)],
+                    )
+                else:
+                    self._add_subject_stats(
+                        subject=subject,
+                        year=year,
+                        delta=delta,
+                        session=session,
+                    )
+            for (subject, year), content_hash in sorted(sheet_hashes.items()):
+                if (subject, year) in partially_stored:
+                    continue
+                self._upsert(
+                    table=IngestedSheet.__table__,
+                    values={
+                        "subject": subject,
+                        "natural_year": year,
+                        "content_hash": content_hash,
+                    },
+                    session=session,
+                )
+            if source_file is not None and not partially_stored:
+                path, content_hash = source_file
+                self._upsert(
+                    table=IngestedFile.__table__,
+                    values={"path": path, "content_hash": content_hash},
+                    session=session,
+                )
+
+    @staticmethod
+    def _get_stored_marks(
+        subject_id: int, session: sqlalchemy.orm.session.Session
+    ) -> Dict[Tuple[str, str], float]:
+        """Get the mark of every student enrolled in a subject.
+
+        Args:
+            subject_id (int): Id of the subject.
             session (sqlalchemy.orm.session.Session): Session to connect to the db.
 
         Returns:
-            bool: Whether the pairing student-subject already exists in db.
+            Dict[Tuple[str, str], float]: Mark of each name and last name.
         """
-        return (
-            session.query(Student)
+        return {
+            (name, last_name): mark
+            for name, last_name, mark in session.query(
+                Student.name, Student.last_name, StudentSubject.mark
+            )
             .join(StudentSubject, Student.id == StudentSubject.student_id)
-            .join(Subject, StudentSubject.subject_id == Subject.id)
-            .filter(
-                Student.name == name,
-                Student.last_name == last_name,
-                Subject.name == subject,
-                Subject.natural_year == year,
-                StudentSubject.mark == mark,
+            .filter(StudentSubject.subject_id == subject_id)
+        }
+
+    @staticmethod
+    def _upsert(
+        table: sqlalchemy.Table,
+        values: dict,
+        session: sqlalchemy.orm.session.Session,
+    ) -> None:
+        """Insert a row or update it if its primary key already exists.
+
+        Args:
+            table (sqlalchemy.Table): Table where the row is stored.
+            values (dict): Values of the columns of the row.
+            session (sqlalchemy.orm.session.Session): Session to connect to the db.
+        """
+        statement = insert(table).values(values)
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[column.name for column in table.primary_key],
+                set_={
+                    column: statement.excluded[column]
+                    for column in values
+                    if not table.c[column].primary_key
+                },
             )
-            .count()
         )
 
-    def store_data_in_db(
-        self, name: str, last_name: str, subject: str, year: str, mark: float,
+    @staticmethod
+    def _add_subject_stats(
+        subject: str,
+        year: str,
+        delta: Dict[str, float],
+        session: sqlalchemy.orm.session.Session,
     ) -> None:
-        """Store the data in the db after checking that it does not already
-        exist.
+        """Add delta to the stats of a subject, creating them if needed.
 
         Args:
-            name (str): Name of the student to add to the db.db.
-            year (str): Year when the student took the subject to add to the db.
-            mark (float): Mark the student got on the subject to add to the db.
+            subject (str): Name of the subject.
+            year (str): Year the subject was taught.
+            delta (Dict[str, float]): Change of each column of the stats.
+            session (sqlalchemy.orm.session.Session): Session to connect to the db.
         """
-        with session_scope(
-            user=self._user,
-            password=self._password,
-            host=self._host,
-            port=self._port,
-            db_name=self._db_name,
-        ) as session:
-            new_student = self._get_or_create_student(
-                name=name, last_name=last_name, session=session
+        table = SubjectYearStats.__table__
+        statement = insert(table).values(
+            subject=subject, natural_year=year, **delta
+        )
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["subject", "natural_year"],
+                set_={
+                    column: table.c[column] + statement.excluded[column]
+                    for column in _STATS_COLUMNS
+                },
             )
-            student_subject = StudentSubject(mark=mark)
-            student_subject.subject = self._get_or_create_subject(
-                subject=subject, year=year, session=session
+        )
+
+    @staticmethod
+    def _rebuild_subject_stats(
+        connection: sqlalchemy.engine.Connection, subject_id: int = None
+    ) -> None:
+        """Compute the stats of every subject, or of one, from the enrolments
+        and replace the stored ones.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Connection to the db.
+            subject_id (int): Id of the only subject to rebuild, None for all.
+        """
+        table = SubjectYearStats.__table__
+        query = (
+            sqlalchemy.select(
+                [
+                    Subject.name,
+                    Subject.natural_year,
+                    func.count(StudentSubject.student_id),
+                    func.count().filter(StudentSubject.mark >= PASS_MARK),
+                    func.count().filter(StudentSubject.mark < PASS_MARK),
+                    func.coalesce(func.sum(StudentSubject.mark), 0),
+                    func.coalesce(
+                        func.sum(StudentSubject.mark * StudentSubject.mark), 0
+                    ),
+                ]
             )
-            if not self._student_subject_on_db(
-                name=name,
-                last_name=last_name,
-                subject=subject,
+            .select_from(
+                Subject.__table__.outerjoin(
+                    StudentSubject.__table__,
+                    StudentSubject.subject_id == Subject.id,
+                )
+            )
+            .group_by(Subject.id)
+        )
+        delete = table.delete()
+        if subject_id is not None:
+            query = query.where(Subject.id == subject_id)
+            delete = delete.where(
+                sqlalchemy.tuple_(table.c.subject, table.c.natural_year).in_(
+                    sqlalchemy.select(
+                        [Subject.name, Subject.natural_year]
+                    ).where(Subject.id == subject_id)
+                )
+            )
+        connection.execute(delete)
+        connection.execute(
+            table.insert().from_select(
+                ["subject", "natural_year"] + list(_STATS_COLUMNS), query
+            )
+        )
+
+    @staticmethod
+    def _read_subject_stats(
+        session: sqlalchemy.orm.session.Session,
+    ) -> Dict[Tuple[str, str], SubjectStats]:
+        """Get the stored stats of every subject and year.
+
+        Args:
+            session (sqlalchemy.orm.session.Session): Session to connect to the db.
+
+        Returns:
+            Dict[Tuple[str, str], SubjectStats]: Stats of each subject and year.
+        """
+        return {
+            (row.subject, row.natural_year): SubjectStats(
+                row.subject,
+                row.natural_year,
+                *(getattr(row, column) for column in _STATS_COLUMNS),
+            )
+            for row in session.query(SubjectYearStats)
+        }
+
+    def get_subject_stats(self, subject: str, year: str) -> SubjectStats:
+        """Get the stats of a subject on a given year by primary key.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            SubjectStats: Stats of the subject, all zero if it does not exist.
+        """
+        with self.session_scope() as session:
+            row = session.query(SubjectYearStats).get((subject, year))
+            if row is None:
+                return SubjectStats(subject, year, 0, 0, 0, 0.0, 0.0)
+            return SubjectStats(
+                subject,
+                year,
+                *(getattr(row, column) for column in _STATS_COLUMNS),
+            )
+
+    def get_subject_trend(self, subject: str) -> List[SubjectYearTrend]:
+        """Get the figures of a subject on every year it was taught by
+        scanning its rows of subject_year_stats.
+
+        Args:
+            subject (str): Name of the subject to consult.
+
+        Returns:
+            List[SubjectYearTrend]: Figures of each year, in chronological
+                order.
+        """
+        with self.session_scope() as session:
+            rows = (
+                session.query(
+                    SubjectYearStats.natural_year,
+                    SubjectYearStats.enrolled,
+                    SubjectYearStats.passed,
+                    SubjectYearStats.failed,
+                    SubjectYearStats.mark_sum,
+                )
+                .filter(SubjectYearStats.subject == subject)
+                .order_by(SubjectYearStats.natural_year)
+                .all()
+            )
+
+        return [
+            SubjectYearTrend(
                 year=year,
-                mark=mark,
-                session=session,
-            ):
-                new_student.subjects.append(student_subject)
+                enrolled=enrolled,
+                passed=passed,
+                failed=failed,
+                mean_mark=(
+                    mark_sum / (passed + failed) if passed + failed else None
+                ),
+            )
+            for year, enrolled, passed, failed, mark_sum in rows
+        ]
+
+    def rebuild_subject_stats(
+        self,
+    ) -> List[Tuple[SubjectStats, SubjectStats]]:
+        """Rebuild subject_year_stats from the enrolments and compare it with
+        the stats that were stored.
+
+        Returns:
+            List[Tuple[SubjectStats, SubjectStats]]: Stored and rebuilt stats
+                of each subject and year where they differed, None where one
+                of them did not exist, ordered by subject and year.
+        """
+        with self.session_scope() as session:
+            stored = self._read_subject_stats(session=session)
+            self._rebuild_subject_stats(connection=session.connection())
+            rebuilt = self._read_subject_stats(session=session)
+
+        return [
+            (stored.get(key), rebuilt.get(key))
+            for key in sorted(set(stored) | set(rebuilt))
+            if not _same_stats(stored.get(key), rebuilt.get(key))
+        ]
+
+    def get_ingested_file_hash(self, path: str) -> str:
+        """Get the content hash recorded the last time a file was stored.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            str: Content hash of the file, None if it was never stored.
+        """
+        with self.session_scope() as session:
+            return (
+                session.query(IngestedFile.content_hash)
+                .filter(IngestedFile.path == path)
+                .scalar()
+            )
+
+    def get_ingested_file_hashes(self) -> Dict[str, str]:
+        """Get the content hash recorded the last time each file was stored.
+
+        Returns:
+            Dict[str, str]: Content hash of each path.
+        """
+        with self.session_scope() as session:
+            return dict(
+                session.query(IngestedFile.path, IngestedFile.content_hash)
+            )
+
+    def get_ingested_sheet_hashes(self) -> Dict[Tuple[str, str], str]:
+        """Get the content hash recorded for each subject and year the last
+        time a sheet with its data was stored.
+
+        Returns:
+            Dict[Tuple[str, str], str]: Content hash of each subject and year.
+        """
+        with self.session_scope() as session:
+            return {
+                (subject, year): content_hash
+                for subject, year, content_hash in session.query(
+                    IngestedSheet.subject,
+                    IngestedSheet.natural_year,
+                    IngestedSheet.content_hash,
+                )
+            }
+
+    def _store_enrolment_batch(
+        self,
+        subject_id: int,
+        batch: StudentBatch,
+        session: sqlalchemy.orm.session.Session,
+        update_marks: bool = False,
+    ) -> List[Tuple[Tuple[str, str], float, bool]]:
+        """Insert the enrolments of a batch of students in a subject,
+        creating the students that are not in the db yet.
+
+        Args:
+            subject_id (int): Id of the subject the students are enrolled in.
+            batch (StudentBatch): Name, last name and mark of each student.
+            session (sqlalchemy.orm.session.Session): Session to connect to the db.
+            update_marks (bool): Whether to overwrite the mark of the
+                enrolments that already exist.
+
+        Returns:
+            List[Tuple[Tuple[str, str], float, bool]]: Name and last name,
+                mark and whether it was inserted (not updated) of each
+                enrolment written.
+        """
+        student_ids = self._get_or_create_ids(
+            table=Student.__table__,
+            columns=("name", "last_name"),
+            keys=set(zip(batch.names, batch.last_names)),
+            session=session,
+        )
+        enrolments = {}
+        for key, mark in zip(zip(batch.names, batch.last_names), batch.marks):
+            student_id = student_ids[key]
+            enrolments.setdefault(
+                student_id,
+                {
+                    "subject_id": subject_id,
+                    "student_id": student_id,
+                    "mark": mark,
+                },
+            )
+        statement = insert(StudentSubject.__table__).values(
+            [enrolments[student_id] for student_id in sorted(enrolments)]
+        )
+        if update_marks:
+            statement = statement.on_conflict_do_update(
+                index_elements=["subject_id", "student_id"],
+                set_={"mark": statement.excluded.mark},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(
+                index_elements=["subject_id", "student_id"]
+            )
+        keys = {student_id: key for key, student_id in student_ids.items()}
+        return [
+            (keys[student_id], mark, inserted)
+            for student_id, mark, inserted in session.execute(
+                statement.returning(
+                    StudentSubject.student_id,
+                    StudentSubject.mark,
+                    # Rows inserted, not updated, have no deleting xact.
+                    literal_column("xmax = 0"),
+                )
+            )
+        ]
+
+    @staticmethod
+    def _get_or_create_ids(
+        table: sqlalchemy.Table,
+        columns: Tuple[str, str],
+        keys: Set[tuple],
+        session: sqlalchemy.orm.session.Session,
+    ) -> Dict[tuple, int]:
+        """Get the ids of the rows of table matching keys on columns,
+        inserting the ones that do not exist yet.
+
+        columns must be covered by a unique index of table.
+
+        Args:
+            table (sqlalchemy.Table): Table where the rows are stored.
+            columns (Tuple[str, str]): Columns that identify a row.
+            keys (Set[tuple]): Values of columns of the rows to get.
+            session (sqlalchemy.orm.session.Session): Session to connect to the db.
+
+        Returns:
+            Dict[tuple, int]: Id of the row of each key.
+        """
+        key_columns = [table.c[column] for column in columns]
+        ids = {
+            tuple(row[1:]): row[0]
+            for row in session.execute(
+                sqlalchemy.select([table.c.id] + key_columns).where(
+                    tuple_(*key_columns).in_(list(keys))
+                )
+            )
+        }
+        # Inserted in a fixed order, so that concurrent transactions lock
+        # the same keys in the same order instead of deadlocking.
+        missing = sorted(key for key in keys if key not in ids)
+        if missing:
+            inserted = session.execute(
+                insert(table)
+                .values([dict(zip(columns, key)) for key in missing])
+                .on_conflict_do_nothing(index_elements=list(columns))
+                .returning(table.c.id, *key_columns)
+            )
+            for row in inserted:
+                ids[tuple(row[1:])] = row[0]
+            # Rows inserted by a concurrent transaction are not returned.
+            concurrent = [key for key in missing if key not in ids]
+            if concurrent:
+                ids.update(
+                    (tuple(row[1:]), row[0])
+                    for row in session.execute(
+                        sqlalchemy.select([table.c.id] + key_columns).where(
+                            tuple_(*key_columns).in_(concurrent)
+                        )
+                    )
+                )
+        return ids
 
     def get_number_passed_by_subject_and_year(
         self, subject: str, year: str
@@ -261,23 +1231,17 @@ class SchoolDB:
             int: Number of students that passed the subject in the given year
                 as an answer for the query.
         """
-        with session_scope(
-            user=self._user,
-            password=self._password,
-            host=self._host,
-            port=self._port,
-            db_name=self._db_name,
-        ) as session:
+        with self.session_scope() as session:
             return (
-                session.query(Student)
-                .join(StudentSubject, Student.id == StudentSubject.student_id)
+                session.query(func.count())
+                .select_from(StudentSubject)
                 .join(Subject, StudentSubject.subject_id == Subject.id)
                 .filter(
                     Subject.name == subject,
                     Subject.natural_year == year,
-                    StudentSubject.mark >= 5,
+                    StudentSubject.mark >= PASS_MARK,
                 )
-                .count()
+                .scalar()
             )
 
     def get_number_failed_by_subject_and_year(
@@ -294,24 +1258,277 @@ class SchoolDB:
             int: Number of students that failed the subject in the given year
                 as an answer for the query.
         """
-        with session_scope(
-            user=self._user,
-            password=self._password,
-            host=self._host,
-            port=self._port,
-            db_name=self._db_name,
-        ) as session:
+        with self.session_scope() as session:
             return (
-                session.query(Student)
-                .join(StudentSubject, Student.id == StudentSubject.student_id)
+                session.query(func.count())
+                .select_from(StudentSubject)
                 .join(Subject, StudentSubject.subject_id == Subject.id)
                 .filter(
                     Subject.name == subject,
                     Subject.natural_year == year,
-                    StudentSubject.mark < 5,
+                    StudentSubject.mark < PASS_MARK,
+                )
+                .scalar()
+            )
+
+    def get_subject_summary(self, subject: str, year: str) -> SubjectSummary:
+        """Get the number of students enrolled, passed and failed and the
+        mean, lowest and highest mark of a subject on a given year with a
+        single query.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+
+        Returns:
+            SubjectSummary: Statistics of the subject in the given year.
+        """
+        with self.session_scope() as session:
+            total, passed, failed, mean_mark, min_mark, max_mark = (
+                session.query(
+                    func.count(),
+                    func.count().filter(StudentSubject.mark >= PASS_MARK),
+                    func.count().filter(StudentSubject.mark < PASS_MARK),
+                    func.avg(StudentSubject.mark),
+                    func.min(StudentSubject.mark),
+                    func.max(StudentSubject.mark),
+                )
+                .select_from(StudentSubject)
+                .join(Subject, StudentSubject.subject_id == Subject.id)
+                .filter(Subject.name == subject, Subject.natural_year == year)
+                .one()
+            )
+
+        return SubjectSummary(
+            subject=subject,
+            year=year,
+            total=total,
+            passed=passed,
+            failed=failed,
+            mean_mark=None if mean_mark is None else float(mean_mark),
+            min_mark=min_mark,
+            max_mark=max_mark,
+        )
+
+    def _get_mark_columns(
+        self, year: str, subject: str = None
+    ) -> Tuple[tuple, tuple, tuple]:
+        """Get the marks of the subjects of a year with a single query.
+
+        Args:
+            year (str): Year the subjects were taught.
+            subject (str): Name of the only subject to get, None for all.
+
+        Returns:
+            Tuple[tuple, tuple, tuple]: Subject, whether it is an enrolment
+                (False for the row of a subject without students) and mark of
+                each row, grouped by subject ordered by name.
+        """
+        with self.session_scope() as session:
+            query = (
+                session.query(
+                    Subject.name,
+                    StudentSubject.subject_id.isnot(None),
+                    StudentSubject.mark,
+                )
+                .outerjoin(
+                    StudentSubject, StudentSubject.subject_id == Subject.id
+                )
+                .filter(Subject.natural_year == year)
+                .order_by(Subject.name)
+            )
+            if subject is not None:
+                query = query.filter(Subject.name == subject)
+            rows = query.all()
+
+        if not rows:
+            return (), (), ()
+        return tuple(zip(*rows))
+
+    def get_mark_distribution(
+        self,
+        subject: str,
+        year: str,
+        pass_mark: float = PASS_MARK,
+        bins: int = HISTOGRAM_BINS,
+    ):
+        """Get the mean, standard deviation, percentiles and histogram of the
+        marks of a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+            pass_mark (float): Lowest mark that passes.
+            bins (int): Number of bins of the histogram over MARK_RANGE.
+
+        Returns:
+            MarkDistribution: Distribution of the marks, without students if
+                the subject does not exist.
+        """
+        # Imported here so that NumPy is only loaded when it is needed.
+        from src import mark_distribution
+
+        columns = self._get_mark_columns(year=year, subject=subject)
+        if not columns[0]:
+            # Same as the row of a subject without students.
+            columns = ((subject,), (False,), (None,))
+        return mark_distribution.compute_distributions(
+            year, *columns, pass_mark=pass_mark, bins=bins
+        )[0]
+
+    def get_mark_distributions_by_year(
+        self,
+        year: str,
+        pass_mark: float = PASS_MARK,
+        bins: int = HISTOGRAM_BINS,
+    ) -> list:
+        """Get the distribution of the marks of every subject taught in a
+        given year with a single query.
+
+        Args:
+            year (str): Year to obtain the data from.
+            pass_mark (float): Lowest mark that passes.
+            bins (int): Number of bins of the histograms over MARK_RANGE.
+
+        Returns:
+            List[MarkDistribution]: Distribution of each subject taught in
+                the given year, ordered by subject name.
+        """
+        from src import mark_distribution
+
+        return mark_distribution.compute_distributions(
+            year,
+            *self._get_mark_columns(year=year),
+            pass_mark=pass_mark,
+            bins=bins,
+        )
+
+    def get_summaries_by_year(self, year: str) -> List[SubjectSummary]:
+        """Get the statistics of every subject taught in a given year with a
+        single grouped query.
+
+        Args:
+            year (str): Year to obtain the data from.
+
+        Returns:
+            List[SubjectSummary]: Statistics of each subject taught in the
+                given year, ordered by subject name.
+        """
+        with self.session_scope() as session:
+            query = (
+                session.query(
+                    Subject.name,
+                    func.count(StudentSubject.student_id),
+                    func.count(StudentSubject.student_id).filter(
+                        StudentSubject.mark >= PASS_MARK
+                    ),
+                    func.count(StudentSubject.student_id).filter(
+                        StudentSubject.mark < PASS_MARK
+                    ),
+                    func.avg(StudentSubject.mark),
+                    func.min(StudentSubject.mark),
+                    func.max(StudentSubject.mark),
+                )
+                .outerjoin(
+                    StudentSubject, StudentSubject.subject_id == Subject.id
                 )
-                .count()
+                .filter(Subject.natural_year == year)
+                .group_by(Subject.id, Subject.name)
+                .order_by(Subject.name)
+                .all()
+            )
+
+        return [
+            SubjectSummary(
+                subject=subject,
+                year=year,
+                total=total,
+                passed=passed,
+                failed=failed,
+                mean_mark=None if mean_mark is None else float(mean_mark),
+                min_mark=min_mark,
+                max_mark=max_mark,
             )
+            for subject, total, passed, failed, mean_mark, min_mark, max_mark in query
+        ]
+
+    def get_subjects(self) -> List[Tuple[str, str]]:
+        """Get the name and year of every subject in the db.
+
+        Returns:
+            List[Tuple[str, str]]: Name and year of each subject, ordered by
+                id.
+        """
+        with self.session_scope() as session:
+            return [
+                (name, year)
+                for name, year in session.query(
+                    Subject.name, Subject.natural_year
+                ).order_by(Subject.id)
+            ]
+
+    def get_enrolments(self) -> List[Tuple[str, str, int, str, str, float]]:
+        """Get every enrolment of the db together with the data of its
+        subject and student.
+
+        Returns:
+            List[Tuple[str, str, int, str, str, float]]: Subject name, year,
+                student id, student name, last name and mark of each
+                enrolment, ordered by subject and student id.
+        """
+        with self.session_scope() as session:
+            return [
+                tuple(row)
+                for row in session.query(
+                    Subject.name,
+                    Subject.natural_year,
+                    Student.id,
+                    Student.name,
+                    Student.last_name,
+                    StudentSubject.mark,
+                )
+                .select_from(StudentSubject)
+                .join(Subject, StudentSubject.subject_id == Subject.id)
+                .join(Student, StudentSubject.student_id == Student.id)
+                .order_by(StudentSubject.subject_id, StudentSubject.student_id)
+            ]
+
+    @staticmethod
+    def _query_students(
+        subject: str,
+        year: str,
+        outcome: str,
+        session: sqlalchemy.orm.session.Session,
+    ) -> sqlalchemy.orm.Query:
+        """Build the query of the id, name and last name of the students
+        enrolled on a subject on a given year.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+            outcome (str): PASSED or FAILED to get only those students, None
+                to get all of them.
+            session (sqlalchemy.orm.session.Session): Session to connect to the db.
+
+        Raises:
+            ValueError: Error raised when outcome is not valid.
+
+        Returns:
+            sqlalchemy.orm.Query: Query of the students.
+        """
+        query = (
+            session.query(Student.id, Student.name, Student.last_name)
+            .join(StudentSubject, Student.id == StudentSubject.student_id)
+            .join(Subject, StudentSubject.subject_id == Subject.id)
+            .filter(Subject.name == subject, Subject.natural_year == year)
+        )
+        if outcome == PASSED:
+            query = query.filter(StudentSubject.mark >= PASS_MARK)
+        elif outcome == FAILED:
+            query = query.filter(StudentSubject.mark < PASS_MARK)
+        elif outcome is not None:
+            raise ValueError(f"Unknown outcome {outcome}")
+        return query
 
     def get_list_passed_by_subject_and_year(
         self, subject: str, year: str
@@ -327,30 +1544,13 @@ class SchoolDB:
             List[str]: List of names and last named of students that passed
                 the subject on a given year.
         """
-        with session_scope(
-            user=self._user,
-            password=self._password,
-            host=self._host,
-            port=self._port,
-            db_name=self._db_name,
-        ) as session:
-            students = []
-            query = (
-                session.query(Student.name, Student.last_name)
-                .join(StudentSubject, Student.id == StudentSubject.student_id)
-                .join(Subject, StudentSubject.subject_id == Subject.id)
-                .filter(
-                    Subject.name == subject,
-                    Subject.natural_year == year,
-                    StudentSubject.mark >= 5,
+        with self.session_scope() as session:
+            return [
+                f"{name} {last_name}"
+                for _, name, last_name in self._query_students(
+                    subject=subject, year=year, outcome=PASSED, session=session
                 )
-                .all()
-            )
-
-            for element in query:
-                students.append(" ".join(element))
-
-        return students
+            ]
 
     def get_list_failed_by_subject_and_year(
         self, subject: str, year: str
@@ -366,30 +1566,13 @@ class SchoolDB:
             List[str]: List of names and last named of students that failed
                 the subject on a given year.
         """
-        with session_scope(
-            user=self._user,
-            password=self._password,
-            host=self._host,
-            port=self._port,
-            db_name=self._db_name,
-        ) as session:
-            students = []
-            query = (
-                session.query(Student.name, Student.last_name)
-                .join(StudentSubject, Student.id == StudentSubject.student_id)
-                .join(Subject, StudentSubject.subject_id == Subject.id)
-                .filter(
-                    Subject.name == subject,
-                    Subject.natural_year == year,
-                    StudentSubject.mark < 5,
+        with self.session_scope() as session:
+            return [
+                f"{name} {last_name}"
+                for _, name, last_name in self._query_students(
+                    subject=subject, year=year, outcome=FAILED, session=session
                 )
-                .all()
-            )
-
-            for element in query:
-                students.append(" ".join(element))
-
-        return students
+            ]
 
     def get_list_students_by_subject_and_year(
         self, subject: str, year: str
@@ -405,26 +1588,91 @@ class SchoolDB:
             List[str]: List of names and last named of students that were
                 enrolled on a subject in a given year.
         """
-        with session_scope(
-            user=self._user,
-            password=self._password,
-            host=self._host,
-            port=self._port,
-            db_name=self._db_name,
-        ) as session:
-            students = []
-            query = (
-                session.query(Student.name, Student.last_name)
-                .join(StudentSubject, Student.id == StudentSubject.student_id)
-                .join(Subject, StudentSubject.subject_id == Subject.id)
-                .filter(Subject.name == subject, Subject.natural_year == year,)
-                .all()
+        with self.session_scope() as session:
+            return [
+                f"{name} {last_name}"
+                for _, name, last_name in self._query_students(
+                    subject=subject, year=year, outcome=None, session=session
+                )
+            ]
+
+    def iter_students_by_subject_and_year(
+        self,
+        subject: str,
+        year: str,
+        outcome: str = None,
+        batch_size: int = 1000,
+    ) -> Iterator[str]:
+        """Get the students enrolled on a subject on a given year as they are
+        read from a server-side cursor, batch_size rows at a time, so that
+        memory does not grow with the number of students.
+
+        The session stays open until the generator is exhausted or closed.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+            outcome (str): PASSED or FAILED to get only those students, None
+                to get all of them.
+            batch_size (int): Number of rows fetched from the cursor at once.
+
+        Yields:
+            str: Name and last name of the next student.
+        """
+        with self.session_scope() as session:
+            query = self._query_students(
+                subject=subject, year=year, outcome=outcome, session=session
             )
+            for _, name, last_name in query.yield_per(batch_size):
+                yield f"{name} {last_name}"
 
-            for element in query:
-                students.append(" ".join(element))
+    def get_page_students_by_subject_and_year(
+        self,
+        subject: str,
+        year: str,
+        limit: int = 100,
+        after: int = None,
+        outcome: str = None,
+    ) -> StudentPage:
+        """Get a page of the students enrolled on a subject on a given year.
 
-        return students
+        Pages are ordered by student id and start after the id of the last
+        student of the previous page, so every page is an index range scan
+        however far it is.
+
+        Args:
+            subject (str): Name of the subject to consult.
+            year (str): Year the subject was taught to consult.
+            limit (int): Maximum number of students of the page.
+            after (int): next_after of the previous page, None for the first one.
+            outcome (str): PASSED or FAILED to get only those students, None
+                to get all of them.
+
+        Raises:
+            ValueError: Error raised when limit is lower than 1.
+
+        Returns:
+            StudentPage: Students of the page and the cursor of the next one.
+        """
+        if limit < 1:
+            raise ValueError(
+                f"The limit of a page must be at least 1: {limit}"
+            )
+        with self.session_scope() as session:
+            query = self._query_students(
+                subject=subject, year=year, outcome=outcome, session=session
+            )
+            if after is not None:
+                query = query.filter(Student.id > after)
+            rows = query.order_by(Student.id).limit(limit + 1).all()
+
+        next_after = rows[limit - 1][0] if len(rows) > limit else None
+        return StudentPage(
+            students=[
+                f"{name} {last_name}" for _, name, last_name in rows[:limit]
+            ],
+            next_after=next_after,
+        )
 
     def get_number_students_by_subject_and_year(
         self, subject: str, year: str
@@ -440,19 +1688,13 @@ class SchoolDB:
             int: number of students that were enrolled on a subject in a
                 given year.
         """
-        with session_scope(
-            user=self._user,
-            password=self._password,
-            host=self._host,
-            port=self._port,
-            db_name=self._db_name,
-        ) as session:
+        with self.session_scope() as session:
             return (
-                session.query(Student)
-                .join(StudentSubject, Student.id == StudentSubject.student_id)
+                session.query(func.count())
+                .select_from(StudentSubject)
                 .join(Subject, StudentSubject.subject_id == Subject.id)
-                .filter(Subject.name == subject, Subject.natural_year == year,)
-                .count()
+                .filter(Subject.name == subject, Subject.natural_year == year)
+                .scalar()
             )
 
     def get_list_subjects_by_year(self, year: str) -> List[str]:
@@ -463,19 +1705,15 @@ class SchoolDB:
 
         Returns:
             List[str]: Response from the query to the db with the subjects
-                that have an entrance with that year.
-        """
-        with session_scope(
-            user=self._user,
-            password=self._password,
-            host=self._host,
-            port=self._port,
-            db_name=self._db_name,
-        ) as session:
+                that have an entrance with that year, in the order they
+                were first stored.
+        """
+        with self.session_scope() as session:
             subjects = []
             query = (
                 session.query(Subject.name)
                 .filter(Subject.natural_year == year)
+                .order_by(Subject.id)
                 .all()
             )
 
@@ -483,3 +1721,68 @@ class SchoolDB:
                 subjects.append(" ".join(element))
 
         return subjects
+
+    def get_transcripts(
+        self, students: Iterable[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], List[TranscriptEntry]]:
+        """Get the subjects each of a batch of students is enrolled in, with
+        a single query that loads the students with their enrolments.
+
+        Args:
+            students (Iterable[Tuple[str, str]]): Name and last name of each
+                student.
+
+        Returns:
+            Dict[Tuple[str, str], List[TranscriptEntry]]: Enrolments of each
+                student ordered by year and subject, empty for the students
+                that are not in the db.
+        """
+        transcripts = {student: [] for student in students}
+        if not transcripts:
+            return transcripts
+
+        with self.session_scope() as session:
+            query = (
+                session.query(Student)
+                .options(
+                    joinedload(Student.subjects).joinedload(
+                        StudentSubject.subject
+                    )
+                )
+                .filter(
+                    tuple_(Student.name, Student.last_name).in_(
+                        list(transcripts)
+                    )
+                )
+            )
+            for student in query:
+                transcripts[(student.name, student.last_name)] = sorted(
+                    (
+                        TranscriptEntry(
+                            subject=enrolment.subject.name,
+                            year=enrolment.subject.natural_year,
+                            mark=enrolment.mark,
+                        )
+                        for enrolment in student.subjects
+                    ),
+                    key=lambda entry: (entry.year, entry.subject),
+                )
+
+        return transcripts
+
+    def get_transcript(
+        self, name: str, last_name: str
+    ) -> List[TranscriptEntry]:
+        """Get the subjects a student is enrolled in.
+
+        Args:
+            name (str): Name of the student.
+            last_name (str): Last name of the student.
+
+        Returns:
+            List[TranscriptEntry]: Enrolments of the student ordered by year
+                and subject, empty if the student is not in the db.
+        """
+        return self.get_transcripts(students=[(name, last_name)])[
+            (name, last_name)
+        ]
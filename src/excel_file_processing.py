@@ -1,42 +1,551 @@
-from typing import List
+import csv
+import datetime
+import hashlib
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, islice
+from typing import Dict, Iterable, Iterator, List, Sequence, TextIO, Tuple
 import xlrd as xlrd
 import os
 import sys
 import functools
-from src.app_logic import store_student_data
+from src.app_logic import (
+    get_ingested_file_hash,
+    get_ingested_sheet_hashes,
+    store_sheets_data,
+)
+from src.database_manager import SheetData, StudentBatch
 from src.custom_errors import (
     NotAnExcelFileError,
     WrongOrderOfColumns,
+    WrongRowData,
     WrongSheetName,
 )
 
+# Workbook opened by each worker process of the parallel extraction.
+_worker_workbook = None
+
+# Columns that precede the ones of the students in CSV and TSV files, where
+# each row carries the subject, course and year that name a sheet in Excel.
+DELIMITED_SUBJECT_COLUMNS = ["Subject", "Course", "Year"]
+
 
-def extract_data_from_file(file: str) -> None:
+def extract_data_from_file(
+    file: str,
+    workers: int = 1,
+    incremental: bool = False,
+    changed_marks: str = None,
+) -> None:
     """Extract the data from the file and call for store in the database.
 
+    All the sheets of the file are stored in a single transaction, so nothing
+    is stored if any of them is not valid. Sheets are loaded one at a time and
+    their rows are validated and written in batches while they are read.
+
+    With more than one worker the sheets are parsed and validated in a pool
+    of processes while the ones already parsed are being stored.
+
+    CSV and TSV files are read as a stream of rows with the subject, course
+    and year of each student; consecutive rows of the same subject, course
+    and year are stored as one sheet. Empty rows are skipped. Only the hash
+    of the whole file applies to them, since their sheets are not hashed.
+
+    The content hash of the file and of each sheet is recorded. In
+    incremental mode a file whose hash did not change is not read, sheets
+    whose hash did not change are not stored and, for the rest, only the
+    enrolments that are new or whose mark changed are written.
+
     Args:
         file (str): path to the file which the data is going to be extracted from.
+        workers (int): number of processes parsing sheets.
+        incremental (bool): whether to skip the data that did not change since the last time it was stored.
+        changed_marks (str): "keep" or "update" the stored marks that changed, by default "update" in incremental mode and "keep" otherwise.
 
     Raises:
         WrongOrderOfColumns: Error raised when the order of the columns of the sheet is not valid.
-        NotAnExcelFileError: Error raised when the file is not an excel file.
-    """
-    if _is_excel_file(file=file):
-        workbook = xlrd.open_workbook(filename=file)
-        for sheet in workbook.sheets():
-            subject_name, year = _get_subject_name_and_year(sheet=sheet)
-            if _validate_column_order(sheet=sheet):
-                student_data = _get_row_data_from_sheet(sheet=sheet)
-                store_student_data(
-                    subject_name=subject_name,
-                    year=year,
-                    student_data=student_data,
-                )
-            else:
-                raise WrongOrderOfColumns(sheet=sheet)
+        WrongRowData: Error raised when a row of a sheet is not valid.
+        NotAnExcelFileError: Error raised when the file is not an excel, CSV or TSV file.
+    """
+    if not _is_excel_file(file=file) and not _is_delimited_file(file=file):
+        raise NotAnExcelFileError(file=file)
+
+    path = os.path.abspath(file)
+    file_hash = _hash_file(file=file)
+    if incremental and get_ingested_file_hash(path=path) == file_hash:
+        return
+    sheet_hashes = get_ingested_sheet_hashes() if incremental else {}
+
+    if _is_delimited_file(file=file):
+        with open(file, newline="", encoding="utf-8-sig") as content:
+            store_sheets_data(
+                sheets=_get_sheets_data_from_delimited_file(
+                    content=content, file=file
+                ),
+                incremental=incremental,
+                source_file=(path, file_hash),
+                changed_marks=changed_marks,
+            )
+    elif workers > 1:
+        store_sheets_data(
+            sheets=_skip_unchanged_sheets(
+                sheets=_get_sheets_data_in_parallel(
+                    file=file, workers=workers
+                ),
+                sheet_hashes=sheet_hashes,
+            ),
+            incremental=incremental,
+            source_file=(path, file_hash),
+            changed_marks=changed_marks,
+        )
     else:
+        workbook = xlrd.open_workbook(filename=file, on_demand=True)
+        try:
+            store_sheets_data(
+                sheets=_skip_unchanged_sheets(
+                    sheets=_get_sheets_data(workbook=workbook),
+                    sheet_hashes=sheet_hashes,
+                ),
+                incremental=incremental,
+                source_file=(path, file_hash),
+                changed_marks=changed_marks,
+            )
+        finally:
+            workbook.release_resources()
+
+
+def parse_file(
+    file: str,
+    stored_hash: str = None,
+    sheet_hashes: Dict[Tuple[str, str], str] = None,
+) -> Tuple[str, List[SheetData]]:
+    """Read and validate every sheet of a file without storing it.
+
+    Args:
+        file (str): path to the file which the data is going to be extracted from.
+        stored_hash (str): content hash recorded for the file; if it did not change the file is not read.
+        sheet_hashes (Dict[Tuple[str, str], str]): content hash recorded for each subject and year; the sheets that did not change are left out.
+
+    Raises:
+        WrongOrderOfColumns: Error raised when the order of the columns of the sheet is not valid.
+        WrongRowData: Error raised when a row of a sheet is not valid.
+        NotAnExcelFileError: Error raised when the file is not an excel, CSV or TSV file.
+
+    Returns:
+        Tuple[str, List[SheetData]]: Content hash of the file and data of its sheets, None if the file did not change.
+    """
+    if not _is_excel_file(file=file) and not _is_delimited_file(file=file):
         raise NotAnExcelFileError(file=file)
 
+    file_hash = _hash_file(file=file)
+    if stored_hash == file_hash:
+        return file_hash, None
+
+    if _is_delimited_file(file=file):
+        with open(file, newline="", encoding="utf-8-sig") as content:
+            sheets = _get_sheets_data_from_delimited_file(
+                content=content, file=file
+            )
+            return (
+                file_hash,
+                [
+                    sheet._replace(
+                        student_data=StudentBatch(rows=sheet.student_data)
+                    )
+                    for sheet in sheets
+                ],
+            )
+
+    workbook = xlrd.open_workbook(filename=file, on_demand=True)
+    try:
+        return (
+            file_hash,
+            [
+                sheet._replace(
+                    student_data=StudentBatch(rows=sheet.student_data)
+                )
+                for sheet in _skip_unchanged_sheets(
+                    sheets=_get_sheets_data(workbook=workbook),
+                    sheet_hashes=sheet_hashes or {},
+                )
+            ],
+        )
+    finally:
+        workbook.release_resources()
+
+
+def _get_sheets_data_from_delimited_file(
+    content: TextIO, file: str
+) -> Iterator[SheetData]:
+    """Get the subject, year and student data of each group of consecutive
+    rows of a CSV or TSV file with the same subject, course and year.
+
+    The groups are read as a stream and have no content hash, so in
+    incremental mode only the hash of the whole file is checked.
+
+    Args:
+        content (TextIO): Opened file to read the rows from.
+        file (str): path of the file, used to pick the delimiter and in errors.
+
+    Raises:
+        WrongOrderOfColumns: Error raised when the order of the columns of the file is not valid.
+        WrongSheetName: Error raised when the subject, course and year of a row are not valid.
+        WrongRowData: Error raised when a row of the file is not valid.
+
+    Yields:
+        SheetData: Data of the next subject and year of the file.
+    """
+    delimiter = "\t" if os.path.splitext(file)[1] == ".tsv" else ","
+    rows = csv.reader(content, delimiter=delimiter)
+    header = next(rows, [])
+    subject_columns = len(DELIMITED_SUBJECT_COLUMNS)
+    if header[:subject_columns] != DELIMITED_SUBJECT_COLUMNS or not (
+        _is_valid_header(header=header[subject_columns:])
+    ):
+        raise WrongOrderOfColumns(sheet=file)
+
+    numbered_rows = (
+        (row_index, values)
+        for row_index, values in enumerate(rows, start=1)
+        if any(values)
+    )
+    for sheet_name, group in groupby(
+        numbered_rows,
+        key=lambda numbered_row: " ".join(numbered_row[1][:subject_columns]),
+    ):
+        subject_name, year = _get_subject_name_and_year_from_name(
+            name=sheet_name
+        )
+        yield SheetData(
+            subject=subject_name,
+            year=year,
+            student_data=_iter_row_data_from_delimited_rows(
+                numbered_rows=group, file=file
+            ),
+        )
+
+
+def _iter_row_data_from_delimited_rows(
+    numbered_rows: Iterable[Tuple[int, list]], file: str
+) -> Iterator[list]:
+    """Get the student data of the rows of a CSV or TSV file, validating it as
+    it is read.
+
+    Args:
+        numbered_rows (Iterable[Tuple[int, list]]): Index and values of each row.
+        file (str): path of the file, used in errors.
+
+    Raises:
+        WrongRowData: Error raised when a row does not contain valid student data.
+
+    Yields:
+        list: Name, last name and mark of the next student.
+    """
+    subject_columns = len(DELIMITED_SUBJECT_COLUMNS)
+    for row_index, values in numbered_rows:
+        name, last_name, mark = (values[subject_columns:] + ["", "", ""])[:3]
+        try:
+            row = [name, last_name, float(mark)]
+        except ValueError:
+            raise WrongRowData(sheet=file, row_index=row_index)
+        if len(values) != subject_columns + 3 or not _validate_row(row=row):
+            raise WrongRowData(sheet=file, row_index=row_index)
+        yield row
+
+
+def _hash_file(file: str) -> str:
+    """Get the SHA-256 hash of the content of a file.
+
+    Args:
+        file (str): path to the file.
+
+    Returns:
+        str: Hexadecimal digest of the content.
+    """
+    digest = hashlib.sha256()
+    with open(file, "rb") as content:
+        for block in iter(lambda: content.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _hash_sheet(sheet: xlrd.sheet.Sheet) -> str:
+    """Get the SHA-256 hash of the name and student rows of a sheet.
+
+    Args:
+        sheet (xlrd.sheet.Sheet): Sheet to be hashed.
+
+    Raises:
+        WrongRowData: Error raised when a row does not contain valid student data.
+
+    Returns:
+        str: Hexadecimal digest of the content.
+    """
+    return _hash_sheet_rows(
+        name=sheet.name, rows=_iter_row_data_from_sheet(sheet=sheet)
+    )
+
+
+def _hash_sheet_rows(name: str, rows: Iterable[Sequence]) -> str:
+    """Get the SHA-256 hash of the name of a sheet and its validated student
+    rows.
+
+    Only the name, last name and mark of each student are hashed, so the
+    hash of a sheet does not depend on the header, the empty rows or the
+    reader (xlrd or openpyxl) its cells were read with.
+
+    Args:
+        name (str): Name of the sheet.
+        rows (Iterable[Sequence]): Name, last name and mark of each student.
+
+    Returns:
+        str: Hexadecimal digest of the content.
+    """
+    digest = hashlib.sha256(name.encode())
+    for row in rows:
+        digest.update(repr(tuple(row)).encode())
+
+    return digest.hexdigest()
+
+
+def _skip_unchanged_sheets(
+    sheets: Iterable[SheetData], sheet_hashes: Dict[Tuple[str, str], str]
+) -> Iterator[SheetData]:
+    """Leave out the sheets whose content hash is the one recorded for their
+    subject and year.
+
+    Args:
+        sheets (Iterable[SheetData]): Data of the sheets of the file.
+        sheet_hashes (Dict[Tuple[str, str], str]): Content hash recorded for each subject and year.
+
+    Yields:
+        SheetData: Next sheet that changed.
+    """
+    for sheet in sheets:
+        if sheet_hashes.get((sheet.subject, sheet.year)) != sheet.content_hash:
+            yield sheet
+
+
+def _get_sheets_data(workbook: xlrd.book.Book) -> Iterator[SheetData]:
+    """Get the subject, year and student data of each sheet of the workbook.
+
+    Each sheet is unloaded once its rows have been consumed.
+
+    Args:
+        workbook (xlrd.book.Book): Workbook to get the data from.
+
+    Raises:
+        WrongOrderOfColumns: Error raised when the order of the columns of the sheet is not valid.
+
+    Yields:
+        SheetData: Data of the next sheet of the workbook.
+    """
+    for sheet_index in range(workbook.nsheets):
+        sheet = workbook.sheet_by_index(sheet_index)
+        subject_name, year = _get_subject_name_and_year(sheet=sheet)
+        if _validate_column_order(sheet=sheet):
+            yield SheetData(
+                subject=subject_name,
+                year=year,
+                student_data=_iter_row_data_from_sheet(sheet=sheet),
+                content_hash=_hash_sheet(sheet=sheet),
+            )
+        else:
+            raise WrongOrderOfColumns(sheet=sheet.name)
+        workbook.unload_sheet(sheet_index)
+
+
+def _get_sheets_data_in_parallel(
+    file: str, workers: int
+) -> Iterator[SheetData]:
+    """Parse the sheets of the file in a pool of processes and get their data
+    in the order of the workbook as soon as each one is ready.
+
+    Each worker reads only the sheets it parses and at most one sheet per
+    worker is parsed ahead of the one being consumed.
+
+    Args:
+        file (str): path to the file which the data is going to be extracted from.
+        workers (int): number of processes parsing sheets.
+
+    Raises:
+        WrongOrderOfColumns: Error raised when the order of the columns of the sheet is not valid.
+        WrongRowData: Error raised when a row of a sheet is not valid.
+
+    Yields:
+        SheetData: Data of the next sheet of the workbook.
+    """
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_open_worker_workbook,
+        initargs=(file,),
+    ) as executor:
+        nsheets = executor.submit(_get_number_of_sheets).result()
+        sheet_indexes = iter(range(nsheets))
+        futures = deque(
+            executor.submit(_parse_sheet, sheet_index)
+            for sheet_index in islice(sheet_indexes, workers)
+        )
+        try:
+            while futures:
+                sheet_data = futures.popleft().result()
+                for sheet_index in islice(sheet_indexes, 1):
+                    futures.append(executor.submit(_parse_sheet, sheet_index))
+                yield sheet_data
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+class _XlsxSheet:
+    """Sheet of an .xlsx workbook opened in read-only mode, with the values
+    of its rows as xlrd gives them.
+
+    Only the rows of this sheet are read from the file.
+
+    Attributes:
+        name (str): name of the sheet.
+        nrows (int): number of rows up to the last one with a value.
+    """
+
+    def __init__(self, worksheet) -> None:
+        epoch = worksheet.parent.epoch
+        rows = [
+            [_xlsx_cell_value(value=value, epoch=epoch) for value in row]
+            for row in worksheet.iter_rows(values_only=True)
+        ]
+        # xlrd counts the rows and columns up to the last cell with a value.
+        while rows and all(value == "" for value in rows[-1]):
+            rows.pop()
+        ncols = max(
+            (
+                index + 1
+                for row in rows
+                for index, value in enumerate(row)
+                if value != ""
+            ),
+            default=0,
+        )
+        self.name = worksheet.title
+        self.nrows = len(rows)
+        self._rows = [(row + [""] * ncols)[:ncols] for row in rows]
+
+    def row_values(self, row_index: int) -> list:
+        """Get the values of a row of the sheet.
+
+        Args:
+            row_index (int): index of the row.
+
+        Returns:
+            list: Value of each column, "" for the empty cells.
+        """
+        return list(self._rows[row_index])
+
+
+def _xlsx_cell_value(value, epoch: datetime.datetime):
+    """Get the value that xlrd gives for a cell read by openpyxl.
+
+    Args:
+        value: Value of the cell read by openpyxl.
+        epoch (datetime.datetime): Date of the serial number 0 of the workbook.
+
+    Returns:
+        The value of the cell: "" for an empty cell, a float for a number and
+            the serial number of a date or time.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        from openpyxl.utils.datetime import time_to_days, to_excel
+
+        if isinstance(value, datetime.time):
+            return float(time_to_days(value))
+        return float(to_excel(value, epoch=epoch))
+    return value
+
+
+def _is_xlsx_file(file: str) -> bool:
+    """Check if the file is an .xlsx workbook.
+
+    Args:
+        file (str): path to the file.
+
+    Returns:
+        bool: Whether the extension of the file is .xlsx.
+    """
+    return os.path.splitext(file)[1].lower() == ".xlsx"
+
+
+def _open_worker_workbook(file: str) -> None:
+    """Open the workbook once in each worker process of the pool.
+
+    xlrd reads every sheet of an .xlsx workbook when it is opened, so those
+    are opened with openpyxl in read-only mode, which reads the rows of a
+    sheet only when they are iterated.
+
+    Args:
+        file (str): path to the file which the data is going to be extracted from.
+    """
+    global _worker_workbook
+    if _is_xlsx_file(file=file):
+        import openpyxl
+
+        _worker_workbook = openpyxl.load_workbook(
+            filename=file, read_only=True, data_only=True
+        )
+    else:
+        _worker_workbook = xlrd.open_workbook(filename=file, on_demand=True)
+
+
+def _get_number_of_sheets() -> int:
+    """Get the number of sheets of the workbook of the worker process.
+
+    Returns:
+        int: number of sheets of the workbook.
+    """
+    if isinstance(_worker_workbook, xlrd.book.Book):
+        return _worker_workbook.nsheets
+    return len(_worker_workbook.sheetnames)
+
+
+def _parse_sheet(sheet_index: int) -> SheetData:
+    """Get the subject, year and validated student data of a sheet of the
+    workbook of the worker process.
+
+    Args:
+        sheet_index (int): index of the sheet in the workbook.
+
+    Raises:
+        WrongOrderOfColumns: Error raised when the order of the columns of the sheet is not valid.
+        WrongRowData: Error raised when a row of the sheet is not valid.
+
+    Returns:
+        SheetData: Data of the sheet.
+    """
+    if isinstance(_worker_workbook, xlrd.book.Book):
+        sheet = _worker_workbook.sheet_by_index(sheet_index)
+    else:
+        sheet = _XlsxSheet(worksheet=_worker_workbook.worksheets[sheet_index])
+    subject_name, year = _get_subject_name_and_year(sheet=sheet)
+    if not _validate_column_order(sheet=sheet):
+        raise WrongOrderOfColumns(sheet=sheet.name)
+    student_data = _get_row_data_from_sheet(sheet=sheet)
+    content_hash = _hash_sheet_rows(name=sheet.name, rows=student_data)
+    if isinstance(_worker_workbook, xlrd.book.Book):
+        _worker_workbook.unload_sheet(sheet_index)
+
+    return SheetData(
+        subject=subject_name,
+        year=year,
+        student_data=student_data,
+        content_hash=content_hash,
+    )
+
 
 def _is_excel_file(file: str) -> bool:
     """Get the extension of the file and check if it corresponds to an excel file.
@@ -54,6 +563,19 @@ def _is_excel_file(file: str) -> bool:
         return False
 
 
+def _is_delimited_file(file: str) -> bool:
+    """Get the extension of the file and check if it corresponds to a CSV or TSV file.
+
+    Args:
+        file (str): path of the file to be examined.
+
+    Returns:
+        bool: Whether the file is a CSV or TSV file.
+    """
+    filename, file_extension = os.path.splitext(file)
+    return file_extension in (".csv", ".tsv")
+
+
 def _validate_column_order(sheet: xlrd.sheet.Sheet) -> bool:
     """Check if the order of the columns in the sheet is the one we want.
 
@@ -63,11 +585,19 @@ def _validate_column_order(sheet: xlrd.sheet.Sheet) -> bool:
     Returns:
         bool: Whether the order of the columns is valid.
     """
-    header = sheet.row_values(0)
-    if header == ["Name", "Last name", "Mark"]:
-        return True
-    else:
-        return False
+    return _is_valid_header(header=sheet.row_values(0))
+
+
+def _is_valid_header(header: list) -> bool:
+    """Check if the names of the columns of the students are the ones we want.
+
+    Args:
+        header (list): Names of the columns.
+
+    Returns:
+        bool: Whether the order of the columns is valid.
+    """
+    return header == ["Name", "Last name", "Mark"]
 
 
 # TODO: test raise Error
@@ -83,8 +613,23 @@ def _get_subject_name_and_year(sheet: xlrd.sheet.Sheet) -> tuple:
     Returns:
         tuple: name of the subject and year.
     """
-    splitted_name = sheet.name.split()
-    if _validate_length_of_sheet_name:
+    return _get_subject_name_and_year_from_name(name=sheet.name)
+
+
+def _get_subject_name_and_year_from_name(name: str) -> tuple:
+    """Obtain the subject name and year from a name with the format 'subject course year'.
+
+    Args:
+        name (str): Name of the sheet, or subject, course and year of a row.
+
+    Raises:
+        WrongSheetName: Error raised when the name is not valid.
+
+    Returns:
+        tuple: name of the subject and year.
+    """
+    splitted_name = name.split()
+    if _validate_length_of_sheet_name(splitted_name=splitted_name):
         year = splitted_name[-1]
         course = splitted_name[-2]
         subject = splitted_name[:-2]
@@ -92,7 +637,7 @@ def _get_subject_name_and_year(sheet: xlrd.sheet.Sheet) -> tuple:
         subject_name = subject[0] if len(subject) == 1 else " ".join(subject)
         full_subject_name = subject_name + " " + course
     else:
-        raise WrongSheetName(sheet=sheet)
+        raise WrongSheetName(sheet=name)
 
     return full_subject_name, year
 
@@ -124,17 +669,57 @@ def _format_year(year: str) -> str:
     pass
 
 
-def _get_row_data_from_sheet(sheet: xlrd.sheet.Sheet) -> List[list]:
-    """Get value from each row of the sheet passed by parameter and append it to a list.
+def _get_row_data_from_sheet(sheet: xlrd.sheet.Sheet) -> StudentBatch:
+    """Get value from each row of the sheet passed by parameter and append it to a compact batch.
 
     Args:
         sheet (xlrd.sheet.Sheet): Sheet from the workbook to get the info.
 
     Returns:
-        List[list]: List of lists where each element is the data of a student.
+        StudentBatch: Name, last name and mark of each student.
+    """
+    return StudentBatch(rows=_iter_row_data_from_sheet(sheet=sheet))
+
+
+def _iter_row_data_from_sheet(sheet: xlrd.sheet.Sheet) -> Iterator[list]:
+    """Get value from each row of the sheet passed by parameter, validating it
+    as it is read. Empty rows are skipped.
+
+    Args:
+        sheet (xlrd.sheet.Sheet): Sheet from the workbook to get the info.
+
+    Raises:
+        WrongRowData: Error raised when a row does not contain valid student data.
+
+    Yields:
+        list: Name, last name and mark of the next student.
     """
-    student_data = []
     for row_index in range(1, sheet.nrows):
-        student_data.append(sheet.row_values(row_index))
+        row = sheet.row_values(row_index)
+        if not any(row):
+            continue
+        if not _validate_row(row=row):
+            raise WrongRowData(sheet=sheet.name, row_index=row_index)
+        yield row
+
+
+def _validate_row(row: list) -> bool:
+    """Check if the row contains a name, a last name and a finite numeric mark.
 
-    return student_data
+    Args:
+        row (list): Values of the row.
+
+    Returns:
+        bool: Whether the row is valid.
+    """
+    if len(row) != 3:
+        return False
+    name, last_name, mark = row
+    return (
+        isinstance(name, str)
+        and isinstance(last_name, str)
+        and name != ""
+        and last_name != ""
+        and isinstance(mark, float)
+        and math.isfinite(mark)
+    )
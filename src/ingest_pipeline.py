@@ -0,0 +1,384 @@
+import glob
+import os
+import queue
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from sqlalchemy.exc import OperationalError
+
+from src.app_logic import (
+    get_ingested_file_hashes,
+    get_ingested_sheet_hashes,
+    store_sheets_data,
+)
+from src.database_manager import SheetData
+from src.excel_file_processing import parse_file
+
+# Extensions of the files taken from a directory.
+INPUT_EXTENSIONS = (".xls", ".xlsx", ".csv", ".tsv")
+# Times a file is stored again after its transaction deadlocked.
+DEADLOCK_RETRIES = 3
+# SQLSTATE of a transaction aborted by the deadlock detector of Postgres.
+_DEADLOCK_DETECTED = "40P01"
+
+# Hashes recorded in the db, sent once to each reader process.
+_reader_file_hashes = {}
+_reader_sheet_hashes = {}
+
+
+class IngestSummary(NamedTuple):
+    """Outcome of storing several files.
+
+    Attributes:
+        files (int): number of files read.
+        stored (int): number of files stored.
+        skipped (int): number of files that did not change since the last
+            time they were stored.
+        rows (int): number of student rows stored.
+        seconds (float): wall time of the whole run.
+        failures (List[Tuple[str, str]]): path and error of each file that
+            could not be stored.
+    """
+
+    files: int
+    stored: int
+    skipped: int
+    rows: int
+    seconds: float
+    failures: List[Tuple[str, str]]
+
+    def format(self) -> str:
+        """Get the throughput and the failures as text.
+
+        Returns:
+            str: One line with the figures and one per failure.
+        """
+        seconds = self.seconds or float("inf")
+        lines = [
+            f"{self.files} files ({self.stored} stored, {self.skipped} "
+            f"unchanged, {len(self.failures)} failed), {self.rows} rows in "
+            f"{self.seconds:.2f}s: {self.files / seconds:.1f} files/s, "
+            f"{self.rows / seconds:.1f} rows/s"
+        ]
+        lines.extend(
+            f"failed {path}: {error}" for path, error in self.failures
+        )
+        return "\n".join(lines) + "\n"
+
+
+def expand_input_paths(paths: Iterable[str]) -> List[str]:
+    """Get the files named by paths, globs and directories.
+
+    Directories contribute the files of INPUT_EXTENSIONS they contain, not
+    those of their subdirectories. Files named more than once are kept once.
+
+    Args:
+        paths (Iterable[str]): Paths of files or directories, or globs.
+
+    Returns:
+        List[str]: Paths of the files, in the given order and sorted within
+            each glob or directory.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                sorted(
+                    os.path.join(path, name)
+                    for name in os.listdir(path)
+                    if os.path.splitext(name)[1] in INPUT_EXTENSIONS
+                    and os.path.isfile(os.path.join(path, name))
+                )
+            )
+        elif glob.has_magic(path):
+            files.extend(sorted(glob.glob(path)))
+        else:
+            files.append(path)
+    return list(dict.fromkeys(files))
+
+
+def _init_reader(
+    file_hashes: Dict[str, str], sheet_hashes: Dict[Tuple[str, str], str]
+) -> None:
+    """Keep the recorded hashes in each reader process of the pool.
+
+    Args:
+        file_hashes (Dict[str, str]): Content hash recorded for each path.
+        sheet_hashes (Dict[Tuple[str, str], str]): Content hash recorded for
+            each subject and year.
+    """
+    global _reader_file_hashes, _reader_sheet_hashes
+    _reader_file_hashes = file_hashes
+    _reader_sheet_hashes = sheet_hashes
+
+
+def _read_file(file: str) -> Tuple[str, List[SheetData]]:
+    """Parse a file in a reader process.
+
+    Args:
+        file (str): path to the file.
+
+    Returns:
+        Tuple[str, List[SheetData]]: Content hash of the file and data of
+            its sheets, None if the file did not change.
+    """
+    return parse_file(
+        file=file,
+        stored_hash=_reader_file_hashes.get(os.path.abspath(file)),
+        sheet_hashes=_reader_sheet_hashes,
+    )
+
+
+def _store_file(
+    file: str,
+    file_hash: str,
+    sheets: List[SheetData],
+    incremental: bool,
+    changed_marks: str,
+) -> None:
+    """Store the sheets of a file in a single transaction, trying again when
+    it deadlocks with the transaction of another writer.
+
+    Args:
+        file (str): path to the file.
+        file_hash (str): content hash of the file.
+        sheets (List[SheetData]): Data of the sheets of the file.
+        incremental (bool): whether the file is the new version of data that was already stored.
+        changed_marks (str): "keep" or "update" the stored marks that changed.
+    """
+    # Writers lock the rows of the subjects in the same order.
+    sheets = sorted(sheets, key=lambda sheet: (sheet.subject, sheet.year))
+    for attempt in range(DEADLOCK_RETRIES + 1):
+        try:
+            store_sheets_data(
+                sheets=sheets,
+                incremental=incremental,
+                source_file=(os.path.abspath(file), file_hash),
+                changed_marks=changed_marks,
+            )
+            return
+        except OperationalError as error:
+            deadlock = (
+                getattr(error.orig, "pgcode", None) == _DEADLOCK_DETECTED
+            )
+            if not deadlock or attempt == DEADLOCK_RETRIES:
+                raise
+
+
+class _IngestProgress:
+    """Counters and failures of a run, shared by the reader loop and the
+    writer threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.failures = []
+        self.counts = {"stored": 0, "skipped": 0, "rows": 0}
+
+    def fail(self, file: str, error: Exception) -> None:
+        """Record a file that could not be read or stored.
+
+        Args:
+            file (str): path to the file.
+            error (Exception): Error that stopped it.
+        """
+        with self._lock:
+            self.failures.append((file, str(error)))
+
+    def count(self, **amounts: int) -> None:
+        """Add to the counters.
+
+        Args:
+            amounts (int): Amount to add to each counter.
+        """
+        with self._lock:
+            for name, amount in amounts.items():
+                self.counts[name] += amount
+
+
+def _write_files(
+    parsed: queue.Queue,
+    progress: _IngestProgress,
+    incremental: bool,
+    changed_marks: str,
+) -> None:
+    """Store the parsed files of the queue until it hands a None.
+
+    Args:
+        parsed (queue.Queue): Path, content hash and sheets of each file.
+        progress (_IngestProgress): Counters and failures of the run.
+        incremental (bool): whether the files are the new version of data that was already stored.
+        changed_marks (str): "keep" or "update" the stored marks that changed.
+    """
+    while True:
+        item = parsed.get()
+        if item is None:
+            return
+        file, file_hash, sheets = item
+        try:
+            _store_file(
+                file=file,
+                file_hash=file_hash,
+                sheets=sheets,
+                incremental=incremental,
+                changed_marks=changed_marks,
+            )
+        except Exception as error:
+            progress.fail(file=file, error=error)
+            continue
+        progress.count(
+            stored=1, rows=sum(len(sheet.student_data) for sheet in sheets)
+        )
+
+
+def _start_readers(
+    readers: int, hashes: Tuple[Dict[str, str], Dict[Tuple[str, str], str]]
+) -> ProcessPoolExecutor:
+    """Start a pool of reader processes.
+
+    Args:
+        readers (int): number of processes parsing files.
+        hashes (Tuple[Dict[str, str], Dict[Tuple[str, str], str]]): Content
+            hashes recorded for each path and for each subject and year.
+
+    Returns:
+        ProcessPoolExecutor: Pool of the readers.
+    """
+    return ProcessPoolExecutor(
+        max_workers=readers, initializer=_init_reader, initargs=hashes
+    )
+
+
+def _hand_read_file(
+    future: Future, file: str, parsed: queue.Queue, progress: _IngestProgress,
+) -> bool:
+    """Put a file read by a reader in the queue of the writers, or record
+    why it could not be read.
+
+    Blocks while the writers are behind.
+
+    Args:
+        future (Future): Finished reading of the file.
+        file (str): path to the file.
+        parsed (queue.Queue): Queue of the writers.
+        progress (_IngestProgress): Counters and failures of the run.
+
+    Returns:
+        bool: Whether the pool of readers broke, failing every file pending
+            in it.
+    """
+    try:
+        file_hash, sheets = future.result()
+    except BrokenProcessPool as error:
+        progress.fail(file=file, error=error)
+        return True
+    except Exception as error:
+        progress.fail(file=file, error=error)
+        return False
+    if sheets is None:
+        progress.count(skipped=1)
+    else:
+        parsed.put((file, file_hash, sheets))
+    return False
+
+
+def extract_data_from_files(
+    files: List[str],
+    readers: int = 1,
+    writers: int = 1,
+    queue_size: int = None,
+    incremental: bool = False,
+    changed_marks: str = None,
+) -> IngestSummary:
+    """Extract the data from several files and store each of them in its own
+    transaction.
+
+    The files are parsed and validated in a pool of reader processes and
+    handed through a bounded queue to writer threads, which store them while
+    the next ones are being parsed. At most readers + queue_size parsed
+    files are waiting in memory. A file that can not be read or stored is
+    reported in the summary without stopping the others. When a reader
+    process dies, the files that were being read are reported as failures
+    and the rest are read by a new pool.
+
+    Args:
+        files (List[str]): paths to the files.
+        readers (int): number of processes parsing files.
+        writers (int): number of threads storing files, each with its own connection.
+        queue_size (int): number of parsed files waiting for a writer, by default twice the writers.
+        incremental (bool): whether to skip the data that did not change since the last time it was stored.
+        changed_marks (str): "keep" or "update" the stored marks that changed, by default "update" in incremental mode and "keep" otherwise.
+
+    Returns:
+        IngestSummary: Throughput and failures of the run.
+    """
+    start = time.perf_counter()
+    parsed = queue.Queue(maxsize=queue_size or 2 * writers)
+    progress = _IngestProgress()
+    hashes = (
+        (get_ingested_file_hashes(), get_ingested_sheet_hashes())
+        if incremental
+        else ({}, {})
+    )
+    # The processes are forked before the writer threads are started.
+    executor = _start_readers(readers=readers, hashes=hashes)
+    pending = {}
+    remaining = iter(files)
+    broken = False
+
+    def read_next() -> None:
+        file = next(remaining, None)
+        if file is not None:
+            pending[executor.submit(_read_file, file)] = file
+
+    for _ in range(readers):
+        read_next()
+    threads = [
+        threading.Thread(
+            target=_write_files,
+            args=(parsed, progress, incremental, changed_marks),
+            name=f"ingest-writer-{index}",
+        )
+        for index in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file = pending.pop(future)
+                if _hand_read_file(future, file, parsed, progress):
+                    broken = True
+                if not broken:
+                    read_next()
+            if broken and not pending:
+                executor.shutdown()
+                executor = _start_readers(readers=readers, hashes=hashes)
+                broken = False
+                for _ in range(readers):
+                    read_next()
+    finally:
+        executor.shutdown()
+        for thread in threads:
+            parsed.put(None)
+        for thread in threads:
+            thread.join()
+
+    return IngestSummary(
+        files=len(files),
+        stored=progress.counts["stored"],
+        skipped=progress.counts["skipped"],
+        rows=progress.counts["rows"],
+        seconds=time.perf_counter() - start,
+        failures=sorted(progress.failures),
+    )
@@ -0,0 +1,144 @@
+from typing import List, NamedTuple, Sequence
+
+import numpy as np
+
+from src.database_manager import HISTOGRAM_BINS, MARK_RANGE, PASS_MARK
+
+# Percentiles reported by each distribution.
+_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class MarkDistribution(NamedTuple):
+    """Distribution of the marks of a subject on a given year.
+
+    Attributes:
+        subject (str): name of the subject.
+        year (str): year in which the subject has been taught.
+        enrolled (int): number of students enrolled.
+        graded (int): number of students with a mark.
+        pass_mark (float): lowest mark that passes.
+        passed (int): number of students with a mark of at least pass_mark.
+        failed (int): number of students with a mark below pass_mark.
+        mean (float): mean of the marks, None without marks.
+        std (float): population standard deviation of the marks, None
+            without marks.
+        p10 (float): 10th percentile of the marks, None without marks.
+        p25 (float): 25th percentile of the marks, None without marks.
+        median (float): median of the marks, None without marks.
+        p75 (float): 75th percentile of the marks, None without marks.
+        p90 (float): 90th percentile of the marks, None without marks.
+        histogram (List[int]): number of marks in each bin of bin_edges.
+        bin_edges (List[float]): edges of the bins of the histogram.
+    """
+
+    subject: str
+    year: str
+    enrolled: int
+    graded: int
+    pass_mark: float
+    passed: int
+    failed: int
+    mean: float
+    std: float
+    p10: float
+    p25: float
+    median: float
+    p75: float
+    p90: float
+    histogram: List[int]
+    bin_edges: List[float]
+
+
+def compute_distribution(
+    subject: str,
+    year: str,
+    marks: np.ndarray,
+    pass_mark: float = PASS_MARK,
+    bins: int = HISTOGRAM_BINS,
+) -> MarkDistribution:
+    """Compute the distribution of the marks of a subject.
+
+    Args:
+        subject (str): Name of the subject.
+        year (str): Year the subject was taught.
+        marks (np.ndarray): Mark of each student enrolled, NaN for the
+            students without a mark.
+        pass_mark (float): Lowest mark that passes.
+        bins (int): Number of bins of the histogram over MARK_RANGE. Marks
+            outside of the range are counted in the first or last bin.
+
+    Returns:
+        MarkDistribution: Distribution of the marks.
+    """
+    graded = marks[~np.isnan(marks)]
+    histogram, bin_edges = np.histogram(
+        np.clip(graded, *MARK_RANGE), bins=bins, range=MARK_RANGE
+    )
+    if len(graded) == 0:
+        mean = std = None
+        cut_points = [None] * len(_PERCENTILES)
+    else:
+        mean = float(graded.mean())
+        std = float(graded.std())
+        cut_points = np.percentile(graded, _PERCENTILES).tolist()
+    passed = int(np.count_nonzero(graded >= pass_mark))
+
+    return MarkDistribution(
+        subject,
+        year,
+        len(marks),
+        len(graded),
+        pass_mark,
+        passed,
+        len(graded) - passed,
+        mean,
+        std,
+        *cut_points,
+        histogram.tolist(),
+        bin_edges.tolist(),
+    )
+
+
+def compute_distributions(
+    year: str,
+    subjects: Sequence[str],
+    enrolled: Sequence[bool],
+    marks: Sequence[float],
+    pass_mark: float = PASS_MARK,
+    bins: int = HISTOGRAM_BINS,
+) -> List[MarkDistribution]:
+    """Compute the distribution of the marks of every subject of a year from
+    the columns of a single query.
+
+    Args:
+        year (str): Year the subjects were taught.
+        subjects (Sequence[str]): Subject of each row, with the rows of each
+            subject next to each other.
+        enrolled (Sequence[bool]): Whether each row is an enrolment, False
+            for the row of a subject without students.
+        marks (Sequence[float]): Mark of each row, None without a mark.
+        pass_mark (float): Lowest mark that passes.
+        bins (int): Number of bins of the histograms.
+
+    Returns:
+        List[MarkDistribution]: Distribution of each subject, in the order
+            of the rows.
+    """
+    subjects = np.asarray(subjects, dtype=object)
+    enrolled = np.asarray(enrolled, dtype=bool)
+    marks = np.asarray(marks, dtype=np.float64)
+    starts = np.flatnonzero(
+        np.concatenate(([True], subjects[1:] != subjects[:-1]))
+    )[: len(subjects)]
+    ends = np.append(starts[1:], len(subjects))
+
+    return [
+        compute_distribution(
+            subject=subjects[start],
+            year=year,
+            marks=marks[start:end][enrolled[start:end]],
+            pass_mark=pass_mark,
+            bins=bins,
+        )
+        for start, end in zip(starts, ends)
+    ]
@@ -0,0 +1,217 @@
+import functools
+import inspect
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
+
+# Name under which the statements run outside a measured method are counted.
+UNATTRIBUTED = "(other)"
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """Get the p50, p95 and p99 of a list of latencies.
+
+    Args:
+        latencies (List[float]): Latencies, at least one.
+
+    Returns:
+        Dict[str, float]: Value of each percentile, keyed "p50", "p95" and "p99".
+    """
+    if len(latencies) == 1:
+        cut_points = latencies * 99
+    else:
+        cut_points = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50": cut_points[49],
+        "p95": cut_points[94],
+        "p99": cut_points[98],
+    }
+
+
+class MetricsRegistry:
+    """Thread-safe collection of the timings of the measured methods and of
+    the SQL statements and connections they use.
+
+    Each thread keeps the stack of measured methods it is running, so that
+    the statements are counted for the innermost one. Each call leaves the
+    stack by removing its own entry, so generators that are interleaved or
+    closed late do not remove the entries of other calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._methods = {}
+        self._connections = {"acquired": 0, "seconds": 0.0, "max_seconds": 0.0}
+
+    def _method(self, name: str) -> dict:
+        """Get the counters of a method, creating them. The lock must be held."""
+        return self._methods.setdefault(
+            name,
+            {
+                "calls": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+                "statements": 0,
+                "rows": 0,
+            },
+        )
+
+    def current(self) -> str:
+        """Get the name of the innermost method being measured in this thread.
+
+        Returns:
+            str: Name of the method, UNATTRIBUTED outside of them.
+        """
+        stack = getattr(self._local, "stack", None)
+        return stack[-1][0] if stack else UNATTRIBUTED
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Measure the wall time of the block as a call to the method name.
+
+        Args:
+            name (str): Name of the method.
+        """
+        stack = self._local.__dict__.setdefault("stack", [])
+        # A list of its own, so the entry of this call is found by identity.
+        entry = [name]
+        stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            for index in range(len(stack) - 1, -1, -1):
+                if stack[index] is entry:
+                    del stack[index]
+                    break
+            with self._lock:
+                method = self._method(name)
+                method["calls"] += 1
+                method["seconds"] += seconds
+                method["max_seconds"] = max(method["max_seconds"], seconds)
+
+    def wrap(self, name: str, function: Callable) -> Callable:
+        """Get a version of function whose calls are measured as name.
+
+        The calls to generator functions are measured until the generator is
+        exhausted or closed.
+
+        Args:
+            name (str): Name of the method.
+            function (Callable): Function to measure.
+
+        Returns:
+            Callable: Measured function.
+        """
+        if inspect.isgeneratorfunction(function):
+
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                with self.measure(name):
+                    yield from function(*args, **kwargs)
+
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.measure(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def record_statement(self, rows: Optional[int] = None) -> None:
+        """Count a SQL statement for the method running in this thread.
+
+        Args:
+            rows (Optional[int]): Rows returned or affected by the statement,
+                None or negative when the driver does not know them.
+        """
+        name = self.current()
+        with self._lock:
+            method = self._method(name)
+            method["statements"] += 1
+            if rows is not None and rows > 0:
+                method["rows"] += rows
+
+    def record_connection(self, seconds: float) -> None:
+        """Count the time spent waiting for a connection of the pool.
+
+        Args:
+            seconds (float): Time until the connection was acquired.
+        """
+        with self._lock:
+            self._connections["acquired"] += 1
+            self._connections["seconds"] += seconds
+            self._connections["max_seconds"] = max(
+                self._connections["max_seconds"], seconds
+            )
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Get a copy of every counter.
+
+        Returns:
+            Dict[str, dict]: Counters of each method, ordered by name, and of
+                the connections acquired.
+        """
+        with self._lock:
+            return {
+                "methods": {
+                    name: dict(self._methods[name])
+                    for name in sorted(self._methods)
+                },
+                "connections": dict(self._connections),
+            }
+
+    def reset(self) -> None:
+        """Set every counter back to zero."""
+        with self._lock:
+            self._methods.clear()
+            self._connections = {
+                "acquired": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+            }
+
+    def dump(self, output: TextIO) -> None:
+        """Write the counters as JSON.
+
+        Args:
+            output (TextIO): Stream where the JSON is written.
+        """
+        json.dump(self.snapshot(), output, indent=2)
+        output.write("\n")
+
+    def format(self) -> str:
+        """Get the counters as a table, the slowest methods first.
+
+        Returns:
+            str: Table with one line per method and one for the connections.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"{'method':<42} {'calls':>7} {'total ms':>10} {'max ms':>9} "
+            f"{'stmts':>7} {'rows':>9}"
+        ]
+        for name, method in sorted(
+            snapshot["methods"].items(),
+            key=lambda item: item[1]["seconds"],
+            reverse=True,
+        ):
+            lines.append(
+                f"{name:<42} {method['calls']:>7} "
+                f"{method['seconds'] * 1000:>10.2f} "
+                f"{method['max_seconds'] * 1000:>9.2f} "
+                f"{method['statements']:>7} {method['rows']:>9}"
+            )
+        connections = snapshot["connections"]
+        lines.append(
+            f"{'connection acquire':<42} {connections['acquired']:>7} "
+            f"{connections['seconds'] * 1000:>10.2f} "
+            f"{connections['max_seconds'] * 1000:>9.2f}"
+        )
+        return "\n".join(lines) + "\n"
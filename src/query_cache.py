@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Tuple
+
+
+class QueryCache:
+    """Bounded LRU cache of query results with a time to live.
+
+    Each entry depends on one or more scopes (for example a subject-year).
+    Every scope has a generation counter that is increased when its data
+    changes, and entries stored with an older generation of any of their
+    scopes are dropped when they are read.
+
+    Attributes:
+        maxsize (int): maximum number of entries, 0 disables the cache.
+        ttl (float): seconds an entry is valid, None to keep it until it is
+            evicted or invalidated.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def generations(self, scopes: Iterable[Hashable]) -> Tuple[tuple, ...]:
+        """Get the current generation of each scope.
+
+        It has to be called before running the query whose result is going to
+        be stored, so that changes made while it runs invalidate it.
+
+        Args:
+            scopes (Iterable[Hashable]): Scopes the result depends on.
+
+        Returns:
+            Tuple[tuple, ...]: Pairs of scope and generation.
+        """
+        with self._lock:
+            return tuple(
+                (scope, self._generations.get(scope, 0)) for scope in scopes
+            )
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Get the result stored for key if it is still valid.
+
+        Args:
+            key (Hashable): Key of the query.
+
+        Returns:
+            Tuple[bool, Any]: Whether the result was found and the result.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+            value, generations, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._evictions += 1
+                self._misses += 1
+                return False, None
+            if any(
+                self._generations.get(scope, 0) != generation
+                for scope, generation in generations
+            ):
+                del self._entries[key]
+                self._invalidations += 1
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, value
+
+    def put(
+        self, key: Hashable, value: Any, generations: Tuple[tuple, ...]
+    ) -> None:
+        """Store the result of a query, evicting the least recently used
+        entries when the cache is full.
+
+        Args:
+            key (Hashable): Key of the query.
+            value (Any): Result of the query.
+            generations (Tuple[tuple, ...]): Generations of the scopes of the
+                query obtained before running it.
+        """
+        if self._maxsize <= 0:
+            return
+        expires_at = (
+            None if self._ttl is None else time.monotonic() + self._ttl
+        )
+        with self._lock:
+            self._entries[key] = (value, generations, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, scopes: Iterable[Hashable]) -> None:
+        """Increase the generation of scopes so that the entries that depend
+        on them are no longer returned.
+
+        Args:
+            scopes (Iterable[Hashable]): Scopes whose data changed.
+        """
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+            self._evictions = self._invalidations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get the counters of the cache.
+
+        Returns:
+            Dict[str, int]: Number of hits, misses, evictions (by size or
+                time to live), invalidations and current entries.
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,170 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from src import app_logic
+from src.batch_queries import answer_query
+from src.metrics import percentiles
+
+# Number of recent requests of each operation kept to compute percentiles.
+LATENCY_WINDOW = 10000
+
+
+class LatencyStats:
+    """Thread-safe latencies of the requests answered by the server.
+
+    Attributes:
+        window (int): number of recent latencies kept per operation.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._window = window
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._counts = {}
+        self._errors = {}
+
+    def record(self, operation: str, seconds: float, error: bool) -> None:
+        """Record the latency of a request.
+
+        Args:
+            operation (str): Operation of the request.
+            seconds (float): Time taken to answer it.
+            error (bool): Whether the answer was an error.
+        """
+        with self._lock:
+            if operation not in self._latencies:
+                self._latencies[operation] = deque(maxlen=self._window)
+                self._counts[operation] = self._errors[operation] = 0
+            self._latencies[operation].append(seconds * 1000)
+            self._counts[operation] += 1
+            self._errors[operation] += error
+
+    def stats(self) -> Dict[str, dict]:
+        """Get the number of requests and errors and the p50, p95 and p99
+        latency in milliseconds of each operation.
+
+        Returns:
+            Dict[str, dict]: Figures of each operation, ordered by name.
+        """
+        with self._lock:
+            snapshot = {
+                operation: (
+                    list(self._latencies[operation]),
+                    self._counts[operation],
+                    self._errors[operation],
+                )
+                for operation in sorted(self._latencies)
+            }
+        stats = {}
+        for operation, (latencies, count, errors) in snapshot.items():
+            stats[operation] = {"requests": count, "errors": errors}
+            for name, value in percentiles(latencies).items():
+                stats[operation][f"{name}_ms"] = round(value, 4)
+        return stats
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """Answer POST /query with the operations of batch mode and GET /stats
+    with the latency of the requests and the counters of the query cache.
+
+    The body of POST /query is a query object, or a list of them, with the
+    format of batch mode.
+    """
+
+    server_version = "SchoolStatistics"
+
+    def do_POST(self):
+        if self.path != "/query":
+            self._send_json(status=404, body={"error": "Not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            queries = json.loads(self.rfile.read(length))
+        except ValueError as error:
+            self._send_json(
+                status=400, body={"error": f"Invalid JSON: {error}"}
+            )
+            return
+
+        if isinstance(queries, list):
+            self._send_json(
+                status=200, body=[self._answer(query) for query in queries]
+            )
+        else:
+            self._send_json(status=200, body=self._answer(queries))
+
+    def do_GET(self):
+        if self.path != "/stats":
+            self._send_json(status=404, body={"error": "Not found"})
+            return
+        self._send_json(
+            status=200,
+            body={
+                "requests": self.server.latency_stats.stats(),
+                "cache": app_logic.get_cache_stats(),
+            },
+        )
+
+    def _answer(self, query) -> dict:
+        """Answer a query recording its latency."""
+        start = time.perf_counter()
+        response = answer_query(query=query)
+        operation = query.get("operation") if isinstance(query, dict) else None
+        self.server.latency_stats.record(
+            operation=str(operation),
+            seconds=time.perf_counter() - start,
+            error="error" in response,
+        )
+        return response
+
+    def _send_json(self, status: int, body) -> None:
+        """Send a JSON response."""
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        """Do not log every request, the latencies are in /stats."""
+
+
+def create_server(host: str, port: int) -> ThreadingHTTPServer:
+    """Create a server answering each request in its own thread.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 to pick a free one.
+
+    Returns:
+        ThreadingHTTPServer: Server, not started yet.
+    """
+    server = ThreadingHTTPServer((host, port), QueryRequestHandler)
+    server.daemon_threads = True
+    server.latency_stats = LatencyStats()
+    return server
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000) -> None:
+    """Answer queries over HTTP until the process is interrupted.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+    """
+    server = create_server(host=host, port=port)
+    sys.stderr.write(
+        f"Answering queries on http://{host}:{server.server_port}/query\n"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,80 @@
+import sys
+from array import array
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+
+class StudentBatch:
+    """Compact column store of the name, last name and mark of students.
+
+    Names are interned, so the names repeated across the sheets of a
+    workbook are stored once, and marks are packed in a float array instead
+    of one float object per row. Each row is read as a (name, last name,
+    mark) tuple, and a slice of the rows is read as another StudentBatch.
+    """
+
+    __slots__ = ("_names", "_last_names", "_marks")
+
+    def __init__(self, rows: Iterable[Sequence] = ()):
+        self._names = []
+        self._last_names = []
+        self._marks = array("d")
+        for name, last_name, mark in rows:
+            self.append(name=name, last_name=last_name, mark=mark)
+
+    @classmethod
+    def _from_columns(
+        cls, names: List[str], last_names: List[str], marks: array
+    ) -> "StudentBatch":
+        """Create a batch that takes the given columns without copying them."""
+        batch = cls()
+        batch._names = names
+        batch._last_names = last_names
+        batch._marks = marks
+        return batch
+
+    @property
+    def names(self) -> List[str]:
+        """List[str]: Name of each student."""
+        return self._names
+
+    @property
+    def last_names(self) -> List[str]:
+        """List[str]: Last name of each student."""
+        return self._last_names
+
+    @property
+    def marks(self) -> array:
+        """array: Mark of each student."""
+        return self._marks
+
+    def append(self, name: str, last_name: str, mark: float) -> None:
+        """Add the data of a student.
+
+        Args:
+            name (str): Name of the student.
+            last_name (str): Last name of the student.
+            mark (float): Mark of the student.
+        """
+        self._names.append(sys.intern(name))
+        self._last_names.append(sys.intern(last_name))
+        self._marks.append(mark)
+
+    def __len__(self) -> int:
+        return len(self._marks)
+
+    def __iter__(self) -> Iterator[Tuple[str, str, float]]:
+        return zip(self._names, self._last_names, self._marks)
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[Tuple[str, str, float], "StudentBatch"]:
+        if isinstance(index, slice):
+            return self._from_columns(
+                names=self._names[index],
+                last_names=self._last_names[index],
+                marks=self._marks[index],
+            )
+        return self._names[index], self._last_names[index], self._marks[index]
+
+    def __repr__(self) -> str:
+        return f"StudentBatch({list(self)!r})"
@@ -1,5 +1,5 @@
 import sys
-from typing import List
+from typing import Iterator, List
 
 import inquirer
 
@@ -18,12 +18,26 @@ def user_interaction():
                 "Total number of students taking a subject",
                 "List of students in a subject",
                 "List of subjects in a year",
+                "Subjects a student is enrolled in",
             ],
         ),
     ]
 
     selection = inquirer.prompt(questions)["function"]
 
+    if selection == "Subjects a student is enrolled in":
+        name, last_name = _get_student_from_input()
+        transcript = app_logic.get_student_transcript(
+            name=name, last_name=last_name
+        )
+        _process_and_print_result(
+            result=[
+                f"{entry.subject} {entry.year}: {entry.mark}"
+                for entry in transcript
+            ]
+        )
+        return
+
     year = _get_year_from_input()
 
     if selection != "List of subjects in a year":
@@ -55,6 +69,13 @@ def _get_subject_from_input():
     return str(input())
 
 
+def _get_student_from_input():
+    sys.stdout.write(f"Please, input the name of the student\n")
+    name = str(input())
+    sys.stdout.write(f"Please, input the last name of the student\n")
+    return name, str(input())
+
+
 # TODO: more efficient way of handling the choice?
 def _process_selection(selection: str, year: str, subject: str = None):
     if selection == "Percentage of students that failed a subject":
@@ -66,20 +87,20 @@ def _process_selection(selection: str, year: str, subject: str = None):
             subject=subject, year=year
         )
     elif selection == "List of students in a subject":
-        return app_logic.get_list_students_in_subject(
-            subject=subject, year=year
-        )
+        return app_logic.iter_students_in_subject(subject=subject, year=year)
     else:
         return app_logic.get_list_subjects_in_year(year=year)
 
 
-def _process_and_print_result(result: [int, List]):
+def _process_and_print_result(result: [int, List, Iterator]):
     if type(result) is int or type(result) is float:
         sys.stdout.write(f"This is the result of your question: {result}\n")
-    elif type(result) is list:
+    elif type(result) is list or isinstance(result, Iterator):
+        # Elements of iterators are written as soon as they are read.
         sys.stdout.write(f"This is the result of the search:\n")
-        if len(result) == 0:
+        empty = True
+        for element in result:
+            sys.stdout.write(f"{element}\n")
+            empty = False
+        if empty:
             sys.stdout.write(f"none.\n")
-        else:
-            for element in result:
-                sys.stdout.write(f"{element}\n")
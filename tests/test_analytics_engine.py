@@ -0,0 +1,130 @@
+import pytest
+
+from src.analytics_engine import SchoolAnalytics
+
+
+class _FakeSchoolDB:
+    def get_subjects(self):
+        return [
+            ("Math 3", "2019-2020"),
+            ("Lit 3", "2019-2020"),
+            ("Art 3", "2019-2020"),
+            ("Math 3", "2020-2021"),
+        ]
+
+    def get_enrolments(self):
+        return [
+            ("Math 3", "2019-2020", 1, "Isa", "Garvi", 9.0),
+            ("Math 3", "2019-2020", 2, "Tov", "Rod", 4.5),
+            ("Lit 3", "2019-2020", 1, "Isa", "Garvi", 3.0),
+            ("Math 3", "2020-2021", 3, "Mar", "Sousa", 5.0),
+            ("Math 3", "2019-2020", 3, "Mar", "Sousa", 6.0),
+        ]
+
+
+analytics = SchoolAnalytics(school_data_manager=_FakeSchoolDB())
+
+
+def test_number_passed_and_failed():
+    assert (
+        analytics.get_number_passed_by_subject_and_year(
+            subject="Math 3", year="2019-2020"
+        )
+        == 2
+    )
+    assert (
+        analytics.get_number_failed_by_subject_and_year(
+            subject="Math 3", year="2019-2020"
+        )
+        == 1
+    )
+
+
+def test_list_students_in_subject():
+    result = analytics.get_list_students_by_subject_and_year(
+        subject="Math 3", year="2019-2020"
+    )
+
+    assert result == ["Isa Garvi", "Tov Rod", "Mar Sousa"]
+
+
+def test_list_failed_students():
+    result = analytics.get_list_failed_by_subject_and_year(
+        subject="Math 3", year="2019-2020"
+    )
+
+    assert result == ["Tov Rod"]
+
+
+def test_unknown_subject_has_no_students():
+    assert (
+        analytics.get_number_students_by_subject_and_year(
+            subject="Math 3", year="2030-2031"
+        )
+        == 0
+    )
+    assert analytics.get_subject_summary("Math 3", "2030-2031").total == 0
+
+
+def test_subject_summary():
+    result = analytics.get_subject_summary(subject="Math 3", year="2019-2020")
+
+    assert result.total == 3
+    assert result.passed == 2
+    assert result.mean_mark == pytest.approx(6.5)
+    assert result.min_mark == 4.5
+    assert result.max_mark == 9.0
+
+
+def test_subject_stats():
+    result = analytics.get_subject_stats(subject="Math 3", year="2019-2020")
+
+    assert result.enrolled == 3
+    assert result.passed == 2
+    assert result.failed == 1
+    assert result.mark_sum == pytest.approx(19.5)
+    assert result.mark_sum_squares == pytest.approx(137.25)
+    assert analytics.get_subject_stats("Math 3", "2030-2031").enrolled == 0
+
+
+def test_subjects_in_year_include_subjects_without_students():
+    assert analytics.get_list_subjects_by_year(year="2019-2020") == [
+        "Math 3",
+        "Lit 3",
+        "Art 3",
+    ]
+    assert [
+        summary.subject
+        for summary in analytics.get_summaries_by_year(year="2019-2020")
+    ] == ["Art 3", "Lit 3", "Math 3"]
+
+
+def test_mark_distribution():
+    result = analytics.get_mark_distribution(
+        subject="Math 3", year="2019-2020", pass_mark=6.0
+    )
+
+    assert result.enrolled == 3
+    assert result.passed == 2
+    assert result.median == pytest.approx(6.0)
+    assert sum(result.histogram) == 3
+
+
+def test_mark_distributions_by_year():
+    result = analytics.get_mark_distributions_by_year(year="2019-2020")
+
+    assert [distribution.subject for distribution in result] == [
+        "Art 3",
+        "Lit 3",
+        "Math 3",
+    ]
+    assert result[0].enrolled == 0
+
+
+def test_subject_trend():
+    result = analytics.get_subject_trend(subject="Math 3")
+
+    assert [trend.year for trend in result] == ["2019-2020", "2020-2021"]
+    assert result[0].enrolled == 3
+    assert result[1].mean_mark == pytest.approx(5.0)
+    assert analytics.get_subject_trend(subject="Music 3") == []
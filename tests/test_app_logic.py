@@ -1,29 +1,76 @@
 import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
 
 from src import app_logic
+from src.database_manager import (
+    SheetData,
+    StudentPage,
+    SubjectStats,
+    SubjectSummary,
+    SubjectYearTrend,
+)
+from src.mark_distribution import compute_distribution
 from unittest.mock import patch
 
 
-@patch("src.database_manager.SchoolDB.get_number_failed_by_subject_and_year")
-@patch("src.database_manager.SchoolDB.get_number_students_by_subject_and_year")
-def test_get_percentage_failed(
-    get_number_failed_by_subject_and_year_mock,
-    get_number_students_by_subject_and_year_mock,
-):
-    app_logic.get_percentage_failed(subject="Math 3", year="2019-2020")
-    get_number_failed_by_subject_and_year_mock.assert_called_once()
-    get_number_students_by_subject_and_year_mock.assert_called_once()
+@pytest.fixture(autouse=True)
+def clear_query_cache():
+    app_logic.query_cache.clear()
 
 
-@patch("src.database_manager.SchoolDB.get_number_passed_by_subject_and_year")
-@patch("src.database_manager.SchoolDB.get_number_students_by_subject_and_year")
-def test_get_percetage_passed(
-    get_number_passed_by_subject_and_year_mock,
-    get_number_students_by_subject_and_year_mock,
-):
-    app_logic.get_percentage_passed(subject="Math 3", year="2019-2020")
-    get_number_passed_by_subject_and_year_mock.assert_called_once()
-    get_number_students_by_subject_and_year_mock.assert_called_once()
+summary = SubjectSummary(
+    subject="Math 3",
+    year="2019-2020",
+    total=4,
+    passed=3,
+    failed=1,
+    mean_mark=6.5,
+    min_mark=2.0,
+    max_mark=9.5,
+)
+
+stats = SubjectStats(
+    subject="Math 3",
+    year="2019-2020",
+    enrolled=4,
+    passed=3,
+    failed=1,
+    mark_sum=26.0,
+    mark_sum_squares=194.5,
+)
+
+
+@patch("src.database_manager.SchoolDB.get_subject_stats", return_value=stats)
+def test_get_percentage_failed(get_subject_stats_mock):
+    result = app_logic.get_percentage_failed(
+        subject="Math 3", year="2019-2020"
+    )
+    get_subject_stats_mock.assert_called_once()
+    assert result == 0.25
+
+
+@patch("src.database_manager.SchoolDB.get_subject_stats", return_value=stats)
+def test_get_percetage_passed(get_subject_stats_mock):
+    result = app_logic.get_percentage_passed(
+        subject="Math 3", year="2019-2020"
+    )
+    get_subject_stats_mock.assert_called_once()
+    assert result == 0.75
+
+
+@patch(
+    "src.database_manager.SchoolDB.get_subject_stats",
+    return_value=stats._replace(enrolled=0, passed=0, failed=0),
+)
+def test_get_percentage_passed_without_students(get_subject_stats_mock):
+    result = app_logic.get_percentage_passed(
+        subject="Math 3", year="2019-2020"
+    )
+    assert result is None
 
 
 @patch("src.database_manager.SchoolDB.get_list_students_by_subject_and_year")
@@ -48,10 +95,248 @@ def test_get_list_subjects_in_year(get_list_subjects_by_year_mock):
     get_list_subjects_by_year_mock.assert_called_once()
 
 
-@patch("src.database_manager.SchoolDB.store_data_in_db")
-def test_store_data_in_db_called(store_data_in_db_mock):
+@patch("src.database_manager.SchoolDB.store_bulk_data_in_db")
+def test_store_bulk_data_in_db_called(store_bulk_data_in_db_mock):
     student_data = [["Marina", "sdvsdv", 2.0], ["Pau", "Real", 4.0]]
     app_logic.store_student_data(
         subject_name="Lit 4", year="2019-2020", student_data=student_data
     )
-    store_data_in_db_mock.assert_called()
+    store_bulk_data_in_db_mock.assert_called_once()
+
+
+@patch(
+    "src.database_manager.SchoolDB.get_summaries_by_year",
+    return_value=[
+        summary,
+        summary._replace(subject="Music 3", total=0, passed=0, failed=0),
+    ],
+)
+def test_get_year_report(get_summaries_by_year_mock):
+    result = app_logic.get_year_report("2019-2020")
+
+    get_summaries_by_year_mock.assert_called_once()
+    assert result[0].percentage_passed == 0.75
+    assert result[0].percentage_failed == 0.25
+    assert result[1].subject == "Music 3"
+    assert result[1].percentage_passed is None
+
+
+@patch("src.database_manager.SchoolDB.get_subject_stats", return_value=stats)
+def test_repeated_query_served_from_cache(get_subject_stats_mock):
+    app_logic.get_percentage_passed(subject="Math 3", year="2019-2020")
+    result = app_logic.get_percentage_passed("Math 3", "2019-2020")
+
+    get_subject_stats_mock.assert_called_once()
+    assert result == 0.75
+    assert app_logic.get_cache_stats()["hits"] == 1
+    assert app_logic.get_cache_stats()["misses"] == 1
+
+
+@patch("src.database_manager.SchoolDB.store_bulk_data_in_db")
+@patch("src.database_manager.SchoolDB.get_subject_stats", return_value=stats)
+def test_ingest_invalidates_only_affected_queries(
+    get_subject_stats_mock, store_bulk_data_in_db_mock
+):
+    store_bulk_data_in_db_mock.side_effect = lambda sheets, **kwargs: list(
+        sheets
+    )
+    app_logic.get_percentage_passed(subject="Math 3", year="2019-2020")
+    app_logic.get_percentage_passed(subject="Lit 3", year="2019-2020")
+
+    app_logic.store_student_data(
+        subject_name="Math 3",
+        year="2019-2020",
+        student_data=[["Pau", "Real", 4.0]],
+    )
+    app_logic.get_percentage_passed(subject="Math 3", year="2019-2020")
+    app_logic.get_percentage_passed(subject="Lit 3", year="2019-2020")
+
+    assert get_subject_stats_mock.call_count == 3
+    assert app_logic.get_cache_stats()["invalidations"] == 1
+    assert app_logic.get_cache_stats()["hits"] == 1
+
+
+def test_database_built_on_first_use():
+    # A new interpreter, since this one may have built it already.
+    code = (
+        "import sys\n"
+        "from src import app_logic\n"
+        "assert app_logic._school_data_manager is None\n"
+        "assert 'psycopg2' not in sys.modules\n"
+        "assert app_logic.school_data_manager is app_logic.school_data_manager\n"
+        "assert app_logic._school_data_manager is not None\n"
+    )
+
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+@patch(
+    "src.database_manager.SchoolDB.get_page_students_by_subject_and_year",
+    return_value=StudentPage(students=["Isa Garvi"], next_after=None),
+)
+def test_students_page_cached(get_page_students_by_subject_and_year_mock):
+    for _ in range(2):
+        result = app_logic.get_students_page_in_subject(
+            subject="Math 3", year="2019-2020", limit=1
+        )
+
+    get_page_students_by_subject_and_year_mock.assert_called_once()
+    assert result.students == ["Isa Garvi"]
+
+
+@patch(
+    "src.database_manager.SchoolDB.get_page_students_by_subject_and_year",
+    return_value=StudentPage(students=["Isa Garvi"], next_after=None),
+)
+def test_cached_result_not_shared_with_callers(
+    get_page_students_by_subject_and_year_mock,
+):
+    first = app_logic.get_students_page_in_subject(
+        subject="Math 3", year="2019-2020", limit=1
+    )
+    first.students.append("Tov Rod")
+    second = app_logic.get_students_page_in_subject(
+        subject="Math 3", year="2019-2020", limit=1
+    )
+    second.students.clear()
+    result = app_logic.get_students_page_in_subject(
+        subject="Math 3", year="2019-2020", limit=1
+    )
+
+    get_page_students_by_subject_and_year_mock.assert_called_once()
+    assert result == StudentPage(students=["Isa Garvi"], next_after=None)
+
+
+@patch("src.database_manager.SchoolDB.get_subject_stats", return_value=stats)
+def test_cache_key_includes_argument_names_and_defaults(
+    get_subject_stats_mock,
+):
+    app_logic.get_percentage_passed("Math 3", "2019-2020")
+    app_logic.get_percentage_passed(year="2019-2020", subject="Math 3")
+
+    with patch(
+        "src.database_manager.SchoolDB.get_page_students_by_subject_and_year",
+        side_effect=lambda **kwargs: StudentPage(
+            students=[str(sorted(kwargs.items()))], next_after=None
+        ),
+    ) as get_page_students_by_subject_and_year_mock:
+        by_limit = app_logic.get_students_page_in_subject(
+            subject="Math 3", year="2019-2020", limit=5
+        )
+        by_after = app_logic.get_students_page_in_subject(
+            subject="Math 3", year="2019-2020", after=5
+        )
+        by_default = app_logic.get_students_page_in_subject(
+            subject="Math 3", year="2019-2020", limit=100
+        )
+        app_logic.get_students_page_in_subject("Math 3", "2019-2020")
+
+    get_subject_stats_mock.assert_called_once()
+    assert get_page_students_by_subject_and_year_mock.call_count == 3
+    assert by_limit != by_after != by_default
+
+
+def _page_of_students(subject, year, limit, after, outcome):
+    # Students with ids 1 to 6, paged by id like the database does.
+    ids = [id for id in range(1, 7) if after is None or id > after][
+        : limit + 1
+    ]
+    return StudentPage(
+        students=[f"Student {id}" for id in ids[:limit]],
+        next_after=ids[limit - 1] if len(ids) > limit else None,
+    )
+
+
+@patch(
+    "src.database_manager.SchoolDB.get_page_students_by_subject_and_year",
+    side_effect=_page_of_students,
+)
+def test_cached_pages_followed_by_their_cursor(
+    get_page_students_by_subject_and_year_mock,
+):
+    first = app_logic.get_students_page_in_subject(
+        subject="Math 3", year="2019-2020", limit=2
+    )
+    # Same value as the limit of the cached first page.
+    second = app_logic.get_students_page_in_subject(
+        subject="Math 3", year="2019-2020", after=first.next_after
+    )
+    third = app_logic.get_students_page_in_subject(
+        subject="Math 3", year="2019-2020", limit=3, after=3
+    )
+
+    assert first.students == ["Student 1", "Student 2"]
+    assert second == StudentPage(
+        students=[f"Student {id}" for id in range(3, 7)], next_after=None
+    )
+    assert third.students == ["Student 4", "Student 5", "Student 6"]
+
+
+def _distribution_of_marks(subject, year, pass_mark, bins):
+    return compute_distribution(
+        subject=subject,
+        year=year,
+        marks=np.array([2.0, 4.5, 7.0]),
+        pass_mark=pass_mark,
+        bins=bins,
+    )
+
+
+@patch(
+    "src.database_manager.SchoolDB.get_mark_distribution",
+    side_effect=_distribution_of_marks,
+)
+def test_distributions_cached_per_pass_mark_and_bins(
+    get_mark_distribution_mock,
+):
+    by_pass_mark = app_logic.get_mark_distribution(
+        subject="Math 3", year="2019-2020", pass_mark=4
+    )
+    by_bins = app_logic.get_mark_distribution(
+        subject="Math 3", year="2019-2020", bins=4
+    )
+
+    assert get_mark_distribution_mock.call_count == 2
+    assert (by_pass_mark.pass_mark, len(by_pass_mark.histogram)) == (4, 10)
+    assert (by_bins.pass_mark, len(by_bins.histogram)) == (5, 4)
+    assert by_pass_mark.passed == 2
+    assert by_bins.passed == 1
+
+
+def test_record_sheets_keeps_only_subject_and_year():
+    stored = []
+    sheets = [SheetData("Math", "2019-2020", [["Isa", "Garvi", 9.0]])]
+
+    list(app_logic._record_sheets(sheets=sheets, stored=stored))
+
+    assert stored == [("Math", "2019-2020")]
+
+
+@patch("src.database_manager.SchoolDB.store_bulk_data_in_db")
+@patch(
+    "src.database_manager.SchoolDB.get_subject_trend",
+    return_value=[SubjectYearTrend("2019-2020", 4, 3, 1, 6.5)],
+)
+def test_subject_trend_cached_until_the_subject_is_stored(
+    get_subject_trend_mock, store_bulk_data_in_db_mock
+):
+    store_bulk_data_in_db_mock.side_effect = lambda sheets, **kwargs: list(
+        sheets
+    )
+    app_logic.get_subject_trend(subject="Math 3")
+    app_logic.get_subject_trend(subject="Math 3")
+    app_logic.store_student_data(
+        subject_name="Lit 3",
+        year="2020-2021",
+        student_data=[["Pau", "Real", 4.0]],
+    )
+    app_logic.get_subject_trend(subject="Math 3")
+    app_logic.store_student_data(
+        subject_name="Math 3",
+        year="2020-2021",
+        student_data=[["Pau", "Real", 4.0]],
+    )
+    result = app_logic.get_subject_trend(subject="Math 3")
+
+    assert get_subject_trend_mock.call_count == 2
+    assert result[0].passed == 3
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from src import app_logic, async_app_logic
+from src.async_app_logic import AsyncSchoolDB
+from src.database_manager import (
+    SchoolDB,
+    SheetData,
+    Student,
+    StudentSubject,
+    Subject,
+    SubjectYearStats,
+)
+
+school_data_manager = SchoolDB(
+    db_name=os.getenv("DB_NAME"),
+    db_user=os.getenv("DB_USER"),
+    db_pass=os.getenv("DB_PASS"),
+    db_host=os.getenv("DB_HOST"),
+    db_port=os.getenv("DB_PORT"),
+    pool_size=2,
+    max_overflow=2,
+)
+
+
+@pytest.fixture(scope="module")
+def async_school_db():
+    school_data_manager.create_tables()
+    school_data_manager.store_bulk_data_in_db(
+        sheets=[
+            SheetData(
+                subject="Async 1",
+                year="2030-2031",
+                student_data=[
+                    ["Ada", "Nieto", 9.0],
+                    ["Bea", "Nieto", 3.0],
+                    ["Ciro", "Nieto", 6.5],
+                ],
+            ),
+            SheetData(
+                subject="Async 2",
+                year="2030-2031",
+                student_data=[["Ada", "Nieto", 4.0]],
+            ),
+        ]
+    )
+    async_school_db = AsyncSchoolDB(school_data_manager=school_data_manager)
+    yield async_school_db
+    async_school_db.close()
+    # Other test modules expect the tables they fill to be empty.
+    with school_data_manager.session_scope() as session:
+        subject_ids = session.query(Subject.id).filter(
+            Subject.natural_year == "2030-2031"
+        )
+        session.query(StudentSubject).filter(
+            StudentSubject.subject_id.in_(subject_ids.subquery())
+        ).delete(synchronize_session=False)
+        session.query(Subject).filter(
+            Subject.natural_year == "2030-2031"
+        ).delete(synchronize_session=False)
+        session.query(SubjectYearStats).filter(
+            SubjectYearStats.natural_year == "2030-2031"
+        ).delete(synchronize_session=False)
+        session.query(Student).filter(Student.last_name == "Nieto").delete(
+            synchronize_session=False
+        )
+    school_data_manager.dispose()
+
+
+def test_executor_has_one_thread_per_connection(async_school_db):
+    assert async_school_db._executor._max_workers == 4
+
+
+def test_async_queries_match_blocking_ones(async_school_db):
+    async def query():
+        return await asyncio.gather(
+            async_school_db.get_subject_summary(
+                subject="Async 1", year="2030-2031"
+            ),
+            async_school_db.get_list_students_by_subject_and_year(
+                subject="Async 1", year="2030-2031"
+            ),
+            async_school_db.get_list_passed_by_subject_and_year(
+                subject="Async 1", year="2030-2031"
+            ),
+            async_school_db.get_list_subjects_by_year(year="2030-2031"),
+        )
+
+    summary, students, passed, subjects = asyncio.run(query())
+
+    assert summary == school_data_manager.get_subject_summary(
+        subject="Async 1", year="2030-2031"
+    )
+    assert sorted(students) == ["Ada Nieto", "Bea Nieto", "Ciro Nieto"]
+    assert sorted(passed) == ["Ada Nieto", "Ciro Nieto"]
+    assert sorted(subjects) == ["Async 1", "Async 2"]
+
+
+def test_many_async_queries_run_at_once(async_school_db):
+    # Each query waits until another one is running at the same time.
+    barrier = threading.Barrier(2, timeout=10)
+    get_subjects = school_data_manager.get_list_subjects_by_year
+
+    def get_subjects_together(year):
+        barrier.wait()
+        return get_subjects(year=year)
+
+    school_data_manager.get_list_subjects_by_year = get_subjects_together
+    try:
+
+        async def query():
+            return await asyncio.gather(
+                *[
+                    async_school_db.get_list_subjects_by_year(year="2030-2031")
+                    for _ in range(8)
+                ]
+            )
+
+        results = asyncio.run(query())
+    finally:
+        del school_data_manager.get_list_subjects_by_year
+
+    assert len(results) == 8
+    assert all(sorted(result) == ["Async 1", "Async 2"] for result in results)
+
+
+def test_async_app_logic_uses_query_cache(async_school_db):
+    app_logic.query_cache.clear()
+
+    async def query():
+        first = await async_app_logic.get_list_subjects_in_year(
+            year="2030-2031"
+        )
+        second = await async_app_logic.get_list_subjects_in_year(
+            year="2030-2031"
+        )
+        return first, second
+
+    first, second = asyncio.run(query())
+
+    assert sorted(first) == ["Async 1", "Async 2"]
+    assert second == first
+    assert app_logic.get_cache_stats()["hits"] == 1
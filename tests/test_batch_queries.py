@@ -0,0 +1,152 @@
+import io
+import json
+
+import pytest
+
+from src import app_logic, batch_queries
+from src.database_manager import SubjectSummary
+from unittest.mock import patch
+
+
+@patch("src.app_logic.get_percentage_failed", return_value=0.25)
+def test_percentage_failed_query_answered(get_percentage_failed_mock):
+    output = io.StringIO()
+    queries = io.StringIO(
+        '{"operation": "percentage_failed", "subject": "Lit 4", "year": "2019-2020"}\n'
+    )
+
+    answered = batch_queries.run_batch(queries=queries, output=output)
+
+    get_percentage_failed_mock.assert_called_once_with(
+        subject="Lit 4", year="2019-2020"
+    )
+    assert answered == 1
+    assert json.loads(output.getvalue())["result"] == 0.25
+
+
+@patch("src.app_logic.get_list_subjects_in_year", return_value=["Lit 4"])
+def test_list_subjects_query_only_needs_year(get_list_subjects_in_year_mock):
+    output = io.StringIO()
+    queries = io.StringIO(
+        '{"operation": "list_subjects", "year": "2019-2020"}\n\n'
+    )
+
+    batch_queries.run_batch(queries=queries, output=output)
+
+    get_list_subjects_in_year_mock.assert_called_once_with(year="2019-2020")
+    assert json.loads(output.getvalue())["result"] == ["Lit 4"]
+
+
+@patch(
+    "src.app_logic.get_subject_summary",
+    return_value=SubjectSummary("Lit 4", "2019-2020", 2, 1, 1, 5.0, 3.0, 7.0),
+)
+def test_named_tuple_result_written_as_object(get_subject_summary_mock):
+    output = io.StringIO()
+    queries = io.StringIO(
+        '{"operation": "subject_summary", "subject": "Lit 4", "year": "2019-2020"}\n'
+    )
+
+    batch_queries.run_batch(queries=queries, output=output)
+
+    assert json.loads(output.getvalue())["result"]["passed"] == 1
+
+
+def test_invalid_queries_do_not_stop_the_batch():
+    output = io.StringIO()
+    queries = io.StringIO(
+        "not json\n"
+        '{"operation": "unknown", "year": "2019-2020"}\n'
+        '{"operation": "percentage_passed", "year": "2019-2020"}\n'
+    )
+
+    answered = batch_queries.run_batch(queries=queries, output=output)
+
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert answered == 3
+    assert all("error" in response for response in responses)
+
+
+@patch("src.app_logic.get_mark_distributions_in_year", return_value=[])
+def test_distribution_query_passes_optional_arguments(
+    get_mark_distributions_in_year_mock,
+):
+    result = batch_queries.answer_query(
+        query={
+            "operation": "year_distribution",
+            "year": "2019-2020",
+            "pass_mark": 6,
+            "bins": 4,
+        }
+    )
+
+    get_mark_distributions_in_year_mock.assert_called_once_with(
+        year="2019-2020", pass_mark=6, bins=4
+    )
+    assert result["result"] == []
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        {"bins": 0},
+        {"bins": 2.5},
+        {"bins": True},
+        {"bins": batch_queries.MAX_HISTOGRAM_BINS + 1},
+        {"pass_mark": "5"},
+        {"pass_mark": float("nan")},
+        {"pass_mark": float("inf")},
+    ],
+)
+@patch("src.app_logic.get_mark_distribution")
+def test_invalid_optional_arguments_rejected(
+    get_mark_distribution_mock, arguments
+):
+    result = batch_queries.answer_query(
+        query=dict(
+            operation="mark_distribution",
+            subject="Lit 4",
+            year="2019-2020",
+            **arguments,
+        )
+    )
+
+    get_mark_distribution_mock.assert_not_called()
+    assert "error" in result
+
+
+@patch("src.app_logic.get_percentage_passed")
+def test_unknown_keys_rejected(get_percentage_passed_mock):
+    result = batch_queries.answer_query(
+        query={
+            "operation": "percentage_passed",
+            "subject": "Lit 4",
+            "year": "2019-2020",
+            "bins": 4,
+        }
+    )
+
+    get_percentage_passed_mock.assert_not_called()
+    assert result["error"] == "Unknown keys bins"
+
+
+@patch("src.database_manager.SchoolDB.get_mark_distributions_by_year")
+def test_distribution_queries_with_one_optional_argument_not_shared(
+    get_mark_distributions_by_year_mock,
+):
+    get_mark_distributions_by_year_mock.side_effect = lambda year, pass_mark, bins: [
+        {"pass_mark": pass_mark, "bins": bins}
+    ]
+    app_logic.query_cache.clear()
+
+    results = [
+        batch_queries.answer_query(
+            query=dict(operation="year_distribution", year="2019-2020", **args)
+        )["result"]
+        for args in [{"pass_mark": 4}, {"bins": 4}]
+    ]
+
+    assert results == [
+        [{"pass_mark": 4, "bins": 10}],
+        [{"pass_mark": 5, "bins": 4}],
+    ]
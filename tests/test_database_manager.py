@@ -1,9 +1,23 @@
 import os
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Tuple
 
-from sqlalchemy import create_engine
+import pytest
+import sqlalchemy
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
 
 from src import database_manager
-from src.database_manager import SchoolDB, Student, Subject, StudentSubject
+from src.analytics_engine import SchoolAnalytics
+from src.metrics import MetricsRegistry
+from src.database_manager import (
+    SchoolDB,
+    SheetData,
+    Student,
+    Subject,
+    StudentSubject,
+    SubjectYearStats,
+)
 
 
 db_name = os.getenv("DB_NAME")
@@ -26,16 +40,20 @@ school_data_manager = SchoolDB(
     db_host=db_host,
     db_port=db_port,
 )
+school_data_manager.create_tables()
+
+
+def test_sessions_share_the_pooled_engine():
+    with school_data_manager.session_scope() as first_session:
+        first_engine = first_session.get_bind()
+    with school_data_manager.session_scope() as second_session:
+        second_engine = second_session.get_bind()
+
+    assert first_engine is second_engine
 
 
 def test_student_on_db_false():
-    with database_manager.session_scope(
-        user=db_user,
-        password=db_pass,
-        host=db_host,
-        port=db_port,
-        db_name=db_name,
-    ) as session:
+    with school_data_manager.session_scope() as session:
         result = school_data_manager._student_on_db(
             name="Tov", last_name="dsvsv", session=session
         )
@@ -44,13 +62,7 @@ def test_student_on_db_false():
 
 
 def test_new_student_Isa_created():
-    with database_manager.session_scope(
-        user=db_user,
-        password=db_pass,
-        host=db_host,
-        port=db_port,
-        db_name=db_name,
-    ) as session:
+    with school_data_manager.session_scope() as session:
         school_data_manager._get_or_create_student(
             name="Isa", last_name="Garvi", session=session
         )
@@ -61,13 +73,7 @@ def test_new_student_Isa_created():
 
 
 def test_student_on_db_true():
-    with database_manager.session_scope(
-        user=db_user,
-        password=db_pass,
-        host=db_host,
-        port=db_port,
-        db_name=db_name,
-    ) as session:
+    with school_data_manager.session_scope() as session:
 
         result = school_data_manager._student_on_db(
             name="Isa", last_name="Garvi", session=session
@@ -77,13 +83,7 @@ def test_student_on_db_true():
 
 
 def test_student_not_added_if_already_exists_in_db():
-    with database_manager.session_scope(
-        user=db_user,
-        password=db_pass,
-        host=db_host,
-        port=db_port,
-        db_name=db_name,
-    ) as session:
+    with school_data_manager.session_scope() as session:
         school_data_manager._get_or_create_student(
             name="Isa", last_name="Garvi", session=session
         )
@@ -203,3 +203,706 @@ def test_get_list_subjects_by_year():
     assert result[1] == "Literature 3"
     assert result[2] == "Science 3"
     assert "Literature 4" not in result
+
+
+def test_store_bulk_data_in_db():
+    school_data_manager.store_bulk_data_in_db(
+        sheets=[
+            SheetData(
+                subject="History 2",
+                year="2021-2022",
+                student_data=[
+                    ["Isa", "Garvi", 7.5],
+                    ["Lua", "Mar", 4.0],
+                    ["Noa", "Sol", 6.0],
+                ],
+            ),
+            SheetData(
+                subject="Music 2",
+                year="2021-2022",
+                student_data=[["Lua", "Mar", 8.0]],
+            ),
+        ],
+        batch_size=2,
+    )
+
+    result = school_data_manager.get_number_students_by_subject_and_year(
+        subject="History 2", year="2021-2022"
+    )
+
+    assert result == 3
+
+
+def test_store_bulk_data_in_db_reuses_existing_rows():
+    school_data_manager.store_bulk_data_in_db(
+        sheets=[
+            SheetData(
+                subject="History 2",
+                year="2021-2022",
+                student_data=[["Isa", "Garvi", 7.5], ["Noa", "Sol", 6.0]],
+            )
+        ]
+    )
+
+    with school_data_manager.session_scope() as session:
+        students = (
+            session.query(Student)
+            .filter(Student.name == "Isa", Student.last_name == "Garvi")
+            .count()
+        )
+        subjects = (
+            session.query(Subject)
+            .filter(
+                Subject.name == "History 2",
+                Subject.natural_year == "2021-2022",
+            )
+            .count()
+        )
+
+    assert students == 1
+    assert subjects == 1
+    assert (
+        school_data_manager.get_number_students_by_subject_and_year(
+            subject="History 2", year="2021-2022"
+        )
+        == 3
+    )
+
+
+@contextmanager
+def _capture_statements(engine) -> Iterator[List[Tuple[str, Any]]]:
+    """Collect the statement and parameters of every query that engine runs
+    inside the block."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def _explain_statements(function, **kwargs) -> str:
+    """Run function and return the query plan of every SELECT it issued,
+    with sequential scans disabled so that the planner picks any usable
+    index even on small tables."""
+    with _capture_statements(school_data_manager._engine) as statements:
+        function(**kwargs)
+
+    connection = school_data_manager._engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET enable_seqscan = off")
+        plan = []
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan.extend(row[0] for row in cursor.fetchall())
+        cursor.execute("RESET enable_seqscan")
+    finally:
+        connection.close()
+
+    return "\n".join(plan)
+
+
+def test_get_or_create_student_uses_name_index():
+    def get_or_create_student():
+        with school_data_manager.session_scope() as session:
+            school_data_manager._get_or_create_student(
+                name="Isa", last_name="Garvi", session=session
+            )
+
+    plan = _explain_statements(get_or_create_student)
+
+    assert "ix_student_name_last_name" in plan
+    assert "Seq Scan" not in plan
+
+
+def test_get_or_create_subject_uses_name_year_index():
+    def get_or_create_subject():
+        with school_data_manager.session_scope() as session:
+            school_data_manager._get_or_create_subject(
+                subject="Math 3", year="2019-2020", session=session
+            )
+
+    plan = _explain_statements(get_or_create_subject)
+
+    assert "ix_subject_name_natural_year" in plan
+    assert "Seq Scan" not in plan
+
+
+def test_number_passed_uses_subject_mark_index():
+    plan = _explain_statements(
+        school_data_manager.get_number_passed_by_subject_and_year,
+        subject="Math 3",
+        year="2019-2020",
+    )
+
+    assert "ix_subject_name_natural_year" in plan
+    assert "ix_student_subject_subject_id_mark" in plan
+    assert "Seq Scan" not in plan
+
+
+def test_number_failed_uses_subject_mark_index():
+    plan = _explain_statements(
+        school_data_manager.get_number_failed_by_subject_and_year,
+        subject="Math 3",
+        year="2019-2020",
+    )
+
+    assert "ix_student_subject_subject_id_mark" in plan
+    assert "Seq Scan" not in plan
+
+
+def test_duplicated_student_not_allowed():
+    with pytest.raises(IntegrityError):
+        with school_data_manager.session_scope() as session:
+            session.add(Student(name="Isa", last_name="Garvi"))
+
+
+def test_create_tables_merges_duplicates_of_old_schema():
+    with school_data_manager.session_scope() as session:
+        session.execute("DROP INDEX ix_student_name_last_name")
+        first = Student(name="Dup", last_name="Licate")
+        second = Student(name="Dup", last_name="Licate")
+        session.add_all([first, second])
+        session.flush()
+        subject = school_data_manager._get_or_create_subject(
+            subject="Math 3", year="2019-2020", session=session
+        )
+        session.add_all(
+            [
+                StudentSubject(
+                    student_id=first.id, subject_id=subject.id, mark=6.0
+                ),
+                StudentSubject(
+                    student_id=second.id, subject_id=subject.id, mark=7.0
+                ),
+            ]
+        )
+
+    school_data_manager.create_tables()
+
+    with school_data_manager.session_scope() as session:
+        students = (
+            session.query(Student)
+            .filter(Student.name == "Dup", Student.last_name == "Licate")
+            .all()
+        )
+        enrolments = (
+            session.query(StudentSubject)
+            .filter(StudentSubject.student_id == students[0].id)
+            .count()
+        )
+        indexes = {
+            index["name"]
+            for index in sqlalchemy.inspect(session.bind).get_indexes(
+                "student"
+            )
+        }
+
+    assert len(students) == 1
+    assert enrolments == 1
+    assert "ix_student_name_last_name" in indexes
+
+
+def test_get_subject_summary():
+    result = school_data_manager.get_subject_summary(
+        subject="History 2", year="2021-2022"
+    )
+
+    assert result.total == 3
+    assert result.passed == 2
+    assert result.failed == 1
+    assert round(result.mean_mark, 4) == 5.8333
+    assert result.min_mark == 4.0
+    assert result.max_mark == 7.5
+
+
+def test_get_subject_summary_without_students():
+    result = school_data_manager.get_subject_summary(
+        subject="Unknown 1", year="2019-2020"
+    )
+
+    assert result.total == 0
+    assert result.mean_mark is None
+
+
+def test_get_summaries_by_year():
+    result = school_data_manager.get_summaries_by_year(year="2021-2022")
+
+    assert [summary.subject for summary in result] == ["History 2", "Music 2"]
+    assert result[0].total == 3
+    assert result[0].passed == 2
+    assert result[0].failed == 1
+    assert result[1].total == 1
+    assert result[1].max_mark == 8.0
+
+
+def test_analytics_engine_same_results_as_sql():
+    analytics = SchoolAnalytics(school_data_manager=school_data_manager)
+
+    for subject, year in school_data_manager.get_subjects() + [
+        ("Biology 5", "2019-2020")
+    ]:
+        for method in [
+            "get_number_passed_by_subject_and_year",
+            "get_number_failed_by_subject_and_year",
+            "get_number_students_by_subject_and_year",
+            "get_subject_summary",
+        ]:
+            assert getattr(analytics, method)(
+                subject=subject, year=year
+            ) == pytest.approx(
+                getattr(school_data_manager, method)(
+                    subject=subject, year=year
+                )
+            )
+        for method in [
+            "get_list_passed_by_subject_and_year",
+            "get_list_failed_by_subject_and_year",
+            "get_list_students_by_subject_and_year",
+        ]:
+            assert sorted(
+                getattr(analytics, method)(subject=subject, year=year)
+            ) == sorted(
+                getattr(school_data_manager, method)(
+                    subject=subject, year=year
+                )
+            )
+    for year in ["2019-2020", "2020-2021", "2021-2022"]:
+        summaries = analytics.get_summaries_by_year(year=year)
+        expected = school_data_manager.get_summaries_by_year(year=year)
+        assert len(summaries) == len(expected)
+        for summary, expected_summary in zip(summaries, expected):
+            assert summary == pytest.approx(expected_summary)
+        assert analytics.get_list_subjects_by_year(
+            year=year
+        ) == school_data_manager.get_list_subjects_by_year(year=year)
+
+
+def test_incremental_store_writes_only_new_and_changed_marks():
+    school_data_manager.store_bulk_data_in_db(
+        sheets=[
+            SheetData(
+                subject="Drama 1",
+                year="2022-2023",
+                student_data=[["Ana", "Vidal", 5.0], ["Leo", "Pons", 6.0]],
+                content_hash="first",
+            )
+        ],
+        source_file=("/data/drama.xlsx", "file-first"),
+    )
+    with _capture_statements(school_data_manager._engine) as statements:
+        school_data_manager.store_bulk_data_in_db(
+            sheets=[
+                SheetData(
+                    subject="Drama 1",
+                    year="2022-2023",
+                    student_data=[
+                        ["Ana", "Vidal", 5.0],
+                        ["Leo", "Pons", 7.0],
+                        ["Noa", "Sol", 8.0],
+                    ],
+                    content_hash="second",
+                )
+            ],
+            incremental=True,
+        )
+
+    result = school_data_manager.get_list_passed_by_subject_and_year(
+        subject="Drama 1", year="2022-2023"
+    )
+    summary = school_data_manager.get_subject_summary(
+        subject="Drama 1", year="2022-2023"
+    )
+    enrolment_inserts = [
+        statement
+        for statement, _ in statements
+        if statement.startswith("INSERT INTO student_subject")
+    ]
+
+    assert sorted(result) == ["Ana Vidal", "Leo Pons", "Noa Sol"]
+    assert summary.max_mark == 8.0
+    assert summary.min_mark == 5.0
+    assert enrolment_inserts[0].count("(%(subject_id") == 2
+    assert (
+        school_data_manager.get_ingested_sheet_hashes()[
+            ("Drama 1", "2022-2023")
+        ]
+        == "second"
+    )
+    assert (
+        school_data_manager.get_ingested_file_hash(path="/data/drama.xlsx")
+        == "file-first"
+    )
+
+
+def test_store_without_incremental_keeps_stored_marks():
+    school_data_manager.store_bulk_data_in_db(
+        sheets=[
+            SheetData(
+                subject="Drama 1",
+                year="2022-2023",
+                student_data=[["Leo", "Pons", 1.0]],
+                content_hash="third",
+            )
+        ],
+        source_file=("/data/drama.xlsx", "file-third"),
+    )
+
+    result = school_data_manager.get_number_failed_by_subject_and_year(
+        subject="Drama 1", year="2022-2023"
+    )
+
+    assert result == 0
+    # The kept mark is not the one of the sheet, so an incremental run must
+    # not skip it.
+    assert (
+        school_data_manager.get_ingested_sheet_hashes()[
+            ("Drama 1", "2022-2023")
+        ]
+        == "second"
+    )
+    assert (
+        school_data_manager.get_ingested_file_hash(path="/data/drama.xlsx")
+        == "file-first"
+    )
+
+
+def test_metrics_count_statements_and_rows_of_each_method():
+    measured_manager = SchoolDB(
+        db_name=db_name,
+        db_user=db_user,
+        db_pass=db_pass,
+        db_host=db_host,
+        db_port=db_port,
+    )
+    registry = MetricsRegistry()
+    measured_manager.enable_metrics(registry=registry)
+
+    students = measured_manager.get_list_students_by_subject_and_year(
+        subject="Drama 1", year="2022-2023"
+    )
+    snapshot = registry.snapshot()
+    measured_manager.dispose()
+
+    method = snapshot["methods"]["get_list_students_by_subject_and_year"]
+    assert method["calls"] == 1
+    assert method["statements"] == 1
+    assert method["rows"] == len(students)
+    assert snapshot["connections"]["acquired"] == 1
+
+
+def test_store_data_in_db_with_changed_mark_keeps_stored_mark():
+    school_data_manager.store_data_in_db(
+        name="Eva",
+        last_name="Mora",
+        subject="Dance 1",
+        year="2023-2024",
+        mark=3,
+    )
+    school_data_manager.store_data_in_db(
+        name="Eva",
+        last_name="Mora",
+        subject="Dance 1",
+        year="2023-2024",
+        mark=7,
+    )
+
+    summary = school_data_manager.get_subject_summary(
+        subject="Dance 1", year="2023-2024"
+    )
+
+    assert summary.total == 1
+    assert summary.max_mark == 3
+
+
+def test_store_data_in_db_with_changed_mark_updates_stored_mark():
+    school_data_manager.store_data_in_db(
+        name="Eva",
+        last_name="Mora",
+        subject="Dance 1",
+        year="2023-2024",
+        mark=7,
+        changed_marks=database_manager.UPDATE_STORED_MARKS,
+    )
+
+    summary = school_data_manager.get_subject_summary(
+        subject="Dance 1", year="2023-2024"
+    )
+
+    assert summary.total == 1
+    assert summary.max_mark == 7
+
+
+def test_bulk_store_skips_stored_and_repeated_rows_in_memory():
+    with _capture_statements(school_data_manager._engine) as statements:
+        school_data_manager.store_bulk_data_in_db(
+            sheets=[
+                SheetData(
+                    subject="Dance 1",
+                    year="2023-2024",
+                    student_data=[
+                        ["Eva", "Mora", 7.0],
+                        ["Eva", "Mora", 1.0],
+                        ["Gil", "Rey", 6.0],
+                        ["Gil", "Rey", 2.0],
+                    ],
+                )
+            ],
+            changed_marks=database_manager.UPDATE_STORED_MARKS,
+        )
+
+    summary = school_data_manager.get_subject_summary(
+        subject="Dance 1", year="2023-2024"
+    )
+    enrolment_inserts = [
+        statement
+        for statement, _ in statements
+        if statement.startswith("INSERT INTO student_subject")
+    ]
+
+    assert summary.total == 2
+    assert summary.min_mark == 6.0
+    assert len(enrolment_inserts) == 1
+    assert enrolment_inserts[0].count("(%(subject_id") == 1
+
+
+def test_unknown_changed_marks_policy_error():
+    with pytest.raises(ValueError):
+        school_data_manager.store_bulk_data_in_db(
+            sheets=[], changed_marks="overwrite"
+        )
+
+
+def test_iter_students_streams_the_same_students_as_the_list():
+    result = school_data_manager.iter_students_by_subject_and_year(
+        subject="Math 3", year="2019-2020", batch_size=1
+    )
+
+    assert sorted(result) == sorted(
+        school_data_manager.get_list_students_by_subject_and_year(
+            subject="Math 3", year="2019-2020"
+        )
+    )
+
+
+def test_iter_failed_students():
+    result = school_data_manager.iter_students_by_subject_and_year(
+        subject="Math 3", year="2019-2020", outcome=database_manager.FAILED
+    )
+
+    assert sorted(result) == sorted(
+        school_data_manager.get_list_failed_by_subject_and_year(
+            subject="Math 3", year="2019-2020"
+        )
+    )
+
+
+def test_pages_of_students_cover_the_list_once():
+    students = []
+    after = None
+    while True:
+        page = school_data_manager.get_page_students_by_subject_and_year(
+            subject="Math 3", year="2019-2020", limit=1, after=after
+        )
+        students.extend(page.students)
+        if page.next_after is None:
+            break
+        after = page.next_after
+
+    assert sorted(students) == sorted(
+        school_data_manager.get_list_students_by_subject_and_year(
+            subject="Math 3", year="2019-2020"
+        )
+    )
+    assert len(page.students) == 1
+
+
+def test_unknown_outcome_error():
+    with pytest.raises(ValueError):
+        school_data_manager.get_page_students_by_subject_and_year(
+            subject="Math 3", year="2019-2020", outcome="absent"
+        )
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_page_limit_lower_than_one_error(limit):
+    with pytest.raises(ValueError):
+        school_data_manager.get_page_students_by_subject_and_year(
+            subject="Math 3", year="2019-2020", limit=limit
+        )
+
+
+def test_subject_stats_match_the_enrolments():
+    stats = school_data_manager.get_subject_stats(
+        subject="Dance 1", year="2023-2024"
+    )
+    summary = school_data_manager.get_subject_summary(
+        subject="Dance 1", year="2023-2024"
+    )
+
+    assert stats.enrolled == summary.total
+    assert stats.passed == summary.passed
+    assert stats.failed == summary.failed
+    assert stats.mark_sum / stats.enrolled == pytest.approx(summary.mean_mark)
+    assert school_data_manager.rebuild_subject_stats() == []
+
+
+def test_subject_stats_updated_by_single_store():
+    school_data_manager.store_data_in_db(
+        name="Leo",
+        last_name="Sanz",
+        subject="Dance 2",
+        year="2023-2024",
+        mark=3.0,
+    )
+    school_data_manager.store_data_in_db(
+        name="Leo",
+        last_name="Sanz",
+        subject="Dance 2",
+        year="2023-2024",
+        mark=8.0,
+        changed_marks=database_manager.UPDATE_STORED_MARKS,
+    )
+
+    stats = school_data_manager.get_subject_stats(
+        subject="Dance 2", year="2023-2024"
+    )
+
+    assert stats[2:] == (1, 1, 0, 8.0, 64.0)
+    assert school_data_manager.rebuild_subject_stats() == []
+
+
+def test_rebuild_subject_stats_fixes_drift():
+    with school_data_manager.session_scope() as session:
+        session.query(SubjectYearStats).filter_by(
+            subject="Dance 2", natural_year="2023-2024"
+        ).update({"passed": 5})
+
+    differences = school_data_manager.rebuild_subject_stats()
+
+    assert len(differences) == 1
+    assert differences[0][0].passed == 5
+    assert differences[0][1].passed == 1
+    assert school_data_manager.rebuild_subject_stats() == []
+
+
+def test_subject_stats_of_unknown_subject_are_zero():
+    stats = school_data_manager.get_subject_stats(
+        subject="Dance 9", year="2023-2024"
+    )
+
+    assert stats.enrolled == 0
+
+
+def test_create_tables_populates_missing_subject_stats():
+    expected = school_data_manager.get_subject_stats(
+        subject="Math 3", year="2019-2020"
+    )
+    SubjectYearStats.__table__.drop(engine)
+
+    school_data_manager.create_tables()
+
+    assert (
+        school_data_manager.get_subject_stats(
+            subject="Math 3", year="2019-2020"
+        )
+        == expected
+    )
+    assert expected.enrolled > 0
+
+
+def test_transcripts_of_a_batch_of_students_in_one_query():
+    with _capture_statements(school_data_manager._engine) as statements:
+        result = school_data_manager.get_transcripts(
+            students=[("Eva", "Mora"), ("Gil", "Rey"), ("No", "Body")]
+        )
+
+    assert len(statements) == 1
+    assert result[("Eva", "Mora")] == [("Dance 1", "2023-2024", 7.0)]
+    assert [entry.subject for entry in result[("Gil", "Rey")]] == ["Dance 1"]
+    assert result[("No", "Body")] == []
+
+
+def test_transcript_of_a_student():
+    result = school_data_manager.get_transcript(name="Leo", last_name="Sanz")
+
+    assert result == [("Dance 2", "2023-2024", 8.0)]
+
+
+def test_transcripts_use_student_id_index():
+    with school_data_manager.session_scope() as session:
+        session.execute("SET enable_seqscan = off")
+        plan = "\n".join(
+            row[0]
+            for row in session.execute(
+                "EXPLAIN SELECT * FROM student_subject WHERE student_id = 1"
+            )
+        )
+
+    assert "ix_student_subject_student_id" in plan
+
+
+def _assert_same_distribution(first, second):
+    assert first._replace(mean=None, std=None) == second._replace(
+        mean=None, std=None
+    )
+    assert first.mean == pytest.approx(second.mean)
+    assert first.std == pytest.approx(second.std)
+
+
+def test_mark_distributions_match_the_numpy_backend():
+    analytics = SchoolAnalytics(school_data_manager=school_data_manager)
+
+    by_year = school_data_manager.get_mark_distributions_by_year(
+        year="2019-2020", pass_mark=7.0
+    )
+    expected = analytics.get_mark_distributions_by_year(
+        year="2019-2020", pass_mark=7.0
+    )
+    assert len(by_year) == len(expected)
+    for distribution, expected_distribution in zip(by_year, expected):
+        _assert_same_distribution(distribution, expected_distribution)
+    _assert_same_distribution(
+        school_data_manager.get_mark_distribution(
+            subject="Math 3", year="2019-2020", bins=4
+        ),
+        analytics.get_mark_distribution(
+            subject="Math 3", year="2019-2020", bins=4
+        ),
+    )
+
+
+def test_mark_distribution_of_unknown_subject():
+    result = school_data_manager.get_mark_distribution(
+        subject="Dance 9", year="2023-2024"
+    )
+
+    assert result.subject == "Dance 9"
+    assert result.enrolled == 0
+
+
+def test_subject_trend_matches_the_numpy_backend():
+    school_data_manager.store_bulk_data_in_db(
+        sheets=[
+            SheetData(
+                subject="Math 3",
+                year="2018-2019",
+                student_data=[["Eva", "Mora", 4.0]],
+            )
+        ]
+    )
+    analytics = SchoolAnalytics(school_data_manager=school_data_manager)
+
+    result = school_data_manager.get_subject_trend(subject="Math 3")
+    expected = analytics.get_subject_trend(subject="Math 3")
+
+    assert [trend.year for trend in result] == ["2018-2019", "2019-2020"]
+    assert [trend[:4] for trend in result] == [trend[:4] for trend in expected]
+    assert result[1].mean_mark == pytest.approx(expected[1].mean_mark)
@@ -1,13 +1,21 @@
+import datetime
+import io
 import xlrd
 import pytest
-from src import excel_file_processing
+from src import app_logic, excel_file_processing
+from src.database_manager import SheetData, StudentBatch
 from itertools import product
 from unittest.mock import patch
-from src.custom_errors import NotAnExcelFileError, WrongOrderOfColumns
+from src.custom_errors import (
+    NotAnExcelFileError,
+    WrongOrderOfColumns,
+    WrongRowData,
+)
 
 input_file = "files/test-input.xlsx"
 invalid_columns_file = "files/test-input-invalid-columns.xlsx"
 not_excel_file = "files/no-excel-file-test.txt"
+app_logic.init_database()
 
 
 def test_input_file_not_valid():
@@ -52,6 +60,92 @@ def test_get_subject_name_and_year_called():
     _get_subject_name_and_year_mock.assert_called()
 
 
+def test_invalid_column_order_error_with_workers():
+    with pytest.raises(WrongOrderOfColumns):
+        excel_file_processing.extract_data_from_file(
+            file=invalid_columns_file, workers=2
+        )
+
+
+def test_sheets_parsed_in_parallel_in_workbook_order():
+    sheets = list(
+        excel_file_processing._get_sheets_data_in_parallel(
+            file=input_file, workers=2
+        )
+    )
+
+    assert [(sheet.subject, sheet.year) for sheet in sheets] == [
+        ("Lit 3", "2019-2020"),
+        ("Grammar 4", "2019-2020"),
+    ]
+    assert sheets[0].student_data[0] == ("Isa", "Garvi", 9.0)
+    assert len(sheets[0].student_data) == 5
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sheets_parsed_in_parallel_match_sheets_parsed_in_order(workers):
+    def contents(sheets):
+        return [
+            (sheet.subject, sheet.year, sheet.content_hash)
+            + tuple(map(tuple, sheet.student_data))
+            for sheet in sheets
+        ]
+
+    workbook = xlrd.open_workbook(filename=input_file, on_demand=True)
+    expected = contents(excel_file_processing._get_sheets_data(workbook))
+
+    sheets = excel_file_processing._get_sheets_data_in_parallel(
+        file=input_file, workers=workers
+    )
+
+    assert contents(sheets) == expected
+
+
+def test_sheet_hash_does_not_depend_on_the_reader(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    file = str(tmp_path / "marks.xlsx")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Lit 3 2019-2020"
+    sheet.append(["Name", "Last name", "Mark"])
+    sheet.append(["Isa", "Garvi", 9])
+    sheet.append(["Tov", "Rod", 4.5])
+    sheet.append(["Mar", "Sousa", datetime.datetime(1900, 1, 6)])
+    sheet["D3"].font = openpyxl.styles.Font(bold=True)
+    sheet["A6"].font = openpyxl.styles.Font(bold=True)
+    workbook.save(file)
+
+    expected = next(
+        excel_file_processing._get_sheets_data(
+            xlrd.open_workbook(filename=file, on_demand=True)
+        )
+    )
+    result = next(
+        excel_file_processing._get_sheets_data_in_parallel(
+            file=file, workers=1
+        )
+    )
+
+    assert list(result.student_data) == [
+        ("Isa", "Garvi", 9.0),
+        ("Tov", "Rod", 4.5),
+        ("Mar", "Sousa", 6.0),
+    ]
+    assert result.content_hash == expected.content_hash
+
+
+@patch.object(excel_file_processing, "store_sheets_data")
+def test_extract_with_workers_stores_every_sheet(store_sheets_data_mock):
+    def consume(sheets, **kwargs):
+        assert len(list(sheets)) == 2
+
+    store_sheets_data_mock.side_effect = consume
+
+    excel_file_processing.extract_data_from_file(file=input_file, workers=2)
+
+    store_sheets_data_mock.assert_called_once()
+
+
 def test_not_an_excel_file_error():
     with pytest.raises(NotAnExcelFileError):
         excel_file_processing.extract_data_from_file(file=not_excel_file)
@@ -76,7 +170,7 @@ def test_first_student_data_from_Lit3_20192020():
         sheet=first_sheet
     )
 
-    assert student_data[0] == ["Isa", "Garvi", 9.0]
+    assert student_data[0] == ("Isa", "Garvi", 9.0)
 
 
 def test_students_data_length_is_five():
@@ -88,3 +182,224 @@ def test_students_data_length_is_five():
     )
 
     assert len(student_data) == 5
+
+
+class _FakeSheet:
+    name = "Lit 3 2019-2020"
+
+    def __init__(self, rows):
+        self._rows = rows
+        self.nrows = len(rows)
+
+    def row_values(self, row_index):
+        return self._rows[row_index]
+
+
+def test_row_data_is_read_lazily():
+    sheet = _FakeSheet(
+        rows=[["Name", "Last name", "Mark"], ["Isa", "Garvi", 9.0], ["x"]]
+    )
+
+    student_data = excel_file_processing._iter_row_data_from_sheet(sheet=sheet)
+
+    assert next(student_data) == ["Isa", "Garvi", 9.0]
+
+
+def test_empty_rows_are_skipped():
+    sheet = _FakeSheet(
+        rows=[
+            ["Name", "Last name", "Mark"],
+            ["", "", ""],
+            ["Isa", "Garvi", 9.0],
+        ]
+    )
+
+    student_data = excel_file_processing._get_row_data_from_sheet(sheet=sheet)
+
+    assert list(student_data) == [("Isa", "Garvi", 9.0)]
+
+
+def test_wrong_row_data_error():
+    sheet = _FakeSheet(
+        rows=[["Name", "Last name", "Mark"], ["Isa", "Garvi", "nine"]]
+    )
+
+    with pytest.raises(WrongRowData):
+        excel_file_processing._get_row_data_from_sheet(sheet=sheet)
+
+
+def test_row_valid():
+    result = excel_file_processing._validate_row(row=["Isa", "Garvi", 9.0])
+    assert result is True
+
+
+def test_row_without_last_name_not_valid():
+    result = excel_file_processing._validate_row(row=["Isa", "", 9.0])
+    assert result is False
+
+
+@patch.object(excel_file_processing, "store_sheets_data")
+def test_unchanged_file_not_stored_in_incremental_mode(store_sheets_data_mock):
+    with patch.object(
+        excel_file_processing,
+        "get_ingested_file_hash",
+        return_value=excel_file_processing._hash_file(file=input_file),
+    ):
+        excel_file_processing.extract_data_from_file(
+            file=input_file, incremental=True
+        )
+
+    store_sheets_data_mock.assert_not_called()
+
+
+def test_unchanged_sheets_skipped():
+    sheets = [
+        SheetData("Lit 3", "2019-2020", [], content_hash="same"),
+        SheetData("Grammar 4", "2019-2020", [], content_hash="new"),
+    ]
+
+    result = excel_file_processing._skip_unchanged_sheets(
+        sheets=sheets,
+        sheet_hashes={
+            ("Lit 3", "2019-2020"): "same",
+            ("Grammar 4", "2019-2020"): "old",
+        },
+    )
+
+    assert [sheet.subject for sheet in result] == ["Grammar 4"]
+
+
+def test_sheet_hash_changes_with_content():
+    first_sheet = _FakeSheet(
+        rows=[["Name", "Last name", "Mark"], ["Isa", "Garvi", 9.0]]
+    )
+    second_sheet = _FakeSheet(
+        rows=[["Name", "Last name", "Mark"], ["Isa", "Garvi", 8.0]]
+    )
+
+    assert excel_file_processing._hash_sheet(
+        sheet=first_sheet
+    ) != excel_file_processing._hash_sheet(sheet=second_sheet)
+
+
+def test_delimited_file_valid():
+    assert excel_file_processing._is_delimited_file(file="marks.csv") is True
+    assert excel_file_processing._is_delimited_file(file="marks.tsv") is True
+    assert excel_file_processing._is_delimited_file(file=input_file) is False
+
+
+def test_csv_rows_grouped_by_subject_and_year():
+    content = io.StringIO(
+        "Subject,Course,Year,Name,Last name,Mark\n"
+        "Lit,3,2019-2020,Isa,Garvi,9\n"
+        "Lit,3,2019-2020,Ana,Lopez,4.5\n"
+        "\n"
+        "Grammar,4,2019-2020,Isa,Garvi,7\n"
+    )
+
+    sheets = [
+        sheet._replace(student_data=list(sheet.student_data))
+        for sheet in excel_file_processing._get_sheets_data_from_delimited_file(
+            content=content, file="marks.csv"
+        )
+    ]
+
+    assert sheets == [
+        SheetData(
+            "Lit 3",
+            "2019-2020",
+            [["Isa", "Garvi", 9.0], ["Ana", "Lopez", 4.5]],
+        ),
+        SheetData("Grammar 4", "2019-2020", [["Isa", "Garvi", 7.0]]),
+    ]
+
+
+def test_tsv_column_order_not_valid():
+    content = io.StringIO("Subject\tCourse\tYear\tLast name\tName\tMark\n")
+
+    with pytest.raises(WrongOrderOfColumns):
+        list(
+            excel_file_processing._get_sheets_data_from_delimited_file(
+                content=content, file="marks.tsv"
+            )
+        )
+
+
+def test_csv_wrong_row_data_error():
+    content = io.StringIO(
+        "Subject,Course,Year,Name,Last name,Mark\n"
+        "Lit,3,2019-2020,Isa,Garvi,nine\n"
+    )
+    sheets = excel_file_processing._get_sheets_data_from_delimited_file(
+        content=content, file="marks.csv"
+    )
+
+    with pytest.raises(WrongRowData):
+        list(next(sheets).student_data)
+
+
+@pytest.mark.parametrize("mark", ["nan", "inf", "-inf"])
+def test_non_finite_mark_in_delimited_rows_is_invalid(mark):
+    content = io.StringIO(
+        "Subject,Course,Year,Name,Last name,Mark\n"
+        f"Lit,3,2019-2020,Isa,Garvi,{mark}\n"
+    )
+    sheets = excel_file_processing._get_sheets_data_from_delimited_file(
+        content=content, file="marks.csv"
+    )
+
+    with pytest.raises(WrongRowData):
+        list(next(sheets).student_data)
+
+
+@patch.object(excel_file_processing, "store_sheets_data")
+def test_extract_csv_file_stores_every_sheet(store_sheets_data_mock, tmp_path):
+    csv_file = tmp_path / "marks.csv"
+    csv_file.write_text(
+        "Subject,Course,Year,Name,Last name,Mark\n"
+        "Lit,3,2019-2020,Isa,Garvi,9\n"
+        "Grammar,4,2019-2020,Isa,Garvi,7\n"
+    )
+
+    def consume(sheets, **kwargs):
+        assert [sheet.subject for sheet in sheets] == ["Lit 3", "Grammar 4"]
+
+    store_sheets_data_mock.side_effect = consume
+
+    excel_file_processing.extract_data_from_file(file=str(csv_file))
+
+    store_sheets_data_mock.assert_called_once()
+
+
+def test_parse_csv_file_with_byte_order_mark(tmp_path):
+    csv_file = tmp_path / "marks.csv"
+    csv_file.write_text(
+        "Subject,Course,Year,Name,Last name,Mark\n"
+        "Lit,3,2019-2020,José,Núñez,9\n",
+        encoding="utf-8-sig",
+    )
+
+    _, sheets = excel_file_processing.parse_file(file=str(csv_file))
+
+    assert [sheet.subject for sheet in sheets] == ["Lit 3"]
+    assert list(sheets[0].student_data) == [("José", "Núñez", 9.0)]
+
+
+def test_parse_file_reads_every_sheet_into_batches():
+    file_hash, sheets = excel_file_processing.parse_file(file=input_file)
+
+    assert len(file_hash) == 64
+    assert sheets
+    assert all(
+        isinstance(sheet.student_data, StudentBatch) for sheet in sheets
+    )
+
+
+def test_parse_file_skips_unchanged_file():
+    file_hash, _ = excel_file_processing.parse_file(file=input_file)
+
+    result = excel_file_processing.parse_file(
+        file=input_file, stored_hash=file_hash
+    )
+
+    assert result == (file_hash, None)
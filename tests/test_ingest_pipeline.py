@@ -0,0 +1,151 @@
+import os
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from unittest.mock import patch
+
+from src import ingest_pipeline
+
+
+def _write_csv(path, rows):
+    path.write_text(
+        "Subject,Course,Year,Name,Last name,Mark\n"
+        + "".join(f"{row}\n" for row in rows)
+    )
+    return str(path)
+
+
+class _Deadlock(Exception):
+    pgcode = "40P01"
+
+
+def test_expand_input_paths(tmp_path):
+    (tmp_path / "b.csv").write_text("")
+    (tmp_path / "a.xlsx").write_text("")
+    (tmp_path / "notes.txt").write_text("")
+    (tmp_path / "old").mkdir()
+    (tmp_path / "old" / "c.csv").write_text("")
+
+    result = ingest_pipeline.expand_input_paths(
+        paths=[
+            str(tmp_path),
+            str(tmp_path / "*.csv"),
+            str(tmp_path / "old" / "c.csv"),
+        ]
+    )
+
+    assert result == [
+        os.path.join(str(tmp_path), "a.xlsx"),
+        os.path.join(str(tmp_path), "b.csv"),
+        str(tmp_path / "old" / "c.csv"),
+    ]
+
+
+@patch("src.ingest_pipeline.store_sheets_data")
+def test_bad_file_does_not_stop_the_others(store_sheets_data_mock, tmp_path):
+    files = [
+        _write_csv(tmp_path / "a.csv", ["Math,3,2019-2020,Isa,Garvi,9"]),
+        _write_csv(tmp_path / "b.csv", ["Math,3,2019-2020,Tov,Rod,oops"]),
+        _write_csv(
+            tmp_path / "c.csv",
+            ["Lit,3,2019-2020,Isa,Garvi,4", "Lit,3,2019-2020,Tov,Rod,6"],
+        ),
+        str(tmp_path / "missing.csv"),
+    ]
+
+    summary = ingest_pipeline.extract_data_from_files(
+        files=files, readers=2, writers=2, queue_size=1
+    )
+
+    assert summary.files == 4
+    assert summary.stored == 2
+    assert summary.rows == 3
+    assert [path for path, _ in summary.failures] == files[1:2] + files[3:]
+    assert store_sheets_data_mock.call_count == 2
+    assert "2 stored" in summary.format()
+
+
+def _read_file_or_die(file):
+    if file.endswith("die.csv"):
+        os._exit(1)
+    return ingest_pipeline.parse_file(file=file)
+
+
+@patch("src.ingest_pipeline._read_file", _read_file_or_die)
+@patch("src.ingest_pipeline.store_sheets_data")
+def test_dead_reader_does_not_stop_the_others(
+    store_sheets_data_mock, tmp_path
+):
+    files = [
+        _write_csv(tmp_path / "die.csv", ["Math,3,2019-2020,Isa,Garvi,9"]),
+    ] + [
+        _write_csv(tmp_path / f"{name}.csv", [f"Lit,3,2019-2020,Isa,{name},4"])
+        for name in ["a", "b", "c"]
+    ]
+
+    summary = ingest_pipeline.extract_data_from_files(
+        files=files, readers=1, writers=1
+    )
+
+    assert summary.failures[0][0] == files[0]
+    assert summary.stored == 3
+    assert store_sheets_data_mock.call_count == 3
+
+
+@patch("src.ingest_pipeline.get_ingested_sheet_hashes", return_value={})
+@patch("src.ingest_pipeline.get_ingested_file_hashes")
+@patch("src.ingest_pipeline.store_sheets_data")
+def test_unchanged_files_skipped_in_incremental_mode(
+    store_sheets_data_mock,
+    get_ingested_file_hashes_mock,
+    get_ingested_sheet_hashes_mock,
+    tmp_path,
+):
+    file = _write_csv(tmp_path / "a.csv", ["Math,3,2019-2020,Isa,Garvi,9"])
+    file_hash, _ = ingest_pipeline.parse_file(file=file)
+    get_ingested_file_hashes_mock.return_value = {
+        os.path.abspath(file): file_hash
+    }
+
+    summary = ingest_pipeline.extract_data_from_files(
+        files=[file], incremental=True
+    )
+
+    assert summary.skipped == 1
+    store_sheets_data_mock.assert_not_called()
+
+
+@patch("src.ingest_pipeline.store_sheets_data")
+def test_store_file_retries_deadlocks(store_sheets_data_mock):
+    store_sheets_data_mock.side_effect = [
+        OperationalError("INSERT", {}, _Deadlock()),
+        None,
+    ]
+
+    ingest_pipeline._store_file(
+        file="a.csv",
+        file_hash="hash",
+        sheets=[],
+        incremental=False,
+        changed_marks=None,
+    )
+
+    assert store_sheets_data_mock.call_count == 2
+
+
+@patch("src.ingest_pipeline.store_sheets_data")
+def test_store_file_does_not_retry_other_errors(store_sheets_data_mock):
+    store_sheets_data_mock.side_effect = OperationalError(
+        "INSERT", {}, Exception("connection lost")
+    )
+
+    with pytest.raises(OperationalError):
+        ingest_pipeline._store_file(
+            file="a.csv",
+            file_hash="hash",
+            sheets=[],
+            incremental=False,
+            changed_marks=None,
+        )
+
+    store_sheets_data_mock.assert_called_once()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.mark_distribution import compute_distribution, compute_distributions
+
+
+def test_distribution_of_marks():
+    result = compute_distribution(
+        subject="Math 3",
+        year="2019-2020",
+        marks=np.array([2.0, 4.0, 6.0, 8.0, np.nan]),
+    )
+
+    assert result.enrolled == 5
+    assert result.graded == 4
+    assert (result.passed, result.failed) == (2, 2)
+    assert result.mean == pytest.approx(5.0)
+    assert result.std == pytest.approx(np.sqrt(5.0))
+    assert result.median == pytest.approx(5.0)
+    assert result.p10 == pytest.approx(2.6)
+    assert result.p90 == pytest.approx(7.4)
+    assert result.histogram == [0, 0, 1, 0, 1, 0, 1, 0, 1, 0]
+    assert result.bin_edges[0] == 0.0 and result.bin_edges[-1] == 10.0
+
+
+def test_pass_mark_and_bins_are_configurable():
+    result = compute_distribution(
+        subject="Math 3",
+        year="2019-2020",
+        marks=np.array([4.0, 6.0, 10.0]),
+        pass_mark=6.5,
+        bins=2,
+    )
+
+    assert (result.passed, result.failed) == (1, 2)
+    assert result.histogram == [1, 2]
+
+
+def test_distribution_without_marks():
+    result = compute_distribution(
+        subject="Math 3", year="2019-2020", marks=np.array([np.nan])
+    )
+
+    assert result.enrolled == 1
+    assert result.mean is None
+    assert result.median is None
+    assert sum(result.histogram) == 0
+
+
+def test_distributions_split_the_columns_by_subject():
+    result = compute_distributions(
+        year="2019-2020",
+        subjects=["Art 3", "Lit 3", "Lit 3", "Math 3"],
+        enrolled=[False, True, True, True],
+        marks=[None, 3.0, 7.0, None],
+    )
+
+    assert [distribution.subject for distribution in result] == [
+        "Art 3",
+        "Lit 3",
+        "Math 3",
+    ]
+    assert [distribution.enrolled for distribution in result] == [0, 2, 1]
+    assert result[1].mean == pytest.approx(5.0)
+    assert result[2].graded == 0
+
+
+def test_distributions_of_no_rows():
+    assert (
+        compute_distributions(
+            year="2019-2020", subjects=(), enrolled=(), marks=()
+        )
+        == []
+    )
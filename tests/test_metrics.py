@@ -0,0 +1,90 @@
+import io
+import json
+
+from src.metrics import UNATTRIBUTED, MetricsRegistry
+
+
+def test_wrapped_calls_measured():
+    registry = MetricsRegistry()
+    double = registry.wrap("double", lambda value: value * 2)
+
+    assert double(2) == 4
+    assert double(3) == 6
+    assert registry.snapshot()["methods"]["double"]["calls"] == 2
+
+
+def test_statements_counted_for_innermost_method():
+    registry = MetricsRegistry()
+
+    with registry.measure("outer"):
+        registry.record_statement(rows=1)
+        with registry.measure("inner"):
+            registry.record_statement(rows=3)
+    registry.record_statement(rows=-1)
+
+    methods = registry.snapshot()["methods"]
+    assert methods["outer"]["statements"] == 1
+    assert methods["inner"]["rows"] == 3
+    assert methods[UNATTRIBUTED]["statements"] == 1
+    assert methods[UNATTRIBUTED]["rows"] == 0
+
+
+def test_generator_measured_until_exhausted():
+    registry = MetricsRegistry()
+
+    def numbers():
+        yield 1
+        registry.record_statement(rows=1)
+        yield 2
+
+    result = list(registry.wrap("numbers", numbers)())
+
+    assert result == [1, 2]
+    assert registry.snapshot()["methods"]["numbers"]["statements"] == 1
+
+
+def test_interleaved_generators_leave_their_own_entries():
+    registry = MetricsRegistry()
+
+    def numbers():
+        registry.record_statement(rows=1)
+        yield 1
+        yield 2
+
+    first = registry.wrap("first", numbers)()
+    second = registry.wrap("second", numbers)()
+    next(first)
+    next(second)
+    first.close()
+    registry.record_statement()
+    list(second)
+    registry.record_statement()
+
+    methods = registry.snapshot()["methods"]
+    assert methods["first"]["statements"] == 1
+    assert methods["second"]["statements"] == 2
+    assert methods["second"]["rows"] == 1
+    assert methods[UNATTRIBUTED]["statements"] == 1
+
+
+def test_dump_as_json():
+    registry = MetricsRegistry()
+    registry.record_connection(seconds=0.5)
+    output = io.StringIO()
+
+    registry.dump(output=output)
+
+    assert json.loads(output.getvalue())["connections"]["acquired"] == 1
+
+
+def test_reset():
+    registry = MetricsRegistry()
+    with registry.measure("method"):
+        pass
+
+    registry.reset()
+
+    assert registry.snapshot() == {
+        "methods": {},
+        "connections": {"acquired": 0, "seconds": 0.0, "max_seconds": 0.0},
+    }
@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+from src.query_cache import QueryCache
+
+
+def test_get_stored_value():
+    cache = QueryCache(maxsize=2)
+    cache.put("key", 1, cache.generations([]))
+
+    assert cache.get("key") == (True, 1)
+    assert cache.stats()["hits"] == 1
+
+
+def test_get_missing_value():
+    cache = QueryCache(maxsize=2)
+
+    assert cache.get("key") == (False, None)
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_evicted():
+    cache = QueryCache(maxsize=2)
+    cache.put("first", 1, cache.generations([]))
+    cache.put("second", 2, cache.generations([]))
+    cache.get("first")
+    cache.put("third", 3, cache.generations([]))
+
+    assert cache.get("second") == (False, None)
+    assert cache.get("first") == (True, 1)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_not_returned():
+    cache = QueryCache(maxsize=2, ttl=10)
+    with patch("src.query_cache.time.monotonic", return_value=100.0):
+        cache.put("key", 1, cache.generations([]))
+    with patch("src.query_cache.time.monotonic", return_value=111.0):
+        result = cache.get("key")
+
+    assert result == (False, None)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_only_entries_of_scope():
+    cache = QueryCache(maxsize=4)
+    cache.put("math", 1, cache.generations([("Math 3", "2019-2020")]))
+    cache.put("lit", 2, cache.generations([("Lit 3", "2019-2020")]))
+
+    cache.invalidate([("Math 3", "2019-2020")])
+
+    assert cache.get("math") == (False, None)
+    assert cache.get("lit") == (True, 2)
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_value_computed_before_invalidation_not_returned():
+    cache = QueryCache(maxsize=4)
+    generations = cache.generations([("Math 3", "2019-2020")])
+    cache.invalidate([("Math 3", "2019-2020")])
+    cache.put("math", 1, generations)
+
+    assert cache.get("math") == (False, None)
+
+
+def test_disabled_cache_stores_nothing():
+    cache = QueryCache(maxsize=0)
+    cache.put("key", 1, cache.generations([]))
+
+    assert cache.get("key") == (False, None)
@@ -0,0 +1,103 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from src import query_server
+from src.query_server import LatencyStats
+
+
+@pytest.fixture
+def server_url():
+    server = query_server.create_server(host="127.0.0.1", port=0)
+    thread = threading.Thread(
+        target=server.serve_forever,
+        kwargs={"poll_interval": 0.05},
+        daemon=True,
+    )
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url: str, body) -> dict:
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode(), method="POST"
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+@patch("src.app_logic.get_list_subjects_in_year", return_value=["Lit 4"])
+def test_query_answered(get_list_subjects_in_year_mock, server_url):
+    response = _post(
+        f"{server_url}/query",
+        {"operation": "list_subjects", "year": "2019-2020"},
+    )
+
+    assert response["result"] == ["Lit 4"]
+    get_list_subjects_in_year_mock.assert_called_once_with(year="2019-2020")
+
+
+@patch("src.app_logic.get_percentage_passed", return_value=0.5)
+def test_list_of_queries_answered(get_percentage_passed_mock, server_url):
+    query = {
+        "operation": "percentage_passed",
+        "subject": "Lit 4",
+        "year": "2019-2020",
+    }
+
+    response = _post(f"{server_url}/query", [query, {"operation": "other"}])
+
+    assert response[0]["result"] == 0.5
+    assert "error" in response[1]
+
+
+@patch("src.app_logic.get_list_subjects_in_year", return_value=[])
+def test_stats_report_latency_and_cache(
+    get_list_subjects_in_year_mock, server_url
+):
+    for _ in range(3):
+        _post(
+            f"{server_url}/query",
+            {"operation": "list_subjects", "year": "2019-2020"},
+        )
+
+    with urllib.request.urlopen(f"{server_url}/stats") as response:
+        stats = json.loads(response.read())
+
+    assert stats["requests"]["list_subjects"]["requests"] == 3
+    assert stats["requests"]["list_subjects"]["p99_ms"] >= 0
+    assert "hits" in stats["cache"]
+
+
+def test_invalid_json_rejected(server_url):
+    request = urllib.request.Request(
+        f"{server_url}/query", data=b"{", method="POST"
+    )
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request)
+
+    assert error.value.code == 400
+
+
+def test_latency_percentiles():
+    latency_stats = LatencyStats(window=100)
+    for milliseconds in range(1, 101):
+        latency_stats.record(
+            operation="list_subjects",
+            seconds=milliseconds / 1000,
+            error=milliseconds == 100,
+        )
+
+    stats = latency_stats.stats()["list_subjects"]
+
+    assert stats["requests"] == 100
+    assert stats["errors"] == 1
+    assert stats["p50_ms"] == pytest.approx(50.5)
+    assert stats["p99_ms"] == pytest.approx(99.01)
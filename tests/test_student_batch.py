@@ -0,0 +1,34 @@
+import pickle
+
+from src.student_batch import StudentBatch
+
+
+def test_student_batch_rows_are_tuples():
+    batch = StudentBatch(rows=[["Isa", "Garvi", 9.0], ["Tov", "Rod", 4.5]])
+    batch.append(name="Mar", last_name="Sousa", mark=6)
+
+    assert len(batch) == 3
+    assert batch[1] == ("Tov", "Rod", 4.5)
+    assert list(batch)[2] == ("Mar", "Sousa", 6.0)
+    assert pickle.loads(pickle.dumps(batch))[0] == ("Isa", "Garvi", 9.0)
+
+
+def test_student_batch_interns_names():
+    first = StudentBatch(rows=[["".join("Isa"), "Garvi", 9]])
+    second = StudentBatch(rows=[["".join("Isa"), "Garvi", 4]])
+
+    assert first[0][0] is second[0][0]
+
+
+def test_student_batch_slice_is_a_batch():
+    batch = StudentBatch(
+        rows=[["Isa", "Garvi", 9.0], ["Tov", "Rod", 4.5], ["Mar", "Sousa", 6]]
+    )
+
+    result = batch[1:]
+
+    assert isinstance(result, StudentBatch)
+    assert list(result) == [("Tov", "Rod", 4.5), ("Mar", "Sousa", 6.0)]
+    assert result.names == ["Tov", "Mar"]
+    assert list(result.marks) == [4.5, 6.0]
+    assert list(batch[::-2]) == [("Mar", "Sousa", 6.0), ("Isa", "Garvi", 9.0)]
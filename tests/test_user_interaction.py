@@ -1,4 +1,5 @@
 from src import user_interaction
+from src.database_manager import TranscriptEntry
 from unittest.mock import patch
 
 
@@ -38,14 +39,14 @@ def test_total_number_of_students_function_called(
     get_total_number_students_in_subject_mock.assert_called_once()
 
 
-@patch("src.app_logic.get_list_students_in_subject")
-def test_list_of_students_function_called(get_list_students_in_subject_mock):
+@patch("src.app_logic.iter_students_in_subject")
+def test_list_of_students_function_called(iter_students_in_subject_mock):
     user_interaction._process_selection(
         selection="List of students in a subject",
         subject="Lit 4",
         year="2019-2020",
     )
-    get_list_students_in_subject_mock.assert_called_once()
+    iter_students_in_subject_mock.assert_called_once()
 
 
 @patch("src.app_logic.get_list_subjects_in_year")
@@ -54,3 +55,37 @@ def test_list_of_subjects_function_called(get_list_subjects_in_year_mock):
         selection="List of subjects in a year", year="2019-2020"
     )
     get_list_subjects_in_year_mock.assert_called_once()
+
+
+def test_students_of_iterator_printed(capsys):
+    user_interaction._process_and_print_result(
+        result=iter(["Isa Garvi", "Tov Rod"])
+    )
+
+    assert capsys.readouterr().out.endswith("Isa Garvi\nTov Rod\n")
+
+
+def test_empty_iterator_printed_as_none(capsys):
+    user_interaction._process_and_print_result(result=iter([]))
+
+    assert capsys.readouterr().out.endswith("none.\n")
+
+
+@patch("builtins.input", side_effect=["Isa", "Garvi"])
+@patch(
+    "inquirer.prompt",
+    return_value={"function": "Subjects a student is enrolled in"},
+)
+@patch(
+    "src.app_logic.get_student_transcript",
+    return_value=[TranscriptEntry("Math 3", "2019-2020", 9.0)],
+)
+def test_transcript_of_student_printed(
+    get_student_transcript_mock, prompt_mock, input_mock, capsys
+):
+    user_interaction.user_interaction()
+
+    get_student_transcript_mock.assert_called_once_with(
+        name="Isa", last_name="Garvi"
+    )
+    assert capsys.readouterr().out.endswith("Math 3 2019-2020: 9.0\n")